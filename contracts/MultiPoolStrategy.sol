@@ -0,0 +1,458 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "../interfaces/IPool.sol";
+import "../interfaces/IGauge.sol";
+import "../interfaces/IUnirouter.sol";
+import "./PoolMath.sol";
+import "@openzeppelin/contracts/math/Math.sol";
+
+import {
+    BaseStrategy,
+    StrategyParams
+} from "@yearnvaults/contracts/BaseStrategy.sol";
+import {
+    SafeERC20,
+    SafeMath,
+    IERC20,
+    Address
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+
+import {IERC20Metadata} from "@yearnvaults/contracts/yToken.sol";
+import {ITradeFactory} from "./ySwap/ITradeFactory.sol";
+
+// Lends `want` to several TrueFi pools staked in the same gauge, split by
+// weights. One gauge.claim/exit covers every pool, and withdrawals exit the
+// pools with the lowest liquid exit penalty first.
+contract MultiPoolStrategy is BaseStrategy {
+    using SafeERC20 for IERC20;
+    using Address for address;
+    using SafeMath for uint256;
+
+    uint256 internal constant MAX_BPS = 10_000;
+
+    IGauge public immutable gauge;
+    IERC20 public immutable tru;
+    address public immutable unirouter;
+    address public immutable weth;
+
+    address[] public swapPath;
+    IPool[] public pools;
+    // bps of the invested want targeted for each pool, sums to MAX_BPS
+    uint256[] public weights;
+    // the pools as gauge tokens, built once for claim/exit
+    IERC20[] internal gaugeTokens;
+    address public tradeFactory = address(0);
+
+    constructor(
+        address _vault,
+        address[] memory _pools,
+        uint256[] memory _weights,
+        address _gauge,
+        address _tru,
+        address _unirouter,
+        address[] memory _swapPath
+    ) public BaseStrategy(_vault) {
+        require(_pools.length > 0, "!pools");
+        gauge = IGauge(_gauge);
+        tru = IERC20(_tru);
+        unirouter = _unirouter;
+        weth = IUnirouter(_unirouter).WETH();
+        // immutables can't be read during construction, check path against args
+        PoolMath.checkSwapPath(_swapPath, _tru, address(want));
+        swapPath = _swapPath;
+
+        for (uint256 i = 0; i < _pools.length; i++) {
+            require(IPool(_pools[i]).token() == want, "!want");
+            pools.push(IPool(_pools[i]));
+            gaugeTokens.push(IERC20(_pools[i]));
+            IERC20(_pools[i]).approve(_gauge, type(uint256).max);
+            want.approve(_pools[i], type(uint256).max);
+        }
+        _setWeights(_weights);
+        IERC20(_tru).approve(_unirouter, type(uint256).max);
+    }
+
+    // ******** OVERRIDE THESE METHODS FROM BASE CONTRACT ************
+
+    function name() external view override returns (string memory) {
+        return
+            string(
+                abi.encodePacked(
+                    "StrategyTruMultiLender",
+                    IERC20Metadata(address(want)).symbol()
+                )
+            );
+    }
+
+    function poolCount() external view returns (uint256) {
+        return pools.length;
+    }
+
+    function balanceOfWant() public view returns (uint256) {
+        return want.balanceOf(address(this));
+    }
+
+    function _balanceOfLP(uint256 _i) internal view returns (uint256) {
+        return gaugeTokens[_i].balanceOf(address(this));
+    }
+
+    function balanceOfLPInGauge(uint256 _i) public view returns (uint256) {
+        return gauge.staked(gaugeTokens[_i], address(this));
+    }
+
+    function getVirtualPrice(uint256 _i) public view returns (uint256) {
+        return
+            PoolMath.virtualPrice(pools[_i].poolValue(), pools[_i].totalSupply());
+    }
+
+    // want value of the LP held in pool `_i`, staked or not
+    function poolAssets(uint256 _i) public view returns (uint256) {
+        return
+            (_balanceOfLP(_i).add(balanceOfLPInGauge(_i)))
+                .mul(getVirtualPrice(_i))
+                .div(1e18);
+    }
+
+    function estimatedTotalAssets() public view override returns (uint256) {
+        uint256 total = balanceOfWant();
+        for (uint256 i = 0; i < pools.length; i++) {
+            total = total.add(poolAssets(i));
+        }
+        return total;
+    }
+
+    // pending TRU rewards of all pools in gauge
+    function pendingRewards() public view returns (uint256 _rewards) {
+        for (uint256 i = 0; i < pools.length; i++) {
+            _rewards = _rewards.add(
+                gauge.claimable(gaugeTokens[i], address(this))
+            );
+        }
+    }
+
+    function balanceOfTruRewards() public view returns (uint256) {
+        return tru.balanceOf(address(this));
+    }
+
+    function setWeights(uint256[] memory _weights)
+        external
+        onlyVaultManagers
+    {
+        _setWeights(_weights);
+    }
+
+    // new weights are reached as adjustPosition invests and withdrawals exit
+    function _setWeights(uint256[] memory _weights) internal {
+        require(_weights.length == pools.length, "!weights");
+        uint256 total;
+        for (uint256 i = 0; i < _weights.length; i++) {
+            total = total.add(_weights[i]);
+        }
+        require(total == MAX_BPS, "!weights");
+        weights = _weights;
+    }
+
+    function setSwapPath(address[] memory _swapPath)
+        external
+        onlyVaultManagers
+    {
+        PoolMath.checkSwapPath(_swapPath, address(tru), address(want));
+        swapPath = _swapPath;
+    }
+
+    function prepareReturn(uint256 _debtOutstanding)
+        internal
+        override
+        returns (
+            uint256 _profit,
+            uint256 _loss,
+            uint256 _debtPayment
+        )
+    {
+        require(tradeFactory != address(0), "Trade factory must be set.");
+        // one claim for the TRU of every pool, swapped through ySwap
+        _claimRewards();
+
+        uint256 debt = vault.strategies(address(this)).totalDebt;
+        uint256 assets = estimatedTotalAssets();
+        if (debt > assets) {
+            _loss = debt.sub(assets);
+        } else {
+            _profit = assets.sub(debt);
+        }
+
+        uint256 toLiquidate = _debtOutstanding.add(_profit);
+        if (toLiquidate > 0) {
+            (uint256 _amountFreed, uint256 _withdrawalLoss) =
+                liquidatePosition(toLiquidate);
+            _debtPayment = Math.min(_debtOutstanding, _amountFreed);
+            _loss = _loss.add(_withdrawalLoss);
+        }
+
+        // net out PnL
+        if (_profit > _loss) {
+            _profit = _profit.sub(_loss);
+            _loss = 0;
+        } else {
+            _loss = _loss.sub(_profit);
+            _profit = 0;
+        }
+    }
+
+    function _claimRewards() internal {
+        if (pendingRewards() > 0) {
+            gauge.claim(gaugeTokens);
+        }
+    }
+
+    function claimRewards() external onlyVaultManagers {
+        _claimRewards();
+    }
+
+    function _swapRewardToWant() internal {
+        uint256 rewards = tru.balanceOf(address(this));
+        if (rewards > 0) {
+            IUnirouter(unirouter).swapExactTokensForTokens(
+                rewards,
+                0,
+                swapPath,
+                address(this),
+                block.timestamp
+            );
+        }
+    }
+
+    function swapRewardToWant() external onlyVaultManagers {
+        _swapRewardToWant();
+    }
+
+    function adjustPosition(uint256 _debtOutstanding) internal override {
+        uint256 wantBalance = balanceOfWant();
+        if (wantBalance <= _debtOutstanding) {
+            return;
+        }
+        uint256 toInvest = wantBalance.sub(_debtOutstanding);
+
+        // fill the pools below their target first, in proportion to how far
+        // below they are, and split what is left by weight
+        (uint256[] memory deficits, uint256 totalDeficit) =
+            _deficits(estimatedTotalAssets().sub(wantBalance).add(toInvest));
+        uint256 remaining = toInvest;
+        uint256 n = pools.length;
+        for (uint256 i = 0; i < n; i++) {
+            // rounding dust goes to the last pool
+            uint256 amount =
+                i == n - 1
+                    ? remaining
+                    : Math.min(
+                        _share(i, toInvest, deficits[i], totalDeficit),
+                        remaining
+                    );
+            remaining = remaining.sub(amount);
+            _invest(i, amount);
+        }
+    }
+
+    // how far each pool is below its weight of `_target`, and the total
+    function _deficits(uint256 _target)
+        internal
+        view
+        returns (uint256[] memory _deficit, uint256 _total)
+    {
+        _deficit = new uint256[](pools.length);
+        for (uint256 i = 0; i < pools.length; i++) {
+            uint256 poolTarget = _target.mul(weights[i]).div(MAX_BPS);
+            uint256 assets = poolAssets(i);
+            if (poolTarget > assets) {
+                _deficit[i] = poolTarget - assets;
+                _total = _total.add(_deficit[i]);
+            }
+        }
+    }
+
+    // pool `_i`'s part of `_toInvest`
+    function _share(
+        uint256 _i,
+        uint256 _toInvest,
+        uint256 _deficit,
+        uint256 _totalDeficit
+    ) internal view returns (uint256) {
+        if (_totalDeficit >= _toInvest) {
+            return _toInvest.mul(_deficit).div(_totalDeficit);
+        }
+        return
+            _deficit.add(
+                _toInvest.sub(_totalDeficit).mul(weights[_i]).div(MAX_BPS)
+            );
+    }
+
+    // joins pool `_i` with `_amount` and stakes its LP
+    function _invest(uint256 _i, uint256 _amount) internal {
+        if (_amount > 0) {
+            pools[_i].join(_amount);
+        }
+        uint256 lp = _balanceOfLP(_i);
+        if (lp > 0) {
+            gauge.stake(gaugeTokens[_i], lp);
+        }
+    }
+
+    function liquidatePosition(uint256 _amountNeeded)
+        internal
+        override
+        returns (uint256 _liquidatedAmount, uint256 _loss)
+    {
+        uint256 wantBalance = balanceOfWant();
+        if (wantBalance > _amountNeeded) {
+            // if there is enough free want, let's use it
+            return (_amountNeeded, 0);
+        }
+
+        // we need to free funds, cheapest exits first
+        uint256 amountRequired = _amountNeeded.sub(wantBalance);
+        uint256 n = pools.length;
+        bool[] memory exited = new bool[](n);
+        for (uint256 round = 0; round < n && amountRequired > 0; round++) {
+            uint256 best = _cheapestExit(exited, amountRequired);
+            if (best == n) break;
+            exited[best] = true;
+            _withdrawSome(best, amountRequired);
+            uint256 freed = balanceOfWant().sub(wantBalance);
+            wantBalance = wantBalance.add(freed);
+            amountRequired = amountRequired > freed
+                ? amountRequired - freed
+                : 0;
+        }
+
+        uint256 freeAssets = balanceOfWant();
+        if (_amountNeeded > freeAssets) {
+            _liquidatedAmount = freeAssets;
+            _loss = _amountNeeded.sub(_liquidatedAmount);
+        } else {
+            _liquidatedAmount = _amountNeeded;
+        }
+    }
+
+    // pool with staked LP not exited yet that keeps the most of `_amount`,
+    // pools.length if there is none. Each pool is quoted at most at its
+    // liquid value, liquidExitPenalty reverts above it, and a pool with no
+    // liquidity is skipped
+    function _cheapestExit(bool[] memory _exited, uint256 _amount)
+        internal
+        view
+        returns (uint256 _best)
+    {
+        _best = pools.length;
+        uint256 bestPenalty;
+        for (uint256 i = 0; i < pools.length; i++) {
+            if (_exited[i] || balanceOfLPInGauge(i) == 0) continue;
+            // share kept, 10_000 means no penalty
+            uint256 penalty = PoolMath.exitKept(pools[i], _amount);
+            if (penalty == 0) continue;
+            if (_best == pools.length || penalty > bestPenalty) {
+                _best = i;
+                bestPenalty = penalty;
+            }
+        }
+    }
+
+    // exits enough LP of pool `_i` to free `_amountWant` after the exit
+    // penalty, as far as its staked LP and liquidity go
+    function _withdrawSome(uint256 _i, uint256 _amountWant) internal {
+        IPool pool = pools[_i];
+        uint256 actualWithdrawn =
+            PoolMath.lpForWant(
+                pool,
+                _amountWant,
+                pool.poolValue(),
+                pool.totalSupply(),
+                balanceOfLPInGauge(_i)
+            );
+        if (actualWithdrawn == 0) return;
+        gauge.unstake(gaugeTokens[_i], actualWithdrawn);
+        pool.liquidExit(actualWithdrawn);
+    }
+
+    // gauge tokens of the pools with LP staked, the ones to exit
+    function _stakedTokens() internal view returns (IERC20[] memory _tokens) {
+        _tokens = new IERC20[](gaugeTokens.length);
+        uint256 n;
+        for (uint256 i = 0; i < gaugeTokens.length; i++) {
+            if (balanceOfLPInGauge(i) > 0) {
+                _tokens[n++] = gaugeTokens[i];
+            }
+        }
+        assembly {
+            mstore(_tokens, n)
+        }
+    }
+
+    function _exitGauge() internal {
+        IERC20[] memory staked = _stakedTokens();
+        if (staked.length > 0) {
+            // exit claims rewards and unstakes all LP
+            gauge.exit(staked);
+        }
+    }
+
+    function liquidateAllPositions() internal override returns (uint256) {
+        _exitGauge();
+        for (uint256 i = 0; i < pools.length; i++) {
+            uint256 lp = _balanceOfLP(i);
+            if (lp > 0) {
+                pools[i].liquidExit(lp);
+            }
+        }
+        return want.balanceOf(address(this));
+    }
+
+    function prepareMigration(address _newStrategy) internal override {
+        _exitGauge();
+        tru.safeTransfer(_newStrategy, tru.balanceOf(address(this)));
+        for (uint256 i = 0; i < pools.length; i++) {
+            gaugeTokens[i].safeTransfer(_newStrategy, _balanceOfLP(i));
+        }
+    }
+
+    function protectedTokens()
+        internal
+        view
+        override
+        returns (address[] memory)
+    {}
+
+    function ethToWant(uint256 _amtInWei)
+        public
+        view
+        virtual
+        override
+        returns (uint256)
+    {
+        return PoolMath.ethToWant(unirouter, weth, address(want), _amtInWei);
+    }
+
+    // ----------------- YSWAPS FUNCTIONS ---------------------
+
+    function setTradeFactory(address _tradeFactory) external onlyGovernance {
+        if (tradeFactory != address(0)) {
+            _removeTradeFactoryPermissions();
+        }
+
+        // approve and set up trade factory
+        tru.safeApprove(_tradeFactory, type(uint256).max);
+        ITradeFactory tf = ITradeFactory(_tradeFactory);
+        tf.enable(address(tru), address(want));
+        tradeFactory = _tradeFactory;
+    }
+
+    function removeTradeFactoryPermissions() external onlyEmergencyAuthorized {
+        _removeTradeFactoryPermissions();
+    }
+
+    function _removeTradeFactoryPermissions() internal {
+        tru.safeApprove(tradeFactory, 0);
+        tradeFactory = address(0);
+    }
+}
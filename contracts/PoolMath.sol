@@ -0,0 +1,107 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "../interfaces/IPool.sol";
+import "../interfaces/IUnirouter.sol";
+import "@openzeppelin/contracts/math/Math.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+// TrueFi pool and router math shared by Strategy and MultiPoolStrategy.
+// Internal functions only, compiled into each strategy.
+library PoolMath {
+    using SafeMath for uint256;
+
+    uint256 internal constant MAX_BPS = 10_000;
+
+    function virtualPrice(uint256 _poolValue, uint256 _poolSupply)
+        internal
+        pure
+        returns (uint256)
+    {
+        return (_poolValue.mul(1e18)).div(_poolSupply);
+    }
+
+    // LP to liquidExit so that at least `_amountWant` is left after the exit
+    // penalty, capped at `_staked`. liquidExit charges the penalty at the
+    // gross (pre-penalty) size and it only grows with size, so iterating from
+    // the net amount settles on the gross one within a few rounds. TrueFi
+    // reverts both the penalty quote and the exit above the pool's liquid
+    // value, so the gross amount is capped there: an illiquid pool pays out
+    // what it can instead of reverting the withdrawal.
+    function lpForWant(
+        IPool _pool,
+        uint256 _amountWant,
+        uint256 _poolValue,
+        uint256 _poolSupply,
+        uint256 _staked
+    ) internal view returns (uint256) {
+        if (_amountWant == 0 || _poolValue == 0) return 0;
+        uint256 liquid = _pool.liquidValue();
+        uint256 gross = Math.min(_amountWant, liquid);
+        for (uint256 i = 0; i < 3 && gross > 0; i++) {
+            // share kept, 10_000 means no penalty
+            uint256 kept = _pool.liquidExitPenalty(gross);
+            if (kept == 0) {
+                // nothing is paid out at any size, exit all that can go
+                gross = liquid;
+                break;
+            }
+            uint256 next =
+                Math.min(
+                    _amountWant.mul(MAX_BPS).add(kept - 1).div(kept),
+                    liquid
+                );
+            if (next == gross) break;
+            gross = next;
+        }
+        uint256 lp = gross.mul(_poolSupply);
+        // liquidExit rounds down, so round the LP up, unless that would take
+        // it over the liquid value
+        if (gross < liquid) lp = lp.add(_poolValue - 1);
+        return Math.min(lp.div(_poolValue), _staked);
+    }
+
+    // share of `_amount` a liquidExit keeps, 10_000 means no penalty. Quoted
+    // at most at the liquid value, 0 if the pool has none
+    function exitKept(IPool _pool, uint256 _amount)
+        internal
+        view
+        returns (uint256)
+    {
+        uint256 liquid = _pool.liquidValue();
+        if (liquid == 0) return 0;
+        return _pool.liquidExitPenalty(Math.min(_amount, liquid));
+    }
+
+    function ethToWant(
+        address _unirouter,
+        address _weth,
+        address _want,
+        uint256 _amtInWei
+    ) internal view returns (uint256) {
+        if (_amtInWei == 0 || _want == _weth) {
+            return _amtInWei;
+        }
+        address[] memory path = new address[](2);
+        path[0] = _weth;
+        path[1] = _want;
+        // a missing pair must not revert the triggers, the call is priced at 0
+        try
+            IUnirouter(_unirouter).getAmountsOut(_amtInWei, path)
+        returns (uint256[] memory amounts) {
+            return amounts[1];
+        } catch {
+            return 0;
+        }
+    }
+
+    function checkSwapPath(
+        address[] memory _swapPath,
+        address _tru,
+        address _want
+    ) internal pure {
+        require(_tru == _swapPath[0], "illegal path!");
+        require(_want == _swapPath[_swapPath.length - 1], "illegal path!");
+    }
+}
@@ -8,7 +8,9 @@ pragma experimental ABIEncoderV2;
 import "../interfaces/IPool.sol";
 import "../interfaces/IGauge.sol";
 import "../interfaces/IUnirouter.sol";
+import "./PoolMath.sol";
 import "@openzeppelin/contracts/math/Math.sol";
+import "@openzeppelin/contracts/utils/SafeCast.sol";
 
 import {
     BaseStrategy,
@@ -28,32 +30,78 @@ contract Strategy is BaseStrategy {
     using SafeERC20 for IERC20;
     using Address for address;
     using SafeMath for uint256;
-
-    // gauge is constant and same for all pools
-    IGauge public constant gauge =
-        IGauge(0xec6c3FD795D6e6f202825Ddb56E01b3c128b0b10);
-    IERC20 public constant tru =
-        IERC20(0x4C19596f5aAfF459fA38B0f7eD92F11AE6543784);
-    address public constant unirouter =
-        address(0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F);
-
-    address[] public swapPath;
-    IPool public pool;
+    using SafeCast for uint256;
+
+    // gauge is the same for all pools, injected so tests can run on mocks
+    // mainnet: gauge 0xec6c3FD795D6e6f202825Ddb56E01b3c128b0b10
+    //          tru 0x4C19596f5aAfF459fA38B0f7eD92F11AE6543784
+    //          unirouter 0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F
+    IGauge public immutable gauge;
+    IERC20 public immutable tru;
+    address public immutable unirouter;
+    address public immutable weth;
+    uint256 internal immutable truUnit;
+    IPool public immutable pool;
+    // BaseStrategy keeps `want` in storage, the hot paths read this copy
+    IERC20 internal immutable wantToken;
+
+    // swap path between TRU and want, 20 bytes per address. The usual single
+    // hop (WETH) fits the short form of `bytes`, one slot
+    bytes internal swapHops;
     address public tradeFactory = address(0);
 
+    // refreshed on every harvest, used by the triggers to value rewards and
+    // the pool gain without pricing TRU on the spot. Packed, they are
+    // written and read together.
+    uint128 public truPrice; // want per 1 TRU
+    uint128 public lastVirtualPrice;
+
+    // idle want kept out of the pool to serve small withdrawals without a
+    // liquidExit, in bps of total assets. adjustPosition refills or drains it
+    // back to the target only once it leaves target +- band.
+    uint128 public bufferBps;
+    uint128 public bufferBandBps;
+
+    // compounding: harvest claims TRU itself once pendingRewards() reaches
+    // minRewardsToClaim, and the trade factory may only pull TRU once
+    // minRewardsToSell has piled up, so rewards are sold in fewer, larger
+    // swaps. The defaults keep claims manual and TRU always sellable.
+    uint256 public minRewardsToClaim = type(uint256).max;
+    uint256 public minRewardsToSell;
+
+    // pool and position state read once per transaction and passed down the
+    // harvest/withdraw paths, so every helper sees the same values.
+    // Only valid until the next join/exit/stake/unstake.
+    struct PoolSnapshot {
+        uint256 poolValue;
+        uint256 poolSupply;
+        uint256 lp;
+        uint256 staked;
+    }
+
     constructor(
         address _vault,
         address _pool,
+        address _gauge,
+        address _tru,
+        address _unirouter,
         address[] memory _swapPath
     ) public BaseStrategy(_vault) {
+        require(IPool(_pool).token() == want);
         pool = IPool(_pool);
-        require(pool.token() == want);
-        _checkPath(_swapPath);
-        swapPath = _swapPath;
-
-        IERC20(address(pool)).approve(address(gauge), type(uint256).max);
-        want.approve(address(pool), type(uint256).max);
-        tru.approve(unirouter, type(uint256).max);
+        wantToken = want;
+        gauge = IGauge(_gauge);
+        tru = IERC20(_tru);
+        unirouter = _unirouter;
+        weth = IUnirouter(_unirouter).WETH();
+        truUnit = 10**uint256(IERC20Metadata(_tru).decimals());
+        // immutables can't be read during construction, check path against args
+        PoolMath.checkSwapPath(_swapPath, _tru, address(want));
+        swapHops = _packHops(_swapPath);
+
+        IERC20(_pool).approve(_gauge, type(uint256).max);
+        want.approve(_pool, type(uint256).max);
+        IERC20(_tru).approve(_unirouter, type(uint256).max);
     }
 
     // ******** OVERRIDE THESE METHODS FROM BASE CONTRACT ************
@@ -69,7 +117,7 @@ contract Strategy is BaseStrategy {
     }
 
     function balanceOfWant() public view returns (uint256) {
-        return IERC20(want).balanceOf(address(this));
+        return wantToken.balanceOf(address(this));
     }
 
     function balanceOfWantInGauge() public view returns (uint256) {
@@ -89,17 +137,44 @@ contract Strategy is BaseStrategy {
     }
 
     function totalLPtoWant() public view returns (uint256) {
-        return (totalLP().mul(getVirtualPrice())).div(1e18);
+        return _totalLPtoWant(_poolSnapshot());
     }
 
     function getVirtualPrice() public view returns (uint256) {
-        return (pool.poolValue().mul(1e18)).div(pool.totalSupply());
+        return PoolMath.virtualPrice(pool.poolValue(), pool.totalSupply());
     }
 
     function estimatedTotalAssets() public view override returns (uint256) {
         return totalLPtoWant().add(balanceOfWant());
     }
 
+    function _poolSnapshot() internal view returns (PoolSnapshot memory) {
+        return
+            PoolSnapshot(
+                pool.poolValue(),
+                pool.totalSupply(),
+                _balanceOfLP(),
+                balanceOfLPInGauge()
+            );
+    }
+
+    function _virtualPrice(PoolSnapshot memory _snap)
+        internal
+        pure
+        returns (uint256)
+    {
+        return PoolMath.virtualPrice(_snap.poolValue, _snap.poolSupply);
+    }
+
+    function _totalLPtoWant(PoolSnapshot memory _snap)
+        internal
+        pure
+        returns (uint256)
+    {
+        return
+            (_snap.lp.add(_snap.staked).mul(_virtualPrice(_snap))).div(1e18);
+    }
+
     // pending TRU rewards in gauge
     function pendingRewards() public view returns (uint256) {
         return gauge.claimable(IERC20(address(pool)), address(this));
@@ -122,20 +197,71 @@ contract Strategy is BaseStrategy {
         return (lpLoss.mul(getVirtualPrice())).div(1e18);
     }
 
+    // penalty fee of exiting the whole LP position, in terms of want
+    function totalExitPenaltyFee() external view returns (uint256) {
+        return exitPenaltyFeeWant(totalLP());
+    }
+
     function setSwapPath(address[] memory _swapPath)
         external
         onlyVaultManagers
     {
-        _checkPath(_swapPath);
-        swapPath = _swapPath;
+        PoolMath.checkSwapPath(_swapPath, address(tru), address(wantToken));
+        swapHops = _packHops(_swapPath);
+    }
+
+    // same output and out of range revert as the getter of the former
+    // `address[] public swapPath`
+    function swapPath(uint256 _index) external view returns (address) {
+        address[] memory path = _loadSwapPath();
+        assert(_index < path.length);
+        return path[_index];
     }
 
-    function _checkPath(address[] memory _swapPath) internal {
-        require(address(tru) == _swapPath[0], "illegal path!");
-        require(
-            address(want) == _swapPath[_swapPath.length - 1],
-            "illegal path!"
-        );
+    function _packHops(address[] memory _swapPath)
+        internal
+        pure
+        returns (bytes memory _hops)
+    {
+        for (uint256 i = 1; i + 1 < _swapPath.length; i++) {
+            _hops = abi.encodePacked(_hops, _swapPath[i]);
+        }
+    }
+
+    function _loadSwapPath() internal view returns (address[] memory _path) {
+        bytes memory hops = swapHops;
+        uint256 n = hops.length / 20;
+        _path = new address[](n + 2);
+        _path[0] = address(tru);
+        for (uint256 i = 0; i < n; i++) {
+            address hop;
+            assembly {
+                hop := shr(96, mload(add(add(hops, 32), mul(i, 20))))
+            }
+            _path[i + 1] = hop;
+        }
+        _path[n + 1] = address(wantToken);
+    }
+
+    function setBuffer(uint256 _bufferBps, uint256 _bufferBandBps)
+        external
+        onlyVaultManagers
+    {
+        require(_bufferBps <= 10_000 && _bufferBandBps <= _bufferBps, "!buffer");
+        bufferBps = uint128(_bufferBps);
+        bufferBandBps = uint128(_bufferBandBps);
+    }
+
+    // buffer target and band for `_idle` want on top of the pool position
+    function _buffer(
+        uint256 _idle,
+        PoolSnapshot memory _snap,
+        uint256 _bufferBps,
+        uint256 _bufferBandBps
+    ) internal pure returns (uint256 _target, uint256 _band) {
+        uint256 total = _totalLPtoWant(_snap).add(_idle);
+        _target = total.mul(_bufferBps).div(10_000);
+        _band = total.mul(_bufferBandBps).div(10_000);
     }
 
     function prepareReturn(uint256 _debtOutstanding)
@@ -147,10 +273,20 @@ contract Strategy is BaseStrategy {
             uint256 _debtPayment
         )
     {
-        require(tradeFactory != address(0), "Trade factory must be set.");
+        address _tradeFactory = tradeFactory;
+        require(_tradeFactory != address(0), "Trade factory must be set.");
+
+        uint256 pending = pendingRewards();
+        if (pending >= minRewardsToClaim && pending > 0) {
+            gauge.claim(_lpTokens());
+        }
+        _releaseRewards(_tradeFactory);
 
         uint256 debt = vault.strategies(address(this)).totalDebt;
-        uint256 assets = estimatedTotalAssets();
+        PoolSnapshot memory snap = _poolSnapshot();
+        _refreshPrices(snap);
+        uint256 wantBalance = balanceOfWant();
+        uint256 assets = _totalLPtoWant(snap).add(wantBalance);
         if (debt > assets) {
             _loss = debt.sub(assets);
         } else {
@@ -160,7 +296,7 @@ contract Strategy is BaseStrategy {
         uint256 toLiquidate = _debtOutstanding.add(_profit);
         if (toLiquidate > 0) {
             (uint256 _amountFreed, uint256 _withdrawalLoss) =
-                liquidatePosition(toLiquidate);
+                _liquidatePosition(toLiquidate, wantBalance, snap);
             _debtPayment = Math.min(_debtOutstanding, _amountFreed);
             _loss = _loss.add(_withdrawalLoss);
         }
@@ -175,16 +311,47 @@ contract Strategy is BaseStrategy {
         }
     }
 
-    function _claimRewards() internal {
+    // the pool LP as the token list gauge.claim/exit take
+    function _lpTokens() internal view returns (IERC20[] memory _tokens) {
+        _tokens = new IERC20[](1);
+        _tokens[0] = IERC20(address(pool));
+    }
+
+    function claimRewards() external onlyVaultManagers {
         if (pendingRewards() > 0) {
-            IERC20[] memory tmp = new IERC20[](1);
-            tmp[0] = IERC20(address(pool));
-            gauge.claim(tmp);
+            gauge.claim(_lpTokens());
+        }
+        address _tradeFactory = tradeFactory;
+        if (_tradeFactory != address(0)) {
+            _releaseRewards(_tradeFactory);
         }
     }
 
-    function claimRewards() external onlyVaultManagers {
-        _claimRewards();
+    function setRewardThresholds(
+        uint256 _minRewardsToClaim,
+        uint256 _minRewardsToSell
+    ) external onlyVaultManagers {
+        minRewardsToClaim = _minRewardsToClaim;
+        minRewardsToSell = _minRewardsToSell;
+        address _tradeFactory = tradeFactory;
+        if (_tradeFactory != address(0)) {
+            _releaseRewards(_tradeFactory);
+        }
+    }
+
+    // lets the trade factory pull exactly the TRU held, once a batch worth
+    // selling has piled up
+    function _releaseRewards(address _tradeFactory) internal {
+        uint256 balance = tru.balanceOf(address(this));
+        uint256 allowance = balance >= minRewardsToSell ? balance : 0;
+        uint256 current = tru.allowance(address(this), _tradeFactory);
+        if (current == allowance) return;
+        if (current > 0) {
+            tru.safeApprove(_tradeFactory, 0);
+        }
+        if (allowance > 0) {
+            tru.safeApprove(_tradeFactory, allowance);
+        }
     }
 
     function _swapRewardToWant() internal {
@@ -193,7 +360,7 @@ contract Strategy is BaseStrategy {
             IUnirouter(unirouter).swapExactTokensForTokens(
                 rewards,
                 0,
-                swapPath,
+                _loadSwapPath(),
                 address(this),
                 block.timestamp
             );
@@ -206,13 +373,27 @@ contract Strategy is BaseStrategy {
 
     function adjustPosition(uint256 _debtOutstanding) internal override {
         uint256 wantBalance = balanceOfWant();
-        if (wantBalance > _debtOutstanding) {
-            // supply to the pool get LP
-            pool.join(wantBalance.sub(_debtOutstanding));
+        uint256 idle =
+            wantBalance > _debtOutstanding ? wantBalance - _debtOutstanding : 0;
+        uint256 target;
+        uint256 band;
+        uint256 _bufferBps = bufferBps;
+        if (_bufferBps > 0) {
+            PoolSnapshot memory snap = _poolSnapshot();
+            (target, band) = _buffer(idle, snap, _bufferBps, bufferBandBps);
+            if (idle.add(band) < target) {
+                // buffer ran below the band, refill it to the target
+                _withdrawSome(target - idle, snap);
+            }
+        }
+        if (idle > target.add(band)) {
+            // supply to the pool get LP, keeping the buffer
+            pool.join(idle - target);
         }
-        if (_balanceOfLP() > 0) {
+        uint256 lp = _balanceOfLP();
+        if (lp > 0) {
             // stake LP to earn TRU
-            gauge.stake(IERC20(address(pool)), _balanceOfLP());
+            gauge.stake(IERC20(address(pool)), lp);
         }
     }
 
@@ -223,14 +404,26 @@ contract Strategy is BaseStrategy {
     {
         uint256 wantBalance = balanceOfWant();
         if (wantBalance > _amountNeeded) {
+            // if there is enough free want, let's use it (no pool reads)
+            return (_amountNeeded, 0);
+        }
+        return _liquidatePosition(_amountNeeded, wantBalance, _poolSnapshot());
+    }
+
+    function _liquidatePosition(
+        uint256 _amountNeeded,
+        uint256 _wantBalance,
+        PoolSnapshot memory _snap
+    ) internal returns (uint256 _liquidatedAmount, uint256 _loss) {
+        if (_wantBalance > _amountNeeded) {
             // if there is enough free want, let's use it
             return (_amountNeeded, 0);
         }
 
         // we need to free funds
 
-        uint256 amountRequired = _amountNeeded.sub(wantBalance);
-        _withdrawSome(amountRequired);
+        uint256 amountRequired = _amountNeeded.sub(_wantBalance);
+        _withdrawSome(amountRequired, _snap);
         uint256 freeAssets = balanceOfWant();
         if (_amountNeeded > freeAssets) {
             _liquidatedAmount = freeAssets;
@@ -240,34 +433,176 @@ contract Strategy is BaseStrategy {
         }
     }
 
-    function _withdrawSome(uint256 _amountWant) internal {
-        // _amounWant / virtualPrice
-        // we are withdrawing "_amountWant" amount of want worth LP + penaltyFee of "_amountWant" LP
-        uint256 actualWithdrawn =
-            Math.min(
-                ((_amountWant.mul(1e18)).div(getVirtualPrice())),
-                balanceOfLPInGauge()
-            );
+    function _withdrawSome(uint256 _amountWant, PoolSnapshot memory _snap)
+        internal
+    {
+        uint256 actualWithdrawn = _lpForWant(_amountWant, _snap);
         gauge.unstake(IERC20(address(pool)), actualWithdrawn);
         pool.liquidExit(actualWithdrawn);
     }
 
+    // LP to liquidExit so that at least `_amountWant` is left after the exit
+    // penalty (see PoolMath.lpForWant)
+    function _lpForWant(uint256 _amountWant, PoolSnapshot memory _snap)
+        internal
+        view
+        returns (uint256)
+    {
+        return
+            PoolMath.lpForWant(
+                pool,
+                _amountWant,
+                _snap.poolValue,
+                _snap.poolSupply,
+                _snap.staked
+            );
+    }
+
+    // LP a withdrawal of `_amountWant` would liquidExit
+    function lpForWant(uint256 _amountWant) external view returns (uint256) {
+        return _lpForWant(_amountWant, _poolSnapshot());
+    }
+
     function liquidateAllPositions() internal override returns (uint256) {
-        IERC20[] memory tmp = new IERC20[](1);
-        tmp[0] = IERC20(address(pool));
-        gauge.exit(tmp);
+        gauge.exit(_lpTokens());
         pool.liquidExit(_balanceOfLP());
-        return want.balanceOf(address(this));
+        return balanceOfWant();
+    }
+
+    function _refreshPrices(PoolSnapshot memory _snap) internal {
+        uint256 price = truPrice;
+        // a failing quote must not block harvests, keep the last price
+        try
+            IUnirouter(unirouter).getAmountsOut(truUnit, _loadSwapPath())
+        returns (uint256[] memory amounts) {
+            price = amounts[amounts.length - 1];
+        } catch {}
+        // one slot, one write
+        truPrice = price.toUint128();
+        lastVirtualPrice = _virtualPrice(_snap).toUint128();
     }
 
-    // NOTE: Can override `tendTrigger` and `harvestTrigger` if necessary
+    // profit a harvest would realize: pool gain since the last report net of
+    // the exit penalty paid to free it, plus TRU rewards at the cached price
+    function _realizableProfit(PoolSnapshot memory _snap, uint256 _totalDebt)
+        internal
+        view
+        returns (uint256 _profit)
+    {
+        uint256 virtualPrice = _virtualPrice(_snap);
+        uint256 _lastVirtualPrice = lastVirtualPrice;
+        if (_lastVirtualPrice == 0) {
+            // never harvested, fall back to assets over debt
+            uint256 assets = _totalLPtoWant(_snap).add(balanceOfWant());
+            _profit = assets > _totalDebt ? assets.sub(_totalDebt) : 0;
+        } else if (virtualPrice > _lastVirtualPrice) {
+            uint256 gainLP =
+                _snap.lp.add(_snap.staked).mul(virtualPrice - _lastVirtualPrice).div(
+                    virtualPrice
+                );
+            // quoted at most at the liquid value, like the exit itself
+            uint256 kept = PoolMath.exitKept(pool, gainLP);
+            uint256 penaltyLP = (10_000 - kept).mul(gainLP) / 10_000;
+            _profit = gainLP.sub(penaltyLP).mul(virtualPrice).div(1e18);
+        }
+        uint256 rewards = pendingRewards().add(balanceOfTruRewards());
+        _profit = _profit.add(rewards.mul(truPrice).div(truUnit));
+    }
+
+    function harvestTrigger(uint256 callCostInWei)
+        public
+        view
+        override
+        returns (bool)
+    {
+        StrategyParams memory params = vault.strategies(address(this));
+        if (params.activation == 0) return false;
+        if (block.timestamp.sub(params.lastReport) < minReportDelay) {
+            return false;
+        }
+        if (block.timestamp.sub(params.lastReport) >= maxReportDelay) {
+            return true;
+        }
+        if (vault.debtOutstanding() > debtThreshold) return true;
+
+        PoolSnapshot memory snap = _poolSnapshot();
+        uint256 total = _totalLPtoWant(snap).add(balanceOfWant());
+        if (total.add(debtThreshold) < params.totalDebt) return true;
+
+        return
+            profitFactor.mul(ethToWant(callCostInWei)) <
+            vault.creditAvailable().add(
+                _realizableProfit(snap, params.totalDebt)
+            );
+    }
+
+    // idle want is worth investing if, at the pool rate seen since the last
+    // report, it earns more than the call costs before the next harvest
+    function tendTrigger(uint256 callCostInWei)
+        public
+        view
+        override
+        returns (bool)
+    {
+        uint256 _lastVirtualPrice = lastVirtualPrice;
+        if (_lastVirtualPrice == 0) return false;
+        PoolSnapshot memory snap = _poolSnapshot();
+        uint256 investable = _investable(snap);
+        if (investable == 0) return false;
+
+        uint256 earned =
+            _earnedUntilReport(
+                investable,
+                _virtualPrice(snap),
+                _lastVirtualPrice
+            );
+        // no router quote when nothing would be earned
+        return
+            earned > 0 && profitFactor.mul(ethToWant(callCostInWei)) < earned;
+    }
+
+    // idle want a tend would invest, nothing while it is inside the buffer
+    // band
+    function _investable(PoolSnapshot memory _snap)
+        internal
+        view
+        returns (uint256)
+    {
+        uint256 wantBalance = balanceOfWant();
+        uint256 outstanding = vault.debtOutstanding();
+        if (wantBalance <= outstanding) return 0;
+        uint256 idle = wantBalance - outstanding;
+        (uint256 target, uint256 band) =
+            _buffer(idle, _snap, bufferBps, bufferBandBps);
+        return idle > target.add(band) ? idle - target : 0;
+    }
+
+    // what `_amount` earns at the pool rate seen since the last report, if
+    // invested now, until maxReportDelay forces the next one
+    function _earnedUntilReport(
+        uint256 _amount,
+        uint256 _price,
+        uint256 _lastPrice
+    ) internal view returns (uint256) {
+        uint256 elapsed =
+            block.timestamp.sub(vault.strategies(address(this)).lastReport);
+        if (
+            elapsed == 0 || elapsed >= maxReportDelay || _price <= _lastPrice
+        ) {
+            return 0;
+        }
+        return
+            _amount
+                .mul(_price - _lastPrice)
+                .div(_lastPrice)
+                .mul(maxReportDelay - elapsed)
+                .div(elapsed);
+    }
 
     function prepareMigration(address _newStrategy) internal override {
         if (balanceOfLPInGauge() > 0) {
-            IERC20[] memory tmp = new IERC20[](1);
-            tmp[0] = IERC20(address(pool));
             // exit claims rewards and unstake all LP
-            gauge.exit(tmp);
+            gauge.exit(_lpTokens());
         }
         tru.safeTransfer(_newStrategy, tru.balanceOf(address(this)));
         IERC20(address(pool)).safeTransfer(_newStrategy, _balanceOfLP());
@@ -287,10 +622,10 @@ contract Strategy is BaseStrategy {
         override
         returns (uint256)
     {
-        return _amtInWei;
+        return
+            PoolMath.ethToWant(unirouter, weth, address(wantToken), _amtInWei);
     }
 
-
     // ----------------- YSWAPS FUNCTIONS ---------------------
 
     function setTradeFactory(address _tradeFactory) external onlyGovernance {
@@ -298,11 +633,11 @@ contract Strategy is BaseStrategy {
             _removeTradeFactoryPermissions();
         }
 
-        // approve and set up trade factory
-        tru.safeApprove(_tradeFactory, type(uint256).max);
+        // set up trade factory, TRU is approved once there is enough to sell
         ITradeFactory tf = ITradeFactory(_tradeFactory);
-        tf.enable(address(tru), address(want));
+        tf.enable(address(tru), address(wantToken));
         tradeFactory = _tradeFactory;
+        _releaseRewards(_tradeFactory);
     }
 
     function removeTradeFactoryPermissions() external onlyEmergencyAuthorized {
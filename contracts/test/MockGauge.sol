@@ -0,0 +1,116 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "./MockERC20.sol";
+
+// TrueFi gauge stand-in. Each staked token earns `rewardRate` TRU per second,
+// shared pro rata between stakers and minted on claim.
+contract MockGauge {
+    using SafeMath for uint256;
+
+    uint256 private constant PRECISION = 1e30;
+
+    MockERC20 public tru;
+
+    mapping(IERC20 => uint256) public rewardRate;
+    mapping(IERC20 => uint256) public totalStaked;
+    mapping(IERC20 => mapping(address => uint256)) public staked;
+
+    mapping(IERC20 => uint256) public cumulativeRewardPerToken;
+    mapping(IERC20 => uint256) public lastUpdate;
+    mapping(IERC20 => mapping(address => uint256))
+        public previousCumulatedRewardPerToken;
+    mapping(IERC20 => mapping(address => uint256)) public claimableReward;
+
+    // same event as TrueMultiFarm
+    event Claimed(IERC20 indexed token, address indexed to, uint256 amount);
+
+    constructor(address _tru) public {
+        tru = MockERC20(_tru);
+    }
+
+    function setRewardRate(IERC20 token, uint256 rate) external {
+        _update(token, address(0));
+        rewardRate[token] = rate;
+    }
+
+    function _currentCumulative(IERC20 token) internal view returns (uint256) {
+        if (totalStaked[token] == 0) {
+            return cumulativeRewardPerToken[token];
+        }
+        uint256 elapsed = block.timestamp.sub(lastUpdate[token]);
+        return
+            cumulativeRewardPerToken[token].add(
+                rewardRate[token].mul(elapsed).mul(PRECISION).div(
+                    totalStaked[token]
+                )
+            );
+    }
+
+    function _update(IERC20 token, address account) internal {
+        cumulativeRewardPerToken[token] = _currentCumulative(token);
+        lastUpdate[token] = block.timestamp;
+        if (account == address(0)) {
+            return;
+        }
+        claimableReward[token][account] = claimable(token, account);
+        previousCumulatedRewardPerToken[token][
+            account
+        ] = cumulativeRewardPerToken[token];
+    }
+
+    function claimable(IERC20 token, address account)
+        public
+        view
+        returns (uint256)
+    {
+        uint256 delta =
+            _currentCumulative(token).sub(
+                previousCumulatedRewardPerToken[token][account]
+            );
+        return
+            claimableReward[token][account].add(
+                staked[token][account].mul(delta).div(PRECISION)
+            );
+    }
+
+    function stake(IERC20 token, uint256 amount) external {
+        _update(token, msg.sender);
+        token.transferFrom(msg.sender, address(this), amount);
+        staked[token][msg.sender] = staked[token][msg.sender].add(amount);
+        totalStaked[token] = totalStaked[token].add(amount);
+    }
+
+    function unstake(IERC20 token, uint256 amount) public {
+        _update(token, msg.sender);
+        staked[token][msg.sender] = staked[token][msg.sender].sub(amount);
+        totalStaked[token] = totalStaked[token].sub(amount);
+        token.transfer(msg.sender, amount);
+    }
+
+    function claim(IERC20[] calldata tokens) external {
+        for (uint256 i = 0; i < tokens.length; i++) {
+            _claim(tokens[i]);
+        }
+    }
+
+    function exit(IERC20[] calldata tokens) external {
+        for (uint256 i = 0; i < tokens.length; i++) {
+            unstake(tokens[i], staked[tokens[i]][msg.sender]);
+            _claim(tokens[i]);
+        }
+    }
+
+    function _claim(IERC20 token) internal {
+        _update(token, msg.sender);
+        uint256 reward = claimableReward[token][msg.sender];
+        claimableReward[token][msg.sender] = 0;
+        if (reward > 0) {
+            tru.mint(msg.sender, reward);
+        }
+        emit Claimed(token, msg.sender, reward);
+    }
+}
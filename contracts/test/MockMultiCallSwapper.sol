@@ -0,0 +1,48 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+// MultiCallOptimizedSwapper stand-in. `_data` is the packed payload built in
+// scripts/swapper.py: a uint8 optimizations header followed by
+// (address target, uint256 length, bytes calldata) segments.
+contract MockMultiCallSwapper {
+    address public immutable TRADE_FACTORY;
+
+    constructor(address _tradeFactory) public {
+        TRADE_FACTORY = _tradeFactory;
+    }
+
+    function swap(
+        address,
+        address,
+        address,
+        uint256,
+        uint256,
+        bytes calldata _data
+    ) external returns (uint256) {
+        _multicall(_data);
+        return 0;
+    }
+
+    function swapMultiple(bytes calldata _data) external {
+        _multicall(_data);
+    }
+
+    function _multicall(bytes memory data) internal {
+        require(msg.sender == TRADE_FACTORY, "NotAuthorized");
+        // skip the optimizations byte
+        uint256 offset = 1;
+        while (offset < data.length) {
+            address target;
+            uint256 length;
+            bool success;
+            assembly {
+                let ptr := add(add(data, 32), offset)
+                target := shr(96, mload(ptr))
+                length := mload(add(ptr, 20))
+                success := call(gas(), target, 0, add(ptr, 52), length, 0, 0)
+            }
+            require(success, "MultiCallRevert");
+            offset += 52 + length;
+        }
+    }
+}
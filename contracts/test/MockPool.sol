@@ -0,0 +1,131 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/token/ERC20/ERC20.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+import "./MockERC20.sol";
+
+// TrueFi lending pool stand-in. Pool value grows at `interestRate` (bps per
+// year) on top of the liquid balance, plus whatever is lent out with `borrow`.
+// Exits pay `exitPenalty`, less `exitPenaltySlope` in proportion to the share
+// of the liquid value taken out, and like TrueFiPool2 both liquidExit and
+// liquidExitPenalty revert above the liquid value.
+contract MockPool is ERC20 {
+    using SafeMath for uint256;
+
+    uint256 private constant BASIS_PRECISION = 10_000;
+
+    MockERC20 public token;
+    uint256 public interestRate;
+    // returned by liquidExitPenalty, 10_000 means no penalty
+    uint256 public exitPenalty = BASIS_PRECISION;
+    // bps taken off exitPenalty by an exit of the whole liquid value
+    uint256 public exitPenaltySlope;
+    // lent out, part of the pool value but not liquid
+    uint256 public loansValue;
+    uint256 public lastAccrual;
+
+    // same events as TrueFiPool2
+    event Joined(address indexed staker, uint256 deposited, uint256 minted);
+    event Exited(address indexed staker, uint256 amount);
+
+    constructor(
+        address _token,
+        uint256 _interestRate,
+        uint256 _exitPenalty
+    ) public ERC20("TrueFi Mock", "tfMOCK") {
+        token = MockERC20(_token);
+        _setupDecimals(token.decimals());
+        interestRate = _interestRate;
+        exitPenalty = _exitPenalty;
+        lastAccrual = block.timestamp;
+    }
+
+    function setInterestRate(uint256 _interestRate) external {
+        _accrue();
+        interestRate = _interestRate;
+    }
+
+    function setExitPenalty(uint256 _exitPenalty) external {
+        require(_exitPenalty <= BASIS_PRECISION, "!penalty");
+        require(exitPenaltySlope <= _exitPenalty, "!slope");
+        exitPenalty = _exitPenalty;
+    }
+
+    function setExitPenaltySlope(uint256 _exitPenaltySlope) external {
+        require(_exitPenaltySlope <= exitPenalty, "!slope");
+        exitPenaltySlope = _exitPenaltySlope;
+    }
+
+    // moves liquid want out to `msg.sender`, the pool value stays the same
+    function borrow(uint256 amount) external {
+        _accrue();
+        loansValue = loansValue.add(amount);
+        token.transfer(msg.sender, amount);
+    }
+
+    function repay(uint256 amount) external {
+        _accrue();
+        loansValue = loansValue.sub(amount);
+        token.transferFrom(msg.sender, address(this), amount);
+    }
+
+    function _interest() internal view returns (uint256) {
+        return
+            token
+                .balanceOf(address(this))
+                .mul(interestRate)
+                .mul(block.timestamp.sub(lastAccrual))
+                .div(BASIS_PRECISION)
+                .div(365 days);
+    }
+
+    function _accrue() internal {
+        uint256 interest = _interest();
+        if (interest > 0) {
+            token.mint(address(this), interest);
+        }
+        lastAccrual = block.timestamp;
+    }
+
+    function liquidValue() public view returns (uint256) {
+        return token.balanceOf(address(this)).add(_interest());
+    }
+
+    function poolValue() public view returns (uint256) {
+        return liquidValue().add(loansValue);
+    }
+
+    function join(uint256 amount) external {
+        _accrue();
+        uint256 value = poolValue();
+        uint256 amountToMint = amount;
+        if (totalSupply() > 0 && value > 0) {
+            amountToMint = amount.mul(totalSupply()).div(value);
+        }
+        token.transferFrom(msg.sender, address(this), amount);
+        _mint(msg.sender, amountToMint);
+        emit Joined(msg.sender, amount, amountToMint);
+    }
+
+    function collectFees() external {}
+
+    function liquidExitPenalty(uint256 amount) public view returns (uint256) {
+        uint256 liquid = liquidValue();
+        require(amount <= liquid, "not enough liquidity");
+        if (exitPenaltySlope == 0 || amount == 0) return exitPenalty;
+        return exitPenalty.sub(exitPenaltySlope.mul(amount).div(liquid));
+    }
+
+    function liquidExit(uint256 amount) external {
+        require(amount <= balanceOf(msg.sender), "insufficient funds");
+        _accrue();
+        uint256 amountToWithdraw = poolValue().mul(amount).div(totalSupply());
+        amountToWithdraw = amountToWithdraw
+            .mul(liquidExitPenalty(amountToWithdraw))
+            .div(BASIS_PRECISION);
+        _burn(msg.sender, amount);
+        token.transfer(msg.sender, amountToWithdraw);
+        emit Exited(msg.sender, amountToWithdraw);
+    }
+}
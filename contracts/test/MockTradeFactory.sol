@@ -0,0 +1,142 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+
+interface IMockSwapper {
+    function swap(
+        address _receiver,
+        address _tokenIn,
+        address _tokenOut,
+        uint256 _amountIn,
+        uint256 _minAmountOut,
+        bytes calldata _data
+    ) external returns (uint256);
+
+    function swapMultiple(bytes calldata _data) external;
+}
+
+// ySwap trade factory stand-in: strategies holding the STRATEGY role enable
+// token pairs and the deployer (ymechs) executes async trades for them.
+contract MockTradeFactory {
+    struct AsyncTradeExecutionDetails {
+        address _strategy;
+        address _tokenIn;
+        address _tokenOut;
+        uint256 _amount;
+        uint256 _minAmountOut;
+    }
+
+    bytes32 public constant STRATEGY = keccak256("STRATEGY");
+
+    address public governance;
+    mapping(bytes32 => mapping(address => bool)) public hasRole;
+    mapping(address => mapping(address => mapping(address => bool)))
+        public enabled;
+
+    constructor() public {
+        governance = msg.sender;
+    }
+
+    modifier onlyGovernance() {
+        require(msg.sender == governance, "!governance");
+        _;
+    }
+
+    function grantRole(bytes32 _role, address _account)
+        external
+        onlyGovernance
+    {
+        hasRole[_role][_account] = true;
+    }
+
+    function enable(address _tokenIn, address _tokenOut) external {
+        require(hasRole[STRATEGY][msg.sender], "!strategy");
+        enabled[msg.sender][_tokenIn][_tokenOut] = true;
+    }
+
+    function execute(
+        AsyncTradeExecutionDetails calldata _tradeExecutionDetails,
+        address _swapper,
+        bytes calldata _data
+    ) external onlyGovernance returns (uint256 _receivedAmount) {
+        address strategy = _tradeExecutionDetails._strategy;
+        address tokenIn = _tradeExecutionDetails._tokenIn;
+        address tokenOut = _tradeExecutionDetails._tokenOut;
+        require(enabled[strategy][tokenIn][tokenOut], "!enabled");
+
+        IERC20(tokenIn).transferFrom(
+            strategy,
+            _swapper,
+            _tradeExecutionDetails._amount
+        );
+        uint256 balanceBefore = IERC20(tokenOut).balanceOf(strategy);
+        IMockSwapper(_swapper).swap(
+            strategy,
+            tokenIn,
+            tokenOut,
+            _tradeExecutionDetails._amount,
+            _tradeExecutionDetails._minAmountOut,
+            _data
+        );
+        _receivedAmount = IERC20(tokenOut).balanceOf(strategy) - balanceBefore;
+        require(
+            _receivedAmount >= _tradeExecutionDetails._minAmountOut,
+            "InvalidAmountOut"
+        );
+    }
+
+    // several async trades settled by one multicall payload, e.g. the TRU of
+    // many strategies swapped in a single keeper transaction
+    function execute(
+        AsyncTradeExecutionDetails[] calldata _tradesDetails,
+        address _swapper,
+        bytes calldata _data
+    ) external onlyGovernance returns (uint256[] memory _receivedAmounts) {
+        uint256[] memory balancesBefore =
+            new uint256[](_tradesDetails.length);
+        for (uint256 i; i < _tradesDetails.length; i++) {
+            AsyncTradeExecutionDetails memory details = _tradesDetails[i];
+            require(
+                enabled[details._strategy][details._tokenIn][
+                    details._tokenOut
+                ],
+                "!enabled"
+            );
+            IERC20(details._tokenIn).transferFrom(
+                details._strategy,
+                _swapper,
+                details._amount
+            );
+            balancesBefore[i] = IERC20(details._tokenOut).balanceOf(
+                details._strategy
+            );
+        }
+
+        IMockSwapper(_swapper).swapMultiple(_data);
+
+        _receivedAmounts = new uint256[](_tradesDetails.length);
+        for (uint256 i; i < _tradesDetails.length; i++) {
+            AsyncTradeExecutionDetails memory details = _tradesDetails[i];
+            // a strategy listed twice for the same token sees both transfers
+            _receivedAmounts[i] =
+                IERC20(details._tokenOut).balanceOf(details._strategy) -
+                balancesBefore[i];
+            require(
+                _receivedAmounts[i] >= details._minAmountOut,
+                "InvalidAmountOut"
+            );
+        }
+    }
+
+    // sync trades by id are not used by this strategy
+    function execute(
+        uint256,
+        address,
+        uint256,
+        bytes calldata
+    ) external pure returns (uint256) {
+        revert("!supported");
+    }
+}
@@ -0,0 +1,92 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "@openzeppelin/contracts/token/ERC20/IERC20.sol";
+import "@openzeppelin/contracts/math/SafeMath.sol";
+
+// Constant-product router holding its own reserves per pair, with the
+// UniswapV2/Sushiswap 0.3% fee applied to every hop.
+contract MockUniRouter {
+    using SafeMath for uint256;
+
+    address public immutable WETH;
+    mapping(address => mapping(address => uint256)) public reserves;
+
+    constructor(address _weth) public {
+        WETH = _weth;
+    }
+
+    function addLiquidity(
+        address tokenA,
+        address tokenB,
+        uint256 amountA,
+        uint256 amountB
+    ) external {
+        IERC20(tokenA).transferFrom(msg.sender, address(this), amountA);
+        IERC20(tokenB).transferFrom(msg.sender, address(this), amountB);
+        reserves[tokenA][tokenB] = reserves[tokenA][tokenB].add(amountA);
+        reserves[tokenB][tokenA] = reserves[tokenB][tokenA].add(amountB);
+    }
+
+    function getReserves(address tokenA, address tokenB)
+        public
+        view
+        returns (uint256 reserveA, uint256 reserveB)
+    {
+        reserveA = reserves[tokenA][tokenB];
+        reserveB = reserves[tokenB][tokenA];
+    }
+
+    function getAmountOut(
+        uint256 amountIn,
+        uint256 reserveIn,
+        uint256 reserveOut
+    ) public pure returns (uint256) {
+        require(amountIn > 0, "INSUFFICIENT_INPUT_AMOUNT");
+        require(reserveIn > 0 && reserveOut > 0, "INSUFFICIENT_LIQUIDITY");
+        uint256 amountInWithFee = amountIn.mul(997);
+        uint256 numerator = amountInWithFee.mul(reserveOut);
+        uint256 denominator = reserveIn.mul(1000).add(amountInWithFee);
+        return numerator / denominator;
+    }
+
+    function getAmountsOut(uint256 amountIn, address[] memory path)
+        public
+        view
+        returns (uint256[] memory amounts)
+    {
+        require(path.length >= 2, "INVALID_PATH");
+        amounts = new uint256[](path.length);
+        amounts[0] = amountIn;
+        for (uint256 i; i < path.length - 1; i++) {
+            (uint256 reserveIn, uint256 reserveOut) =
+                getReserves(path[i], path[i + 1]);
+            amounts[i + 1] = getAmountOut(amounts[i], reserveIn, reserveOut);
+        }
+    }
+
+    function swapExactTokensForTokens(
+        uint256 amountIn,
+        uint256 amountOutMin,
+        address[] calldata path,
+        address to,
+        uint256 deadline
+    ) external returns (uint256[] memory amounts) {
+        require(deadline >= block.timestamp, "EXPIRED");
+        amounts = getAmountsOut(amountIn, path);
+        require(
+            amounts[amounts.length - 1] >= amountOutMin,
+            "INSUFFICIENT_OUTPUT_AMOUNT"
+        );
+        IERC20(path[0]).transferFrom(msg.sender, address(this), amountIn);
+        for (uint256 i; i < path.length - 1; i++) {
+            reserves[path[i]][path[i + 1]] = reserves[path[i]][path[i + 1]].add(
+                amounts[i]
+            );
+            reserves[path[i + 1]][path[i]] = reserves[path[i + 1]][path[i]].sub(
+                amounts[i + 1]
+            );
+        }
+        IERC20(path[path.length - 1]).transfer(to, amounts[amounts.length - 1]);
+    }
+}
@@ -0,0 +1,13 @@
+// SPDX-License-Identifier: AGPL-3.0
+pragma solidity 0.6.12;
+
+import "./MockERC20.sol";
+
+// Wraps ETH sent to it like WETH9, so `user.transfer(weth, x)` works locally
+contract MockWETH is MockERC20 {
+    constructor() public MockERC20("Wrapped Ether", "WETH", 18) {}
+
+    receive() external payable {
+        _mint(msg.sender, msg.value);
+    }
+}
@@ -0,0 +1,628 @@
+// SPDX-License-Identifier: AGPL-3.0
+// Feel free to change the license, but this is what we use
+
+// Feel free to change this version of Solidity. We support >=0.6.0 <0.7.0;
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import "../../interfaces/IPool.sol";
+import "../../interfaces/IGauge.sol";
+import "../../interfaces/IUnirouter.sol";
+import "@openzeppelin/contracts/math/Math.sol";
+
+import {
+    BaseStrategy,
+    StrategyParams
+} from "@yearnvaults/contracts/BaseStrategy.sol";
+import {
+    SafeERC20,
+    SafeMath,
+    IERC20,
+    Address
+} from "@openzeppelin/contracts/token/ERC20/SafeERC20.sol";
+
+import {IERC20Metadata} from "@yearnvaults/contracts/yToken.sol";
+import {ITradeFactory} from "../ySwap/ITradeFactory.sol";
+
+// Strategy.sol as it was before the storage and call-path gas pass, kept so
+// tests/test_gas_pass.py can check the optimized build against it.
+contract StrategyUnoptimized is BaseStrategy {
+    using SafeERC20 for IERC20;
+    using Address for address;
+    using SafeMath for uint256;
+
+    // gauge is the same for all pools, injected so tests can run on mocks
+    // mainnet: gauge 0xec6c3FD795D6e6f202825Ddb56E01b3c128b0b10
+    //          tru 0x4C19596f5aAfF459fA38B0f7eD92F11AE6543784
+    //          unirouter 0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F
+    IGauge public immutable gauge;
+    IERC20 public immutable tru;
+    address public immutable unirouter;
+    address public immutable weth;
+    uint256 internal immutable truUnit;
+
+    address[] public swapPath;
+    IPool public pool;
+    address public tradeFactory = address(0);
+
+    // refreshed on every harvest, used by the triggers to value rewards and
+    // the pool gain without pricing TRU on the spot
+    uint256 public truPrice; // want per 1 TRU
+    uint256 public lastVirtualPrice;
+
+    // idle want kept out of the pool to serve small withdrawals without a
+    // liquidExit, in bps of total assets. adjustPosition refills or drains it
+    // back to the target only once it leaves target +- band.
+    uint256 public bufferBps;
+    uint256 public bufferBandBps;
+
+    // compounding: harvest claims TRU itself once pendingRewards() reaches
+    // minRewardsToClaim, and the trade factory may only pull TRU once
+    // minRewardsToSell has piled up, so rewards are sold in fewer, larger
+    // swaps. The defaults keep claims manual and TRU always sellable.
+    uint256 public minRewardsToClaim = type(uint256).max;
+    uint256 public minRewardsToSell;
+
+    // pool and position state read once per transaction and passed down the
+    // harvest/withdraw paths instead of re-reading it in every helper.
+    // Only valid until the next join/exit/stake/unstake.
+    struct PoolSnapshot {
+        uint256 poolValue;
+        uint256 poolSupply;
+        uint256 lp;
+        uint256 staked;
+    }
+
+    constructor(
+        address _vault,
+        address _pool,
+        address _gauge,
+        address _tru,
+        address _unirouter,
+        address[] memory _swapPath
+    ) public BaseStrategy(_vault) {
+        pool = IPool(_pool);
+        require(pool.token() == want);
+        gauge = IGauge(_gauge);
+        tru = IERC20(_tru);
+        unirouter = _unirouter;
+        weth = IUnirouter(_unirouter).WETH();
+        truUnit = 10**uint256(IERC20Metadata(_tru).decimals());
+        // immutables can't be read during construction, check path against args
+        require(_tru == _swapPath[0], "illegal path!");
+        require(
+            address(want) == _swapPath[_swapPath.length - 1],
+            "illegal path!"
+        );
+        swapPath = _swapPath;
+
+        IERC20(_pool).approve(_gauge, type(uint256).max);
+        want.approve(_pool, type(uint256).max);
+        IERC20(_tru).approve(_unirouter, type(uint256).max);
+    }
+
+    // ******** OVERRIDE THESE METHODS FROM BASE CONTRACT ************
+
+    function name() external view override returns (string memory) {
+        return
+            string(
+                abi.encodePacked(
+                    "StrategyTruLender",
+                    IERC20Metadata(address(want)).symbol()
+                )
+            );
+    }
+
+    function balanceOfWant() public view returns (uint256) {
+        return IERC20(want).balanceOf(address(this));
+    }
+
+    function balanceOfWantInGauge() public view returns (uint256) {
+        return (balanceOfLPInGauge().mul(getVirtualPrice())).div(1e18);
+    }
+
+    function _balanceOfLP() internal view returns (uint256) {
+        return IERC20(address(pool)).balanceOf(address(this));
+    }
+
+    function balanceOfLPInGauge() public view returns (uint256) {
+        return gauge.staked(IERC20(address(pool)), address(this));
+    }
+
+    function totalLP() public view returns (uint256) {
+        return _balanceOfLP().add(balanceOfLPInGauge());
+    }
+
+    function totalLPtoWant() public view returns (uint256) {
+        return _totalLPtoWant(_poolSnapshot());
+    }
+
+    function getVirtualPrice() public view returns (uint256) {
+        return (pool.poolValue().mul(1e18)).div(pool.totalSupply());
+    }
+
+    function estimatedTotalAssets() public view override returns (uint256) {
+        return totalLPtoWant().add(balanceOfWant());
+    }
+
+    function _poolSnapshot() internal view returns (PoolSnapshot memory) {
+        return
+            PoolSnapshot(
+                pool.poolValue(),
+                pool.totalSupply(),
+                _balanceOfLP(),
+                balanceOfLPInGauge()
+            );
+    }
+
+    function _virtualPrice(PoolSnapshot memory _snap)
+        internal
+        pure
+        returns (uint256)
+    {
+        return (_snap.poolValue.mul(1e18)).div(_snap.poolSupply);
+    }
+
+    function _totalLPtoWant(PoolSnapshot memory _snap)
+        internal
+        pure
+        returns (uint256)
+    {
+        return
+            (_snap.lp.add(_snap.staked).mul(_virtualPrice(_snap))).div(1e18);
+    }
+
+    // pending TRU rewards in gauge
+    function pendingRewards() public view returns (uint256) {
+        return gauge.claimable(IERC20(address(pool)), address(this));
+    }
+
+    function balanceOfTruRewards() public view returns (uint256) {
+        return tru.balanceOf(address(this));
+    }
+
+    // LP positions penalty fee in terms of want
+    function exitPenaltyFeeLP(uint256 _amount) public view returns (uint256) {
+        return (10_000 - pool.liquidExitPenalty(_amount)).mul(_amount) / 10_000;
+    }
+
+    // LP positions penalty fee in terms of LP
+    function exitPenaltyFeeWant(uint256 _amount) public view returns (uint256) {
+        uint256 lpLoss =
+            (10_000 - pool.liquidExitPenalty(_amount)).mul(_amount) / 10_000;
+
+        return (lpLoss.mul(getVirtualPrice())).div(1e18);
+    }
+
+    function setSwapPath(address[] memory _swapPath)
+        external
+        onlyVaultManagers
+    {
+        _checkPath(_swapPath);
+        swapPath = _swapPath;
+    }
+
+    function setBuffer(uint256 _bufferBps, uint256 _bufferBandBps)
+        external
+        onlyVaultManagers
+    {
+        require(_bufferBps <= 10_000 && _bufferBandBps <= _bufferBps, "!buffer");
+        bufferBps = _bufferBps;
+        bufferBandBps = _bufferBandBps;
+    }
+
+    // buffer target and band for `_idle` want on top of the pool position
+    function _buffer(uint256 _idle, PoolSnapshot memory _snap)
+        internal
+        view
+        returns (uint256 _target, uint256 _band)
+    {
+        uint256 total = _totalLPtoWant(_snap).add(_idle);
+        _target = total.mul(bufferBps).div(10_000);
+        _band = total.mul(bufferBandBps).div(10_000);
+    }
+
+    function _checkPath(address[] memory _swapPath) internal {
+        require(address(tru) == _swapPath[0], "illegal path!");
+        require(
+            address(want) == _swapPath[_swapPath.length - 1],
+            "illegal path!"
+        );
+    }
+
+    function prepareReturn(uint256 _debtOutstanding)
+        internal
+        override
+        returns (
+            uint256 _profit,
+            uint256 _loss,
+            uint256 _debtPayment
+        )
+    {
+        require(tradeFactory != address(0), "Trade factory must be set.");
+
+        if (pendingRewards() >= minRewardsToClaim) {
+            _claimRewards();
+        }
+        _releaseRewards();
+
+        uint256 debt = vault.strategies(address(this)).totalDebt;
+        PoolSnapshot memory snap = _poolSnapshot();
+        _refreshPrices(snap);
+        uint256 wantBalance = balanceOfWant();
+        uint256 assets = _totalLPtoWant(snap).add(wantBalance);
+        if (debt > assets) {
+            _loss = debt.sub(assets);
+        } else {
+            _profit = assets.sub(debt);
+        }
+
+        uint256 toLiquidate = _debtOutstanding.add(_profit);
+        if (toLiquidate > 0) {
+            (uint256 _amountFreed, uint256 _withdrawalLoss) =
+                _liquidatePosition(toLiquidate, wantBalance, snap);
+            _debtPayment = Math.min(_debtOutstanding, _amountFreed);
+            _loss = _loss.add(_withdrawalLoss);
+        }
+
+        // net out PnL
+        if (_profit > _loss) {
+            _profit = _profit.sub(_loss);
+            _loss = 0;
+        } else {
+            _loss = _loss.sub(_profit);
+            _profit = 0;
+        }
+    }
+
+    function _claimRewards() internal {
+        if (pendingRewards() > 0) {
+            IERC20[] memory tmp = new IERC20[](1);
+            tmp[0] = IERC20(address(pool));
+            gauge.claim(tmp);
+        }
+    }
+
+    function claimRewards() external onlyVaultManagers {
+        _claimRewards();
+        if (tradeFactory != address(0)) {
+            _releaseRewards();
+        }
+    }
+
+    function setRewardThresholds(
+        uint256 _minRewardsToClaim,
+        uint256 _minRewardsToSell
+    ) external onlyVaultManagers {
+        minRewardsToClaim = _minRewardsToClaim;
+        minRewardsToSell = _minRewardsToSell;
+        if (tradeFactory != address(0)) {
+            _releaseRewards();
+        }
+    }
+
+    // lets the trade factory pull exactly the TRU held, once a batch worth
+    // selling has piled up
+    function _releaseRewards() internal {
+        uint256 balance = tru.balanceOf(address(this));
+        uint256 allowance = balance >= minRewardsToSell ? balance : 0;
+        uint256 current = tru.allowance(address(this), tradeFactory);
+        if (current == allowance) return;
+        if (current > 0) {
+            tru.safeApprove(tradeFactory, 0);
+        }
+        if (allowance > 0) {
+            tru.safeApprove(tradeFactory, allowance);
+        }
+    }
+
+    function _swapRewardToWant() internal {
+        uint256 rewards = tru.balanceOf(address(this));
+        if (rewards > 0) {
+            IUnirouter(unirouter).swapExactTokensForTokens(
+                rewards,
+                0,
+                swapPath,
+                address(this),
+                block.timestamp
+            );
+        }
+    }
+
+    function swapRewardToWant() external onlyVaultManagers {
+        _swapRewardToWant();
+    }
+
+    function adjustPosition(uint256 _debtOutstanding) internal override {
+        uint256 wantBalance = balanceOfWant();
+        uint256 idle =
+            wantBalance > _debtOutstanding ? wantBalance - _debtOutstanding : 0;
+        uint256 target;
+        uint256 band;
+        if (bufferBps > 0) {
+            PoolSnapshot memory snap = _poolSnapshot();
+            (target, band) = _buffer(idle, snap);
+            if (idle.add(band) < target) {
+                // buffer ran below the band, refill it to the target
+                _withdrawSome(target - idle, snap);
+            }
+        }
+        if (idle > target.add(band)) {
+            // supply to the pool get LP, keeping the buffer
+            pool.join(idle - target);
+        }
+        if (_balanceOfLP() > 0) {
+            // stake LP to earn TRU
+            gauge.stake(IERC20(address(pool)), _balanceOfLP());
+        }
+    }
+
+    function liquidatePosition(uint256 _amountNeeded)
+        internal
+        override
+        returns (uint256 _liquidatedAmount, uint256 _loss)
+    {
+        uint256 wantBalance = balanceOfWant();
+        if (wantBalance > _amountNeeded) {
+            // if there is enough free want, let's use it (no pool reads)
+            return (_amountNeeded, 0);
+        }
+        return _liquidatePosition(_amountNeeded, wantBalance, _poolSnapshot());
+    }
+
+    function _liquidatePosition(
+        uint256 _amountNeeded,
+        uint256 _wantBalance,
+        PoolSnapshot memory _snap
+    ) internal returns (uint256 _liquidatedAmount, uint256 _loss) {
+        if (_wantBalance > _amountNeeded) {
+            // if there is enough free want, let's use it
+            return (_amountNeeded, 0);
+        }
+
+        // we need to free funds
+
+        uint256 amountRequired = _amountNeeded.sub(_wantBalance);
+        _withdrawSome(amountRequired, _snap);
+        uint256 freeAssets = balanceOfWant();
+        if (_amountNeeded > freeAssets) {
+            _liquidatedAmount = freeAssets;
+            _loss = _amountNeeded.sub(_liquidatedAmount);
+        } else {
+            _liquidatedAmount = _amountNeeded;
+        }
+    }
+
+    function _withdrawSome(uint256 _amountWant, PoolSnapshot memory _snap)
+        internal
+    {
+        uint256 actualWithdrawn = _lpForWant(_amountWant, _snap);
+        gauge.unstake(IERC20(address(pool)), actualWithdrawn);
+        pool.liquidExit(actualWithdrawn);
+    }
+
+    // LP to liquidExit so that at least `_amountWant` is left after the exit
+    // penalty, capped at the staked LP. liquidExit charges the penalty at the
+    // gross (pre-penalty) size and it only grows with size, so iterating from
+    // the net amount settles on the gross one within a few rounds. TrueFi
+    // reverts both the penalty quote and the exit above the pool's liquid
+    // value, so the gross amount is capped there: an illiquid pool pays out
+    // what it can instead of reverting the withdrawal.
+    function _lpForWant(uint256 _amountWant, PoolSnapshot memory _snap)
+        internal
+        view
+        returns (uint256)
+    {
+        if (_amountWant == 0 || _snap.poolValue == 0) return 0;
+        uint256 liquid = pool.liquidValue();
+        uint256 gross = Math.min(_amountWant, liquid);
+        for (uint256 i = 0; i < 3 && gross > 0; i++) {
+            // share kept, 10_000 means no penalty
+            uint256 kept = pool.liquidExitPenalty(gross);
+            if (kept == 0) {
+                // nothing is paid out at any size, exit all that can go
+                gross = liquid;
+                break;
+            }
+            uint256 next =
+                Math.min(
+                    _amountWant.mul(10_000).add(kept - 1).div(kept),
+                    liquid
+                );
+            if (next == gross) break;
+            gross = next;
+        }
+        uint256 lp = gross.mul(_snap.poolSupply);
+        // liquidExit rounds down, so round the LP up, unless that would take
+        // it over the liquid value
+        if (gross < liquid) lp = lp.add(_snap.poolValue - 1);
+        return Math.min(lp.div(_snap.poolValue), _snap.staked);
+    }
+
+    // LP a withdrawal of `_amountWant` would liquidExit
+    function lpForWant(uint256 _amountWant) external view returns (uint256) {
+        return _lpForWant(_amountWant, _poolSnapshot());
+    }
+
+    function liquidateAllPositions() internal override returns (uint256) {
+        IERC20[] memory tmp = new IERC20[](1);
+        tmp[0] = IERC20(address(pool));
+        gauge.exit(tmp);
+        pool.liquidExit(_balanceOfLP());
+        return want.balanceOf(address(this));
+    }
+
+    function _refreshPrices(PoolSnapshot memory _snap) internal {
+        lastVirtualPrice = _virtualPrice(_snap);
+        // a failing quote must not block harvests, keep the last price
+        try
+            IUnirouter(unirouter).getAmountsOut(truUnit, swapPath)
+        returns (uint256[] memory amounts) {
+            truPrice = amounts[amounts.length - 1];
+        } catch {}
+    }
+
+    // profit a harvest would realize: pool gain since the last report net of
+    // the exit penalty paid to free it, plus TRU rewards at the cached price
+    function _realizableProfit(PoolSnapshot memory _snap, uint256 _totalDebt)
+        internal
+        view
+        returns (uint256 _profit)
+    {
+        uint256 virtualPrice = _virtualPrice(_snap);
+        if (lastVirtualPrice == 0) {
+            // never harvested, fall back to assets over debt
+            uint256 assets = _totalLPtoWant(_snap).add(balanceOfWant());
+            _profit = assets > _totalDebt ? assets.sub(_totalDebt) : 0;
+        } else if (virtualPrice > lastVirtualPrice) {
+            uint256 gainLP =
+                _snap.lp.add(_snap.staked).mul(virtualPrice - lastVirtualPrice).div(
+                    virtualPrice
+                );
+            uint256 penaltyLP =
+                (10_000 - pool.liquidExitPenalty(gainLP)).mul(gainLP) / 10_000;
+            _profit = gainLP.sub(penaltyLP).mul(virtualPrice).div(1e18);
+        }
+        uint256 rewards = pendingRewards().add(balanceOfTruRewards());
+        _profit = _profit.add(rewards.mul(truPrice).div(truUnit));
+    }
+
+    function harvestTrigger(uint256 callCostInWei)
+        public
+        view
+        override
+        returns (bool)
+    {
+        StrategyParams memory params = vault.strategies(address(this));
+        if (params.activation == 0) return false;
+        if (block.timestamp.sub(params.lastReport) < minReportDelay) {
+            return false;
+        }
+        if (block.timestamp.sub(params.lastReport) >= maxReportDelay) {
+            return true;
+        }
+        if (vault.debtOutstanding() > debtThreshold) return true;
+
+        PoolSnapshot memory snap = _poolSnapshot();
+        uint256 total = _totalLPtoWant(snap).add(balanceOfWant());
+        if (total.add(debtThreshold) < params.totalDebt) return true;
+
+        return
+            profitFactor.mul(ethToWant(callCostInWei)) <
+            vault.creditAvailable().add(
+                _realizableProfit(snap, params.totalDebt)
+            );
+    }
+
+    // idle want is worth investing if, at the pool rate seen since the last
+    // report, it earns more than the call costs before the next harvest
+    function tendTrigger(uint256 callCostInWei)
+        public
+        view
+        override
+        returns (bool)
+    {
+        if (lastVirtualPrice == 0) return false;
+        uint256 investable = _investable();
+        if (investable == 0) return false;
+
+        uint256 earned = _earnedUntilReport(investable);
+        // no router quote when nothing would be earned
+        return
+            earned > 0 && profitFactor.mul(ethToWant(callCostInWei)) < earned;
+    }
+
+    // idle want a tend would invest, nothing while it is inside the buffer
+    // band
+    function _investable() internal view returns (uint256) {
+        uint256 wantBalance = balanceOfWant();
+        uint256 outstanding = vault.debtOutstanding();
+        if (wantBalance <= outstanding) return 0;
+        uint256 idle = wantBalance - outstanding;
+        (uint256 target, uint256 band) = _buffer(idle, _poolSnapshot());
+        return idle > target.add(band) ? idle - target : 0;
+    }
+
+    // what `_amount` earns at the pool rate seen since the last report, if
+    // invested now, until maxReportDelay forces the next one
+    function _earnedUntilReport(uint256 _amount)
+        internal
+        view
+        returns (uint256)
+    {
+        uint256 elapsed =
+            block.timestamp.sub(vault.strategies(address(this)).lastReport);
+        uint256 virtualPrice = getVirtualPrice();
+        if (
+            elapsed == 0 ||
+            elapsed >= maxReportDelay ||
+            virtualPrice <= lastVirtualPrice
+        ) {
+            return 0;
+        }
+        return
+            _amount
+                .mul(virtualPrice - lastVirtualPrice)
+                .div(lastVirtualPrice)
+                .mul(maxReportDelay - elapsed)
+                .div(elapsed);
+    }
+
+    function prepareMigration(address _newStrategy) internal override {
+        if (balanceOfLPInGauge() > 0) {
+            IERC20[] memory tmp = new IERC20[](1);
+            tmp[0] = IERC20(address(pool));
+            // exit claims rewards and unstake all LP
+            gauge.exit(tmp);
+        }
+        tru.safeTransfer(_newStrategy, tru.balanceOf(address(this)));
+        IERC20(address(pool)).safeTransfer(_newStrategy, _balanceOfLP());
+    }
+
+    function protectedTokens()
+        internal
+        view
+        override
+        returns (address[] memory)
+    {}
+
+    function ethToWant(uint256 _amtInWei)
+        public
+        view
+        virtual
+        override
+        returns (uint256)
+    {
+        if (_amtInWei == 0 || address(want) == weth) {
+            return _amtInWei;
+        }
+        address[] memory path = new address[](2);
+        path[0] = weth;
+        path[1] = address(want);
+        return IUnirouter(unirouter).getAmountsOut(_amtInWei, path)[1];
+    }
+
+    // ----------------- YSWAPS FUNCTIONS ---------------------
+
+    function setTradeFactory(address _tradeFactory) external onlyGovernance {
+        if (tradeFactory != address(0)) {
+            _removeTradeFactoryPermissions();
+        }
+
+        // set up trade factory, TRU is approved once there is enough to sell
+        ITradeFactory tf = ITradeFactory(_tradeFactory);
+        tf.enable(address(tru), address(want));
+        tradeFactory = _tradeFactory;
+        _releaseRewards();
+    }
+
+    function removeTradeFactoryPermissions() external onlyEmergencyAuthorized {
+        _removeTradeFactoryPermissions();
+    }
+
+    function _removeTradeFactoryPermissions() internal {
+        tru.safeApprove(tradeFactory, 0);
+        tradeFactory = address(0);
+    }
+
+}
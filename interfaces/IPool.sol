@@ -11,6 +11,7 @@ interface IPool {
    function balanceOf(address account) external view returns (uint256);
    function totalSupply() external view returns (uint256);
    function poolValue() external view returns (uint256);
+   function liquidValue() external view returns (uint256);
    function join(uint256 amount) external;
    function collectFees() external ;
    function liquidExit(uint256 amount) external;
@@ -4,6 +4,8 @@ pragma solidity 0.6.12;
 pragma experimental ABIEncoderV2;
 
 interface IUnirouter {
+    function WETH() external pure returns (address);
+
     function swapExactTokensForTokens(
         uint amountIn,
         uint amountOutMin,
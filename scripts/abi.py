@@ -0,0 +1,14 @@
+"""
+eth-abi encoding under both toolchains: eth-abi 2.x (brownie <= 1.19, the
+Python 3.8 CI) names these encode_abi/decode_abi/encode_abi_packed, eth-abi 4+
+encode/decode/encode_packed.
+"""
+try:
+    from eth_abi import decode, encode
+    from eth_abi.packed import encode_packed
+except ImportError:
+    from eth_abi import decode_abi as decode
+    from eth_abi import encode_abi as encode
+    from eth_abi.packed import encode_abi_packed as encode_packed
+
+__all__ = ["decode", "encode", "encode_packed"]
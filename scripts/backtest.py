@@ -0,0 +1,355 @@
+"""
+Backtest of harvest cadence, buffer and swap threshold over historical series.
+
+Series live in a directory of memory-mapped .npy files, one per field of
+SERIES, a row per sample (per block or per hour). `ingest_csv` streams a CSV
+export into that layout and `synthetic_series` writes deterministic fixtures,
+so the backtest runs offline.
+
+The position is scripts/model.py, one scenario per parameter set, against
+the pool as a price taker: every harvest reads poolValue, totalSupply and
+liquidExitPenalty from the series, swaps the TRU earned since the last swap
+on the TRU/want reserves (0.3% fee) once it is worth `swap_threshold`, then
+runs prepareReturn/report/adjustPosition with the vault re-lending the
+profit. Between harvests the position is constant, so the rows are walked in
+chunks and every segment between two harvests is valued at once; only the
+harvests step the integer model. The gauge is assumed to hold the whole pool
+supply, so the strategy earns reward_rate * staked / totalSupply.
+
+Results per parameter set: net APR (gas included), exit penalty paid, gas
+spent, harvests and the largest drawdown of the position's value. Parameter
+sets are split over a process pool, each worker maps the same files.
+
+    brownie run backtest main [series dir] [workers]
+"""
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from scripts import model
+
+HOUR = 3600
+YEAR = 365 * 24 * HOUR
+MAX_BPS = 10_000
+SWAP_FEE = 997  # per mille kept by the TRU/want pair
+CHUNK_ROWS = 65_536
+
+SERIES = {
+    "timestamp": np.int64,
+    "pool_value": np.float64,  # pool.poolValue(), want base units
+    "pool_supply": np.float64,  # pool.totalSupply(), LP base units
+    "penalty": np.float64,  # pool.liquidExitPenalty(), 10_000 means none
+    "reward_rate": np.float64,  # gauge TRU per second for the pool, base units
+    "reserve_tru": np.float64,  # TRU/want pair reserves, base units
+    "reserve_want": np.float64,
+}
+
+
+class Params(NamedTuple):
+    cadence_hours: int = 24
+    buffer_bps: int = 0
+    band_bps: int = 0
+    swap_threshold: int = 0  # want base units
+
+
+class Config(NamedTuple):
+    assets: int = 1_000_000 * 10 ** 6  # want base units deposited at the start
+    harvest_gas: int = 600_000
+    gas_price_gwei: float = 40.0
+    want_per_eth: float = 3_000 * 10 ** 6
+
+
+def grid(**values):
+    """Every combination of the given Params fields, defaults for the rest"""
+    names = list(values)
+    return [Params(**dict(zip(names, v))) for v in itertools.product(*values.values())]
+
+
+DEFAULT_GRID = grid(
+    cadence_hours=(6, 24, 72, 168),
+    buffer_bps=(0, 50, 200),
+    band_bps=(0, 25),
+    swap_threshold=(0, 1_000 * 10 ** 6, 10_000 * 10 ** 6),
+)
+
+
+# ******** series ************
+
+
+def write_series(path, **columns):
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    missing = set(SERIES) - set(columns)
+    if missing:
+        raise ValueError(f"missing series {sorted(missing)}")
+    for name, dtype in SERIES.items():
+        np.save(path / f"{name}.npy", np.asarray(columns[name], dtype=dtype))
+
+
+def open_series(path):
+    """{field: read-only memmap}, checked for equal lengths and ordered time"""
+    path = Path(path)
+    series = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in SERIES}
+    lengths = {len(column) for column in series.values()}
+    if len(lengths) != 1:
+        raise ValueError(f"series in {path} have different lengths {sorted(lengths)}")
+    ts = series["timestamp"]
+    for start in range(1, len(ts), CHUNK_ROWS):
+        if (np.diff(ts[start - 1 : start + CHUNK_ROWS]) < 0).any():
+            raise ValueError(f"timestamps in {path} go back in time")
+    return series
+
+
+def ingest_csv(csv_path, path, chunk_rows=CHUNK_ROWS):
+    """Streams a CSV with a header naming every SERIES field into `path`"""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    with open(csv_path, newline="") as f:
+        rows = sum(1 for _ in f) - 1
+    columns = {
+        name: np.lib.format.open_memmap(
+            path / f"{name}.npy", mode="w+", dtype=dtype, shape=(rows,)
+        )
+        for name, dtype in SERIES.items()
+    }
+    with open(csv_path, newline="") as f:
+        reader = csv.DictReader(f)
+        missing = set(SERIES) - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"{csv_path} has no column {sorted(missing)}")
+        start = 0
+        while start < rows:
+            chunk = list(itertools.islice(reader, chunk_rows))
+            for name, column in columns.items():
+                column[start : start + len(chunk)] = [row[name] for row in chunk]
+            start += len(chunk)
+    for column in columns.values():
+        column.flush()
+    return open_series(path)
+
+
+def synthetic_series(path, hours=24 * 365, seed=0):
+    """
+    Hourly fixture: a pool earning ~5% with lumpy loan repayments, lenders
+    joining and leaving, the exit penalty spiking when liquidity runs low,
+    the gauge rate stepping down and a volatile TRU price.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(hours)
+    rate = 0.05 / (365 * 24) * (1 + 0.5 * rng.standard_normal(hours))
+    rate[rng.random(hours) < 0.0003] -= 0.005  # defaults
+    price = np.cumprod(1 + rate)
+    supply = 500_000_000 * 10 ** 6 * np.exp(np.cumsum(rng.normal(0, 0.002, hours)))
+    penalty = np.full(hours, 9_990.0)
+    squeezes = np.flatnonzero(rng.random(hours) < 0.01)
+    for start in squeezes:
+        penalty[start : start + 48] = rng.uniform(9_500, 9_950)
+    reward = np.where(t < hours // 2, 2.0, 1.0) * 10 ** 8
+    tru_usd = 0.2 * np.exp(np.cumsum(rng.normal(0, 0.01, hours)))
+    reserve_tru = np.full(hours, 20_000_000 * 10 ** 8 * 1.0)
+    write_series(
+        path,
+        timestamp=1_640_995_200 + t * HOUR,
+        pool_value=supply * price,
+        pool_supply=supply,
+        penalty=penalty,
+        reward_rate=reward,
+        reserve_tru=reserve_tru,
+        reserve_want=reserve_tru * tru_usd / 10 ** 8 * 10 ** 6,
+    )
+    return open_series(path)
+
+
+# ******** engine ************
+
+
+def _swap(amount_in, reserve_in, reserve_out):
+    amount_in = amount_in * SWAP_FEE
+    return amount_in * reserve_out / (reserve_in * 1_000 + amount_in)
+
+
+class _Run:
+    """The parameter sets of one worker, stepped through the rows in order"""
+
+    def __init__(self, params, config, row):
+        n = len(params)
+        self.config = config
+        self.cadence = np.array([p.cadence_hours * HOUR for p in params])
+        self.buffer_bps = model._ints([p.buffer_bps for p in params], n)
+        self.band_bps = model._ints([p.band_bps for p in params], n)
+        self.swap_threshold = np.array([p.swap_threshold for p in params], float)
+        self.s = model.StrategyState(
+            want=[config.assets] * n,
+            lp=[0] * n,
+            staked=[0] * n,
+            pool_value=[0] * n,
+            pool_supply=[1] * n,
+            penalty=[MAX_BPS] * n,
+            debt=[config.assets] * n,
+        )
+        self.tru = np.zeros(n)
+        self.gas = np.zeros(n, dtype=np.int64)
+        self.gas_cost = np.zeros(n)
+        self.penalty_paid = np.zeros(n, dtype=object)
+        self.harvests = np.zeros(n, dtype=np.int64)
+        self.swaps = np.zeros(n, dtype=np.int64)
+        self.peak = np.full(n, float(config.assets))
+        self.drawdown = np.zeros(n)
+        self.value = np.full(n, float(config.assets))
+        self.start = int(row["timestamp"])
+        self.previous = self.start
+        self.last_harvest = np.full(n, self.start)
+        # the first deposit is invested at the first row
+        self.harvest(np.arange(n), row)
+
+    def harvest(self, index, row):
+        s = self.s.take(index)
+        size = len(index)
+        s.pool_value = model._ints(row["pool_value"], size)
+        s.pool_supply = model._ints(row["pool_supply"], size)
+        s.penalty = model._ints(row["penalty"], size)
+
+        # ySwap sells the TRU once it is worth the threshold
+        worth = _swap(self.tru[index], row["reserve_tru"], row["reserve_want"])
+        sell = (worth > 0) & (worth >= self.swap_threshold[index])
+        s.want += model._ints(np.where(sell, np.floor(worth), 0), size)
+        self.tru[index[sell]] = 0
+        self.swaps[index[sell]] += 1
+
+        before = model.estimated_total_assets(s)
+        profit, loss, _ = model.prepare_return(s, 0)
+        # the vault takes the profit and lends it straight back
+        model.report(s, profit, 0, profit)
+        s.debt -= loss
+        model.adjust_position(s, 0, self.buffer_bps[index], self.band_bps[index])
+        self.penalty_paid[index] += before - model.estimated_total_assets(s)
+
+        for field in model.FIELDS:
+            getattr(self.s, field)[index] = getattr(s, field)
+        c = self.config
+        self.gas[index] += c.harvest_gas
+        self.gas_cost[index] += c.harvest_gas * c.gas_price_gwei * 1e-9 * c.want_per_eth
+        self.harvests[index] += 1
+        self.last_harvest[index] = int(row["timestamp"])
+
+    def segment(self, rows):
+        """Accrues TRU over the rows and values the position at each of them"""
+        ts = rows["timestamp"].astype(np.int64)
+        dt = np.diff(ts, prepend=self.previous)
+        self.previous = int(ts[-1])
+        lp = (self.s.staked + self.s.lp).astype(float)
+        want = self.s.want.astype(float)
+        earned = np.cumsum(rows["reward_rate"] * dt / rows["pool_supply"])
+        tru = self.tru[:, None] + lp[:, None] * earned[None, :]
+        price = rows["reserve_want"] / rows["reserve_tru"]
+        virtual_price = rows["pool_value"] / rows["pool_supply"]
+        value = (
+            lp[:, None] * virtual_price[None, :]
+            + want[:, None]
+            + tru * price[None, :]
+            - self.gas_cost[:, None]
+        )
+        peak = np.maximum(np.maximum.accumulate(value, axis=1), self.peak[:, None])
+        self.drawdown = np.maximum(self.drawdown, ((peak - value) / peak).max(axis=1))
+        self.peak = peak[:, -1]
+        self.tru = tru[:, -1]
+        self.value = value[:, -1]
+
+    def chunk(self, rows):
+        n = len(rows["timestamp"])
+        ts = rows["timestamp"]
+        i = 0
+        while i < n:
+            due = np.searchsorted(ts, self.last_harvest + self.cadence, side="left")
+            due = np.maximum(due, i)
+            end = int(due.min())
+            if end >= n:
+                self.segment({k: v[i:] for k, v in rows.items()})
+                return
+            self.segment({k: v[i : end + 1] for k, v in rows.items()})
+            self.harvest(
+                np.flatnonzero(due == end), {k: v[end] for k, v in rows.items()}
+            )
+            i = end + 1
+
+    def results(self):
+        years = max(self.previous - self.start, 1) / YEAR
+        assets = self.config.assets
+        return {
+            "net_apr": (self.value / assets - 1) / years,
+            "penalty": self.penalty_paid.astype(float),
+            "gas": self.gas,
+            "gas_cost": self.gas_cost,
+            "harvests": self.harvests,
+            "swaps": self.swaps,
+            "max_drawdown": self.drawdown,
+        }
+
+
+def run(path, params, config=Config(), chunk_rows=CHUNK_ROWS):
+    """Backtests `params` over the series in `path` in one process"""
+    series = open_series(path)
+    rows = len(series["timestamp"])
+    first = {k: v[0] for k, v in series.items()}
+    backtest = _Run(params, config, first)
+    for start in range(1, rows, chunk_rows):
+        backtest.chunk(
+            {k: np.asarray(v[start : start + chunk_rows]) for k, v in series.items()}
+        )
+    return backtest.results()
+
+
+def backtest(
+    path, params=DEFAULT_GRID, config=Config(), workers=None, chunk_rows=CHUNK_ROWS
+):
+    """`run` with the parameter sets split over a process pool, in order"""
+    workers = workers or os.cpu_count() or 1
+    slices = [s for s in np.array_split(np.arange(len(params)), workers) if len(s)]
+    if len(slices) == 1:
+        return run(path, params, config, chunk_rows)
+    with ProcessPoolExecutor(len(slices)) as pool:
+        parts = list(
+            pool.map(
+                run,
+                itertools.repeat(str(path)),
+                [[params[i] for i in s] for s in slices],
+                itertools.repeat(config),
+                itertools.repeat(chunk_rows),
+            )
+        )
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+def format_table(params, results, top=20, decimals=6):
+    order = np.argsort(-results["net_apr"])[:top]
+    lines = [
+        f"{'cadence h':>9}{'buffer':>8}{'band':>6}{'swap at':>10}{'net APR':>9}"
+        f"{'penalty':>12}{'gas':>12}{'harvests':>9}{'drawdown':>9}"
+    ]
+    for i in order:
+        p = params[i]
+        lines.append(
+            f"{p.cadence_hours:>9}{p.buffer_bps:>8}{p.band_bps:>6}"
+            f"{p.swap_threshold / 10 ** decimals:>10,.0f}"
+            f"{results['net_apr'][i]:>9.2%}"
+            f"{results['penalty'][i] / 10 ** decimals:>12,.2f}"
+            f"{results['gas_cost'][i] / 10 ** decimals:>12,.2f}"
+            f"{results['harvests'][i]:>9}{results['max_drawdown'][i]:>9.2%}"
+        )
+    return "\n".join(lines)
+
+
+def main(series=None, workers=None):
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if series is None:
+            synthetic_series(tmp)
+            series = tmp
+        results = backtest(series, DEFAULT_GRID, workers=int(workers or 0))
+    print(format_table(DEFAULT_GRID, results))
@@ -0,0 +1,454 @@
+"""
+Non-interactive deployment of many strategies from a manifest.
+
+    {
+      "deployer": "<brownie account id, or address on a dev/fork network>",
+      "governance": "<optional, sends the governance steps>",
+      "defaults": {"gauge": ..., "tru": ..., "unirouter": ..., "keeper": ...,
+                   "trade_factory": ..., "debt_ratio": 10000,
+                   "min_debt_per_harvest": 0, "max_debt_per_harvest": 2**256-1,
+                   "performance_fee": 1000},
+      "strategies": [
+        {"name": "usdc", "vault": ..., "pool": ..., "swap_path": [...]}, ...
+      ]
+    }
+
+Every entry is validated before anything is sent (API version of the vault,
+`pool.token() == want`, swap path endpoints and pairs, debt ratio headroom,
+governance). Steps are then sent in two waves, each pipelined with locally
+assigned nonces and confirmed at the end of the wave:
+
+    1. deployer:   deploy, setKeeper (to the address the deploy will create)
+    2. governance: setTradeFactory, addStrategy
+
+Without a governance account, the governance steps are queued with their
+calldata for the multisig. setTradeFactory waits until the trade factory has
+granted the strategy its STRATEGY role.
+
+The state file is written before and after every transaction. A rerun with
+the same state file waits for the transactions still in flight, checks every
+step against the chain and only sends what is missing.
+
+    brownie run deploy main <manifest> [state] --network ...
+"""
+import json
+import os
+import time
+
+import rlp
+from eth_utils import (
+    function_signature_to_4byte_selector,
+    keccak,
+    to_canonical_address,
+    to_checksum_address,
+)
+
+from scripts.abi import decode, encode
+
+MAX_BPS = 10_000
+DEFAULTS = {
+    "keeper": None,
+    "trade_factory": None,
+    "debt_ratio": MAX_BPS,
+    "min_debt_per_harvest": 0,
+    "max_debt_per_harvest": 2 ** 256 - 1,
+    "performance_fee": 1_000,
+}
+ADDRESSES = ("vault", "pool", "gauge", "tru", "unirouter", "keeper", "trade_factory")
+# sent before the strategy exists, so it cannot be estimated
+SET_KEEPER_GAS = 100_000
+GAS_BUFFER = 1.2
+
+DEPLOYER_STEPS = ("deploy", "setKeeper")
+GOVERNANCE_STEPS = ("setTradeFactory", "addStrategy")
+
+
+class ManifestError(Exception):
+    pass
+
+
+def contract_address(deployer, nonce):
+    """Address of the contract created by `deployer`'s transaction `nonce`"""
+    encoded = rlp.encode([to_canonical_address(deployer), nonce])
+    return to_checksum_address(keccak(encoded)[12:])
+
+
+def calldata(signature, *args):
+    types = signature[signature.index("(") + 1 : -1]
+    types = types.split(",") if types else []
+    return function_signature_to_4byte_selector(signature) + encode(types, list(args))
+
+
+def load_manifest(path):
+    with open(path) as f:
+        manifest = json.load(f)
+    entries, errors = [], []
+    defaults = dict(DEFAULTS, **manifest.get("defaults", {}))
+    for i, raw in enumerate(manifest.get("strategies", [])):
+        entry = dict(defaults, **raw)
+        entry.setdefault("name", str(i))
+        missing = [
+            k
+            for k in ("vault", "pool", "gauge", "tru", "unirouter", "swap_path")
+            if entry.get(k) is None
+        ]
+        if missing:
+            errors.append(f"{entry['name']}: missing {', '.join(missing)}")
+            continue
+        try:
+            for key in ADDRESSES:
+                if entry[key] is not None:
+                    entry[key] = to_checksum_address(entry[key])
+            entry["swap_path"] = [to_checksum_address(a) for a in entry["swap_path"]]
+        except ValueError as e:
+            errors.append(f"{entry['name']}: {e}")
+            continue
+        entries.append(entry)
+    names = [e["name"] for e in entries]
+    errors += [
+        f"{n}: duplicate name" for n in sorted({n for n in names if names.count(n) > 1})
+    ]
+    if errors:
+        raise ManifestError("\n".join(errors))
+    return manifest, entries
+
+
+class State:
+    """Progress of a run, saved atomically after every change"""
+
+    def __init__(self, path, chain_id):
+        self.path = path
+        self.data = {"chain_id": chain_id, "entries": {}}
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self.data = json.load(f)
+            if self.data["chain_id"] != chain_id:
+                raise ManifestError(
+                    f"{path} belongs to chain {self.data['chain_id']}, not {chain_id}"
+                )
+
+    def entry(self, name):
+        return self.data["entries"].setdefault(name, {"strategy": None, "steps": {}})
+
+    def step(self, name, step):
+        return self.entry(name)["steps"].get(step)
+
+    def set_step(self, name, step, **fields):
+        self.entry(name)["steps"][step] = fields
+        self.save()
+
+    def save(self):
+        if self.path is None:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+class Nonces:
+    """Next nonce per sender, so a wave can be sent without waiting"""
+
+    def __init__(self, web3):
+        self.web3 = web3
+        self._next = {}
+
+    def take(self, address):
+        if address not in self._next:
+            self._next[address] = self.web3.eth.get_transaction_count(
+                address, "pending"
+            )
+        nonce = self._next[address]
+        self._next[address] += 1
+        return nonce
+
+    def reset(self):
+        self._next = {}
+
+
+class BatchDeploy:
+    def __init__(
+        self,
+        entries,
+        deployer,
+        Strategy,
+        Vault,
+        web3,
+        governance=None,
+        state=None,
+        api_version=None,
+        timeout=600,
+    ):
+        self.entries = entries
+        self.deployer = deployer
+        self.governance = governance
+        self.Strategy = Strategy
+        self.Vault = Vault
+        self.web3 = web3
+        self.state = state or State(None, web3.eth.chain_id)
+        self.api_version = api_version
+        self.timeout = timeout
+        self.nonces = Nonces(web3)
+        self.sent = []  # (entry, step, txid) of this run
+
+    # ******** validation ************
+
+    def _call(self, to, signature, *args, returns="uint256"):
+        result = self.web3.eth.call({"to": to, "data": calldata(signature, *args)})
+        return decode([returns], bytes(result))[0]
+
+    def validate(self):
+        """Checks every entry against the chain, raises with all the problems"""
+        errors = []
+        headroom = {}
+        for e in self.entries:
+            name, path = e["name"], e["swap_path"]
+            try:
+                vault = self.Vault.at(e["vault"])
+                want = to_checksum_address(vault.token())
+                if self.api_version and vault.apiVersion() != self.api_version:
+                    errors.append(
+                        f"{name}: vault is {vault.apiVersion()}, not {self.api_version}"
+                    )
+                pool_token = self._call(e["pool"], "token()", returns="address")
+                if to_checksum_address(pool_token) != want:
+                    errors.append(f"{name}: pool token is not the vault token")
+                if len(path) < 2 or path[0] != e["tru"] or path[-1] != want:
+                    errors.append(f"{name}: swap path must go from TRU to want")
+                else:
+                    # reverts when a pair of the path does not exist
+                    self._call(
+                        e["unirouter"],
+                        "getAmountsOut(uint256,address[])",
+                        10 ** 18,
+                        path,
+                        returns="uint256[]",
+                    )
+                if (
+                    self.governance is not None
+                    and vault.governance() != self.governance
+                ):
+                    errors.append(
+                        f"{name}: governance of the vault is {vault.governance()}"
+                    )
+                if not self._done(e, "addStrategy"):
+                    if e["vault"] not in headroom:
+                        headroom[e["vault"]] = MAX_BPS - vault.debtRatio()
+                    headroom[e["vault"]] -= e["debt_ratio"]
+                    if headroom[e["vault"]] < 0:
+                        errors.append(f"{name}: vault debt ratio would exceed 100%")
+            except Exception as exc:
+                errors.append(f"{name}: {type(exc).__name__} {exc}")
+        if errors:
+            raise ManifestError("\n".join(errors))
+
+    # ******** on-chain status of the steps ************
+
+    def _strategy(self, e):
+        address = self.state.entry(e["name"])["strategy"]
+        if address is None or not self.web3.eth.get_code(address):
+            return None
+        return self.Strategy.at(address)
+
+    def _done(self, e, step):
+        strategy = self._strategy(e)
+        if strategy is None:
+            return False
+        if step == "deploy":
+            return strategy.vault() == e["vault"]
+        if step == "setKeeper":
+            return e["keeper"] is None or strategy.keeper() == e["keeper"]
+        if step == "setTradeFactory":
+            return (
+                e["trade_factory"] is None
+                or strategy.tradeFactory() == e["trade_factory"]
+            )
+        if step == "addStrategy":
+            return (
+                self.Vault.at(e["vault"]).strategies(strategy).dict()["activation"] > 0
+            )
+        raise KeyError(step)
+
+    def _settle(self):
+        """Waits for the transactions a previous run left in flight"""
+        deadline = time.monotonic() + self.timeout
+        for e in self.entries:
+            for step, record in self.state.entry(e["name"])["steps"].items():
+                if record.get("status") != "sent":
+                    continue
+                while (
+                    self.web3.eth.get_transaction_count(record["from"])
+                    <= record["nonce"]
+                    and time.monotonic() < deadline
+                ):
+                    time.sleep(1)
+                status = "done" if self._done(e, step) else "failed"
+                self.state.set_step(e["name"], step, **dict(record, status=status))
+
+    # ******** sending ************
+
+    def _send(self, e, step, account, to, data, gas=None):
+        nonce = self.nonces.take(account.address)
+        record = {
+            "status": "sent",
+            "from": account.address,
+            "nonce": nonce,
+            "to": to,
+            "data": "0x" + data.hex(),
+        }
+        # saved before broadcasting, so an interrupted run knows the nonce
+        self.state.set_step(e["name"], step, **record)
+        params = {"nonce": nonce, "required_confs": 0}
+        if gas is not None:
+            params["gas_limit"] = gas
+        tx = account.transfer(to, 0, data=record["data"], **params)
+        self.state.set_step(e["name"], step, **dict(record, txid=tx.txid))
+        self.sent.append((e["name"], step, tx.txid))
+
+    def _deploy(self, e):
+        nonce = self.nonces.take(self.deployer.address)
+        address = contract_address(self.deployer.address, nonce)
+        self.state.entry(e["name"])["strategy"] = address
+        record = {"status": "sent", "from": self.deployer.address, "nonce": nonce}
+        self.state.set_step(e["name"], "deploy", **record)
+        deployed = self.Strategy.deploy(
+            e["vault"],
+            e["pool"],
+            e["gauge"],
+            e["tru"],
+            e["unirouter"],
+            e["swap_path"],
+            {"from": self.deployer, "nonce": nonce, "required_confs": 0},
+        )
+        # the receipt, or the contract when it was mined right away
+        tx = getattr(deployed, "tx", deployed)
+        self.state.set_step(e["name"], "deploy", **dict(record, txid=tx.txid))
+        self.sent.append((e["name"], "deploy", tx.txid))
+
+    def _queue(self, e, step, to, data, reason=None):
+        record = {"status": "queued", "to": to, "data": "0x" + data.hex()}
+        if reason is not None:
+            record["reason"] = reason
+        self.state.set_step(e["name"], step, **record)
+
+    def _confirm(self, wave):
+        """Waits for the transactions of a wave and records their outcome"""
+        for name, step, txid in wave:
+            receipt = self.web3.eth.wait_for_transaction_receipt(
+                txid, timeout=self.timeout
+            )
+            e = next(e for e in self.entries if e["name"] == name)
+            record = self.state.step(name, step)
+            ok = receipt["status"] == 1 and self._done(e, step)
+            self.state.set_step(
+                name, step, **dict(record, status="done" if ok else "failed")
+            )
+
+    def _deployer_wave(self):
+        start = len(self.sent)
+        for e in self.entries:
+            if self._done(e, "deploy"):
+                self.state.set_step(e["name"], "deploy", status="done")
+            else:
+                self._deploy(e)
+            if e["keeper"] is None:
+                continue
+            if self._done(e, "setKeeper"):
+                self.state.set_step(e["name"], "setKeeper", status="done")
+                continue
+            strategy = self.state.entry(e["name"])["strategy"]
+            data = calldata("setKeeper(address)", e["keeper"])
+            self._send(e, "setKeeper", self.deployer, strategy, data, SET_KEEPER_GAS)
+        self._confirm(self.sent[start:])
+
+    def _governance_wave(self):
+        start = len(self.sent)
+        for e in self.entries:
+            if not self._done(e, "deploy"):
+                continue
+            strategy = self._strategy(e)
+            vault = self.Vault.at(e["vault"])
+            steps = []
+            if e["trade_factory"] is None:
+                pass
+            elif not self._done(e, "setTradeFactory"):
+                role = self._call(e["trade_factory"], "STRATEGY()", returns="bytes32")
+                granted = self._call(
+                    e["trade_factory"],
+                    "hasRole(bytes32,address)",
+                    role,
+                    strategy.address,
+                    returns="bool",
+                )
+                data = calldata("setTradeFactory(address)", e["trade_factory"])
+                if not granted:
+                    self._queue(
+                        e,
+                        "setTradeFactory",
+                        strategy.address,
+                        data,
+                        "trade factory has not granted the STRATEGY role",
+                    )
+                else:
+                    steps.append(("setTradeFactory", strategy.address, data))
+            else:
+                self.state.set_step(e["name"], "setTradeFactory", status="done")
+            if not self._done(e, "addStrategy"):
+                data = bytes.fromhex(
+                    vault.addStrategy.encode_input(
+                        strategy,
+                        e["debt_ratio"],
+                        e["min_debt_per_harvest"],
+                        e["max_debt_per_harvest"],
+                        e["performance_fee"],
+                    )[2:]
+                )
+                steps.append(("addStrategy", vault.address, data))
+            else:
+                self.state.set_step(e["name"], "addStrategy", status="done")
+
+            for step, to, data in steps:
+                if self.governance is None:
+                    self._queue(e, step, to, data)
+                    continue
+                gas = self.web3.eth.estimate_gas(
+                    {"from": self.governance.address, "to": to, "data": data}
+                )
+                self._send(e, step, self.governance, to, data, int(gas * GAS_BUFFER))
+        self._confirm(self.sent[start:])
+
+    def run(self):
+        self._settle()
+        self.validate()
+        self._deployer_wave()
+        # the governance wave needs the strategies and the nonces of this run
+        self.nonces.reset()
+        self._governance_wave()
+        return self.summary()
+
+    def summary(self):
+        rows = {}
+        for e in self.entries:
+            entry = self.state.entry(e["name"])
+            rows[e["name"]] = {
+                "strategy": entry["strategy"],
+                **{s: r.get("status") for s, r in entry["steps"].items()},
+            }
+        return rows
+
+
+def format_summary(summary, state):
+    steps = DEPLOYER_STEPS + GOVERNANCE_STEPS
+    lines = [f"{'name':<12}{'strategy':<44}" + "".join(f"{s:>17}" for s in steps)]
+    for name, row in summary.items():
+        lines.append(
+            f"{name:<12}{row['strategy'] or '-':<44}"
+            + "".join(f"{row.get(s) or '-':>17}" for s in steps)
+        )
+    for name, entry in state.data["entries"].items():
+        for step, record in entry["steps"].items():
+            if record.get("status") == "queued":
+                reason = f"  ({record['reason']})" if "reason" in record else ""
+                lines.append(f"queued {name} {step}: to {record['to']}{reason}")
+                lines.append(f"  data {record['data']}")
+    return "\n".join(lines)
@@ -0,0 +1,377 @@
+"""
+Typed client for a deployed Strategy and its vault, views memoized per block.
+
+Every view is read at most once per block: results are cached under the block
+number they were read at, the last `cache_blocks` blocks are kept. The current
+block is asked from the node at most every `poll_interval` seconds (0, the
+default, asks before every read that misses the cache) and moves to the
+receipt's block after a transaction sent through the client, so a new block
+never serves the previous one's values. Immutables (vault, want, pool, gauge,
+tru, unirouter) are read once.
+
+`prefetch` fills a block with every view `position` needs in a single
+Multicall2.tryAggregate eth_call, through the `Batch` and the strategy views
+of scripts/reader.py.
+
+    brownie run client main <strategy> [<multicall>] --network ...
+"""
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+from brownie import web3
+from brownie.exceptions import VirtualMachineError
+
+from scripts import reader
+
+MAX_HOPS = 4
+# strategy views without arguments read by `prefetch`, the fleet reader's and
+# these
+STRATEGY_VIEWS = tuple(fn for _, fn in reader.STRATEGY_VIEWS) + (
+    "balanceOfWant",
+    "totalLPtoWant",
+    "truPrice",
+    "lastVirtualPrice",
+    "bufferBps",
+    "bufferBandBps",
+    "tradeFactory",
+)
+
+
+class StrategyParams(NamedTuple):
+    """vault.strategies(strategy)"""
+
+    performance_fee: int
+    activation: int
+    debt_ratio: int
+    min_debt_per_harvest: int
+    max_debt_per_harvest: int
+    last_report: int
+    total_debt: int
+    total_gain: int
+    total_loss: int
+
+
+class Position(NamedTuple):
+    block: int
+    want: int
+    total_lp: int
+    lp_in_gauge: int
+    virtual_price: int
+    estimated_total_assets: int
+    exit_penalty_fee: int  # exitPenaltyFeeWant(totalLP())
+    nav: int  # estimated_total_assets - exit_penalty_fee
+    tru: int  # claimable and held TRU
+    tru_in_want: int  # that TRU quoted along the swap path
+    total_debt: int
+
+    @property
+    def unrealized(self) -> int:
+        """What a full exit and a swap of the TRU would report against the debt"""
+        return self.nav + self.tru_in_want - self.total_debt
+
+
+class StrategyClient:
+    def __init__(
+        self,
+        strategy,
+        vault=None,
+        multicall=None,
+        poll_interval: float = 0.0,
+        cache_blocks: int = 16,
+    ):
+        from brownie import interface
+
+        self.strategy = strategy
+        self.vault = vault or interface.VaultAPI(strategy.vault())
+        self.multicall = multicall
+        self.poll_interval = poll_interval
+        self.cache_blocks = cache_blocks
+        # RPC requests sent: eth_call, eth_blockNumber and transactions
+        self.requests = 0
+        self._cache = OrderedDict()  # block => {(address, view, args): value}
+        self._immutables = {}
+        self._router = None
+        self._batch = None
+        self._block = None
+        self._checked = 0.0
+
+    # ******** blocks ************
+
+    @property
+    def block(self) -> int:
+        now = time.monotonic()
+        if self._block is None or now - self._checked >= self.poll_interval:
+            self.requests += 1
+            self._at(web3.eth.block_number, now)
+        return self._block
+
+    def _at(self, block, now=None):
+        self._block = block
+        self._checked = time.monotonic() if now is None else now
+
+    def _values(self, block):
+        if block not in self._cache:
+            self._cache[block] = {}
+            while len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+        return self._cache.get(block, {})
+
+    def _read(self, contract, view, *args, block=None):
+        block = self.block if block is None else block
+        key = (contract.address, view, args)
+        values = self._values(block)
+        if key not in values:
+            self.requests += 1
+            values[key] = getattr(contract, view).call(*args, block_identifier=block)
+        return values[key]
+
+    def _immutable(self, name):
+        if name not in self._immutables:
+            self.requests += 1
+            self._immutables[name] = getattr(self.strategy, name)()
+        return self._immutables[name]
+
+    # ******** immutables ************
+
+    @property
+    def want(self) -> str:
+        return self._immutable("want")
+
+    @property
+    def pool(self) -> str:
+        return self._immutable("pool")
+
+    @property
+    def gauge(self) -> str:
+        return self._immutable("gauge")
+
+    @property
+    def tru(self) -> str:
+        return self._immutable("tru")
+
+    @property
+    def unirouter(self) -> str:
+        return self._immutable("unirouter")
+
+    # ******** strategy views ************
+
+    def balance_of_want(self, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "balanceOfWant", block=block)
+
+    def total_lp(self, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "totalLP", block=block)
+
+    def lp_in_gauge(self, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "balanceOfLPInGauge", block=block)
+
+    def total_lp_to_want(self, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "totalLPtoWant", block=block)
+
+    def virtual_price(self, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "getVirtualPrice", block=block)
+
+    def estimated_total_assets(self, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "estimatedTotalAssets", block=block)
+
+    def pending_rewards(self, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "pendingRewards", block=block)
+
+    def tru_rewards(self, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "balanceOfTruRewards", block=block)
+
+    def tru_price(self, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "truPrice", block=block)
+
+    def last_virtual_price(self, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "lastVirtualPrice", block=block)
+
+    def buffer_bps(self, block: Optional[int] = None) -> Tuple[int, int]:
+        """(bufferBps, bufferBandBps)"""
+        return (
+            self._read(self.strategy, "bufferBps", block=block),
+            self._read(self.strategy, "bufferBandBps", block=block),
+        )
+
+    def trade_factory(self, block: Optional[int] = None) -> str:
+        return self._read(self.strategy, "tradeFactory", block=block)
+
+    def exit_penalty_fee_lp(self, amount: int, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "exitPenaltyFeeLP", amount, block=block)
+
+    def exit_penalty_fee_want(self, amount: int, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "exitPenaltyFeeWant", amount, block=block)
+
+    def total_exit_penalty_fee(self, block: Optional[int] = None) -> int:
+        """exitPenaltyFeeWant(totalLP())"""
+        return self._read(self.strategy, "totalExitPenaltyFee", block=block)
+
+    def lp_for_want(self, amount: int, block: Optional[int] = None) -> int:
+        return self._read(self.strategy, "lpForWant", amount, block=block)
+
+    def harvest_trigger(self, call_cost: int, block: Optional[int] = None) -> bool:
+        return self._read(self.strategy, "harvestTrigger", call_cost, block=block)
+
+    def tend_trigger(self, call_cost: int, block: Optional[int] = None) -> bool:
+        return self._read(self.strategy, "tendTrigger", call_cost, block=block)
+
+    def swap_path(self, block: Optional[int] = None) -> Tuple[str, ...]:
+        block = self.block if block is None else block
+        key = (self.strategy.address, "swapPath", ())
+        values = self._values(block)
+        if key not in values:
+            path = []
+            # the getter asserts on an index past the end
+            for i in range(MAX_HOPS + 1):
+                try:
+                    path.append(self._read(self.strategy, "swapPath", i, block=block))
+                except VirtualMachineError:
+                    break
+            values[key] = tuple(path)
+        return values[key]
+
+    # ******** vault views ************
+
+    def params(self, block: Optional[int] = None) -> StrategyParams:
+        return StrategyParams(
+            *self._read(self.vault, "strategies", self.strategy.address, block=block)
+        )
+
+    def price_per_share(self, block: Optional[int] = None) -> int:
+        return self._read(self.vault, "pricePerShare", block=block)
+
+    def debt_outstanding(self, block: Optional[int] = None) -> int:
+        return self._read(
+            self.vault, "debtOutstanding", self.strategy.address, block=block
+        )
+
+    def credit_available(self, block: Optional[int] = None) -> int:
+        return self._read(
+            self.vault, "creditAvailable", self.strategy.address, block=block
+        )
+
+    # ******** derived ************
+
+    def penalty_adjusted_nav(self, block: Optional[int] = None) -> int:
+        """Want a full liquidExit would leave the strategy with right now"""
+        block = self.block if block is None else block
+        return self.estimated_total_assets(block) - self.total_exit_penalty_fee(block)
+
+    def realizable_tru(self, block: Optional[int] = None) -> Tuple[int, int]:
+        """Claimable and held TRU, and the want it quotes along the swap path"""
+        from brownie import interface
+
+        block = self.block if block is None else block
+        amount = self.pending_rewards(block) + self.tru_rewards(block)
+        if amount == 0:
+            return 0, 0
+        if self._router is None:
+            self._router = interface.IUnirouter(self.unirouter)
+        path = self.swap_path(block)
+        return (
+            amount,
+            self._read(self._router, "getAmountsOut", amount, path, block=block)[-1],
+        )
+
+    def position(self, block: Optional[int] = None) -> Position:
+        block = self.block if block is None else block
+        eta = self.estimated_total_assets(block)
+        fee = self.total_exit_penalty_fee(block)
+        tru, tru_in_want = self.realizable_tru(block)
+        return Position(
+            block,
+            self.balance_of_want(block),
+            self.total_lp(block),
+            self.lp_in_gauge(block),
+            self.virtual_price(block),
+            eta,
+            fee,
+            eta - fee,
+            tru,
+            tru_in_want,
+            self.params(block).total_debt,
+        )
+
+    # ******** batching ************
+
+    def prefetch(self, block: Optional[int] = None) -> int:
+        """
+        Reads the strategy views, the swap path and the vault views of `block`
+        in one eth_call. Without a multicall the views are read one by one.
+        Returns the block.
+        """
+        block = self.block if block is None else block
+        strategy, vault = self.strategy, self.vault
+        calls = [(strategy, view, ()) for view in STRATEGY_VIEWS]
+        calls += [(strategy, "swapPath", (i,)) for i in range(MAX_HOPS + 1)]
+        calls += [
+            (vault, "strategies", (strategy.address,)),
+            (vault, "pricePerShare", ()),
+            (vault, "debtOutstanding", (strategy.address,)),
+            (vault, "creditAvailable", (strategy.address,)),
+        ]
+
+        if self.multicall is None:
+            for contract, view, args in calls:
+                if view != "swapPath":
+                    self._read(contract, view, *args, block=block)
+            self.swap_path(block)
+            return block
+
+        if self._batch is None:
+            self._batch = reader.Batch(self.multicall, calls)
+        eth_calls = self._batch.eth_calls
+        values = self._batch.read(block)
+        self.requests += self._batch.eth_calls - eth_calls
+        cached = self._values(block)
+        path = []
+        for (contract, view, args), value in zip(calls, values):
+            # reverted, e.g. swapPath past the end
+            if value is None:
+                continue
+            cached[(contract.address, view, args)] = value
+            if view == "swapPath":
+                path.append(value)
+        cached[(strategy.address, "swapPath", ())] = tuple(path)
+        return block
+
+    # ******** transactions ************
+
+    def transact(self, method: str, *args, sender):
+        """Sends strategy.<method>(*args) and moves to the receipt's block"""
+        self.requests += 1
+        tx = getattr(self.strategy, method)(*args, {"from": sender})
+        self._at(tx.block_number)
+        return tx
+
+    def harvest(self, sender):
+        return self.transact("harvest", sender=sender)
+
+    def tend(self, sender):
+        return self.transact("tend", sender=sender)
+
+
+def format_position(p: Position, decimals: int = 6) -> str:
+    unit = 10 ** decimals
+    lines = [
+        f"block                  {p.block}",
+        f"estimatedTotalAssets   {p.estimated_total_assets / unit:,.2f}",
+        f"exit penalty           {p.exit_penalty_fee / unit:,.2f}",
+        f"penalty adjusted NAV   {p.nav / unit:,.2f}",
+        f"TRU in want            {p.tru_in_want / unit:,.2f}",
+        f"total debt             {p.total_debt / unit:,.2f}",
+        f"unrealized             {p.unrealized / unit:,.2f}",
+    ]
+    return "\n".join(lines)
+
+
+def main(strategy, multicall=None):
+    from brownie import Multicall2, Strategy
+
+    client = StrategyClient(
+        Strategy.at(strategy),
+        multicall=Multicall2.at(multicall) if multicall else None,
+    )
+    client.prefetch()
+    print(format_position(client.position(), client.vault.decimals()))
+    print(f"{client.requests} RPC requests")
@@ -1,10 +1,15 @@
+import os
 from pathlib import Path
 
-from brownie import Strategy, accounts, config, network, project, web3
+from brownie import Strategy, accounts, config, interface, network, project, web3
 from eth_utils import is_checksum_address
 import click
 
 API_VERSION = config["dependencies"][0].split("@")[-1]
+# mainnet TrueFi gauge, TRU and Uniswap v2 router (see contracts/Strategy.sol)
+GAUGE = "0xec6c3FD795D6e6f202825Ddb56E01b3c128b0b10"
+TRU = "0x4C19596f5aAfF459fA38B0f7eD92F11AE6543784"
+UNIROUTER = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
 Vault = project.load(
     Path.home() / ".brownie" / "packages" / config["dependencies"][0]
 ).Vault
@@ -29,8 +34,39 @@ def get_address(msg: str, default: str = None) -> str:
         val = click.prompt(msg)
 
 
-def main():
+def load_account(ref):
+    """Unlocked address on dev/fork networks, brownie account id otherwise"""
+    if is_checksum_address(ref):
+        return accounts.at(ref, force=True)
+    return accounts.load(ref, password=os.environ.get("BROWNIE_ACCOUNT_PASSWORD"))
+
+
+def deploy_manifest(manifest_path, state_path=None):
+    from scripts.batch_deploy import BatchDeploy, State, format_summary, load_manifest
+
+    manifest, entries = load_manifest(manifest_path)
+    if state_path is None:
+        state_path = f"{manifest_path}.state.json"
+    state = State(state_path, web3.eth.chain_id)
+    governance = manifest.get("governance")
+    batch = BatchDeploy(
+        entries,
+        load_account(manifest["deployer"]),
+        Strategy,
+        Vault,
+        web3,
+        governance=load_account(governance) if governance else None,
+        state=state,
+        api_version=API_VERSION,
+    )
+    print(format_summary(batch.run(), state))
+
+
+def main(manifest=None, state=None):
     print(f"You are using the '{network.show_active()}' network")
+    if manifest is not None:
+        return deploy_manifest(manifest, state)
+
     dev = accounts.load(click.prompt("Account", type=click.Choice(accounts.load())))
     print(f"You are using: 'dev' [{dev.address}]")
 
@@ -51,8 +87,23 @@ def main():
     symbol: '{vault.symbol()}'
     """
     )
+    pool = get_address("TrueFi pool: ")
+    gauge = get_address("Gauge: ", default=GAUGE)
+    tru = get_address("TRU: ", default=TRU)
+    unirouter = get_address("Uniswap router: ", default=UNIROUTER)
+    # TRU is sold through WETH
+    swap_path = [tru, interface.IUnirouter(unirouter).WETH(), vault.token()]
     publish_source = click.confirm("Verify source on etherscan?")
     if input("Deploy Strategy? y/[N]: ").lower() != "y":
         return
 
-    strategy = Strategy.deploy(vault, {"from": dev}, publish_source=publish_source)
+    strategy = Strategy.deploy(
+        vault,
+        pool,
+        gauge,
+        tru,
+        unirouter,
+        swap_path,
+        {"from": dev},
+        publish_source=publish_source,
+    )
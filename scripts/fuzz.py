@@ -0,0 +1,490 @@
+"""
+Stateful differential fuzzing of the vault + strategy.
+
+Hypothesis drives random sequences of deposits, partial withdrawals, debt
+ratio changes, pool gains/losses, exit penalty changes, harvests, emergency
+exits and migrations against `Sim`, an integer model of one Yearn 0.4.3
+vault with this strategy as its only strategy (scripts/model.py for the
+strategy side). The model runs thousands of steps per second; failing
+sequences are shrunk by Hypothesis, and only those plus the sequences
+reaching new combinations of `features` are kept in the corpus to be
+replayed on a local chain by `replay`, which compares every step to the
+model.
+
+The vault is modelled without fees and with profit unlocking after one
+second, which `prepare_chain` configures; the mock pool must not accrue
+interest. Pool gains are donations to (and losses burns from) the pool.
+
+    brownie run fuzz main [examples] [steps] --network development
+"""
+import time
+from typing import NamedTuple, Tuple
+
+from hypothesis import HealthCheck, settings
+from hypothesis import strategies as st
+from hypothesis.stateful import (
+    RuleBasedStateMachine,
+    invariant,
+    precondition,
+    rule,
+    run_state_machine_as_test,
+)
+
+from scripts import model
+
+MAX_BPS = 10_000
+USERS = 3
+UNIT = 10 ** 6
+
+
+class Revert(Exception):
+    pass
+
+
+class Op(NamedTuple):
+    kind: str
+    args: Tuple[int, ...] = ()
+
+
+class Sim:
+    def __init__(self, s, debt_ratio=MAX_BPS, idle=0, supply=0, shares=None):
+        self.s = s
+        self.debt_ratio = debt_ratio
+        self.idle = idle
+        self.supply = supply
+        self.shares = list(shares or [0] * USERS)
+        self.emergency = False
+        self.features = set()
+        self._booked_loss = False
+
+    # ******** vault views ************
+
+    @property
+    def total_debt(self):
+        return int(self.s.debt[0])
+
+    @total_debt.setter
+    def total_debt(self, value):
+        self.s.debt[0] = value
+
+    @property
+    def want(self):
+        return int(self.s.want[0])
+
+    @want.setter
+    def want(self, value):
+        self.s.want[0] = value
+
+    def total_assets(self):
+        return self.idle + self.total_debt
+
+    def estimated_total_assets(self):
+        return int(model.estimated_total_assets(self.s)[0])
+
+    def debt_outstanding(self):
+        if self.debt_ratio == 0:
+            return self.total_debt
+        limit = self.debt_ratio * self.total_assets() // MAX_BPS
+        return max(self.total_debt - limit, 0)
+
+    def credit_available(self):
+        limit = self.debt_ratio * self.total_assets() // MAX_BPS
+        if limit <= self.total_debt:
+            return 0
+        return min(limit - self.total_debt, self.idle)
+
+    def _report_loss(self, loss):
+        assert self.total_debt >= loss
+        if self.debt_ratio != 0:
+            change = min(loss * self.debt_ratio // self.total_debt, self.debt_ratio)
+            self.debt_ratio -= change
+        self.total_debt -= loss
+        self._booked_loss = True
+        self.features.add("loss")
+
+    # ******** operations, a Revert leaves the state unchanged ************
+
+    def apply(self, op):
+        before = (self.s.copy(), self.debt_ratio, self.idle, self.supply)
+        shares, emergency = list(self.shares), self.emergency
+        try:
+            return getattr(self, op.kind)(*op.args)
+        except Revert:
+            self.s, self.debt_ratio, self.idle, self.supply = before
+            self.shares, self.emergency = shares, emergency
+            self.features.add(f"{op.kind}_reverts")
+            raise
+
+    def deposit(self, user, amount):
+        if self.supply > 0:
+            if self.total_assets() == 0:
+                raise Revert("no free funds")
+            minted = amount * self.supply // self.total_assets()
+        else:
+            minted = amount
+        if minted == 0:
+            raise Revert("no shares")
+        self.shares[user] += minted
+        self.supply += minted
+        self.idle += amount
+
+    def withdraw(self, user, bps):
+        shares = self.shares[user] * bps // MAX_BPS
+        if shares == 0:
+            raise Revert("no shares")
+        value = shares * self.total_assets() // self.supply
+        total_loss = 0
+        if value > self.idle:
+            needed = min(value - self.idle, self.total_debt)
+            if needed > 0:
+                self.features.add("withdraw_liquidates")
+                freed, loss = model.liquidate_position(self.s, needed)
+                freed, loss = int(freed[0]), int(loss[0])
+                self.want -= freed
+                self.idle += freed
+                if loss > 0:
+                    value -= loss
+                    total_loss += loss
+                    self._report_loss(loss)
+                self.total_debt -= freed
+            if value > self.idle:
+                value = self.idle
+                shares = (value + total_loss) * self.supply // self.total_assets()
+        if shares > self.shares[user]:
+            raise Revert("burns more than the balance")
+        self.shares[user] -= shares
+        self.supply -= shares
+        self.idle -= value
+        return value
+
+    def set_debt_ratio(self, bps):
+        self.debt_ratio = bps
+        if bps == 0:
+            self.features.add("debt_ratio_0")
+
+    def pool_gain(self, amount):
+        self.s.pool_value[0] += amount
+        if amount < 0:
+            self.features.add("pool_loss")
+
+    def set_penalty(self, bps):
+        self.s.penalty[0] = bps
+
+    def harvest(self):
+        outstanding = self.debt_outstanding()
+        if self.emergency:
+            self.features.add("emergency_harvest")
+            freed = int(model.liquidate_all_positions(self.s)[0])
+            loss = max(outstanding - freed, 0)
+            profit = max(freed - outstanding, 0)
+            debt_payment = outstanding - loss
+        else:
+            profit, loss, debt_payment = (
+                int(x[0]) for x in model.prepare_return(self.s, outstanding)
+            )
+        if self.want < profit + debt_payment:
+            raise Revert("strategy cannot pay the report")
+
+        # vault.report
+        if loss > 0:
+            self._report_loss(loss)
+        credit = self.credit_available()
+        debt = self.debt_outstanding()
+        paid = min(debt_payment, debt)
+        self.total_debt += credit - paid
+        debt -= paid
+        moved = credit - profit - paid
+        self.idle -= moved
+        self.want += moved
+        if self.debt_ratio == 0:
+            debt = self.estimated_total_assets()
+        model.adjust_position(self.s, debt)
+        return profit, loss, debt_payment
+
+    def emergency_exit(self):
+        # setEmergencyExit revokes the strategy
+        self.emergency = True
+        self.debt_ratio = 0
+
+    def migrate(self):
+        # prepareMigration exits the gauge and hands over the LP and want
+        self.s.lp += self.s.staked
+        self.s.staked[0] = 0
+        self.features.add("migrate")
+
+    # ******** invariants ************
+
+    def check(self, before):
+        """Broken invariants after a step that started from `before`"""
+        broken = []
+        if self.supply != sum(self.shares):
+            broken.append("total supply is the sum of the shares")
+        if min(self.idle, self.want, int(self.s.staked[0]), self.total_debt) < 0:
+            broken.append("balances are not negative")
+        assets, supply = before
+        # pricePerShare only drops on a booked loss
+        if (
+            supply
+            and self.supply
+            and not self._booked_loss
+            and self.total_assets() * supply < assets * self.supply
+        ):
+            broken.append("pricePerShare dropped without a reported loss")
+        self._booked_loss = False
+        return broken
+
+
+class Corpus:
+    def __init__(self):
+        self.sequences = []  # (ops, features) reaching new feature combinations
+        self.failure = None  # (ops, error) of the shrunk failing sequence
+        self.steps = 0
+        self.seconds = 0.0
+        self._seen = set()
+        self._ops = []
+
+    def keep(self, ops, features):
+        features = frozenset(features)
+        if features and features not in self._seen:
+            self._seen.add(features)
+            self.sequences.append((tuple(ops), features))
+
+
+def _machine(corpus, start):
+    class VaultMachine(RuleBasedStateMachine):
+        def __init__(self):
+            super().__init__()
+            self.sim = start()
+            self.ops = corpus._ops = []
+
+        def _step(self, op):
+            before = (self.sim.total_assets(), self.sim.supply)
+            self.ops.append(op)
+            corpus.steps += 1
+            try:
+                self.sim.apply(op)
+            except Revert:
+                pass
+            broken = self.sim.check(before)
+            assert not broken, broken
+
+        @rule(
+            user=st.integers(0, USERS - 1),
+            amount=st.integers(1, 1_000_000).map(lambda x: x * UNIT),
+        )
+        def deposit(self, user, amount):
+            self._step(Op("deposit", (user, amount)))
+
+        @rule(user=st.integers(0, USERS - 1), bps=st.integers(1, MAX_BPS))
+        def withdraw(self, user, bps):
+            self._step(Op("withdraw", (user, bps)))
+
+        @precondition(lambda self: not self.sim.emergency)
+        @rule(bps=st.sampled_from([0, 1_000, 5_000, 9_000, MAX_BPS]))
+        def set_debt_ratio(self, bps):
+            self._step(Op("set_debt_ratio", (bps,)))
+
+        @rule(bps=st.integers(-1_000, 2_000))
+        def pool_gain(self, bps):
+            # -10% .. +20% of the pool value
+            amount = int(self.sim.s.pool_value[0]) * bps // MAX_BPS
+            self._step(Op("pool_gain", (amount,)))
+
+        @rule(bps=st.integers(9_000, MAX_BPS))
+        def set_penalty(self, bps):
+            self._step(Op("set_penalty", (bps,)))
+
+        @rule()
+        def harvest(self):
+            self._step(Op("harvest"))
+
+        @precondition(lambda self: not self.sim.emergency)
+        @rule()
+        def emergency_exit(self):
+            self._step(Op("emergency_exit"))
+
+        @precondition(lambda self: not self.sim.emergency)
+        @rule()
+        def migrate(self):
+            self._step(Op("migrate"))
+
+        def teardown(self):
+            corpus.keep(self.ops, self.sim.features)
+
+    return VaultMachine
+
+
+def fuzz(start, max_examples=200, max_steps=50):
+    """
+    Runs the model from `start()` (a fresh `Sim` per example) and returns the
+    corpus of sequences worth replaying on chain
+    """
+    corpus = Corpus()
+    began = time.perf_counter()
+    try:
+        run_state_machine_as_test(
+            _machine(corpus, start),
+            settings=settings(
+                max_examples=max_examples,
+                stateful_step_count=max_steps,
+                deadline=None,
+                database=None,
+                derandomize=True,
+                suppress_health_check=list(HealthCheck),
+            ),
+        )
+    except AssertionError as error:
+        # the last run is the shrunk sequence Hypothesis reports
+        corpus.failure = (tuple(corpus._ops), error)
+    corpus.seconds = time.perf_counter() - began
+    return corpus
+
+
+def default_sim():
+    """The local mock stack: the 1M seeded pool with a 0.1% exit penalty"""
+    pool = 1_000_000 * UNIT
+    s = model.StrategyState(
+        want=0,
+        lp=0,
+        staked=0,
+        pool_value=pool,
+        pool_supply=pool,
+        penalty=9_990,
+        debt=0,
+    )
+    return Sim(s)
+
+
+# ******** replay on chain ************
+
+
+def prepare_chain(vault, strategy, pool, gov):
+    """Fees off, profit unlocked after one second, no pool interest"""
+    vault.setManagementFee(0, {"from": gov})
+    vault.setPerformanceFee(0, {"from": gov})
+    vault.updateStrategyPerformanceFee(strategy, 0, {"from": gov})
+    vault.setLockedProfitDegradation(10 ** 18, {"from": gov})
+    pool.setInterestRate(0, {"from": gov})
+
+
+def sim_from_chain(vault, strategy, pool, users):
+    params = vault.strategies(strategy).dict()
+    return Sim(
+        model.from_chain(strategy, vault, pool),
+        debt_ratio=params["debtRatio"],
+        idle=vault.totalAssets() - vault.totalDebt(),
+        supply=vault.totalSupply(),
+        shares=[vault.balanceOf(u) for u in users],
+    )
+
+
+def _observe(vault, strategy, users):
+    return {
+        "totalAssets": vault.totalAssets(),
+        "totalSupply": vault.totalSupply(),
+        "totalDebt": vault.strategies(strategy).dict()["totalDebt"],
+        "debtRatio": vault.debtRatio(),
+        "estimatedTotalAssets": strategy.estimatedTotalAssets(),
+        "shares": [vault.balanceOf(u) for u in users],
+    }
+
+
+def _expected(sim):
+    return {
+        "totalAssets": sim.total_assets(),
+        "totalSupply": sim.supply,
+        "totalDebt": sim.total_debt,
+        "debtRatio": sim.debt_ratio,
+        "estimatedTotalAssets": sim.estimated_total_assets(),
+        "shares": list(sim.shares),
+    }
+
+
+def replay(ops, env):
+    """
+    Runs `ops` on chain and asserts every step matches the model. `env`
+    holds chain, vault, strategy, token, pool, gov, users and
+    `new_strategy()`, which deploys a strategy ready to be migrated to.
+    Returns the strategy in use at the end.
+    """
+    from brownie import reverts
+
+    chain, vault, token, pool, gov, users = (
+        env.chain,
+        env.vault,
+        env.token,
+        env.pool,
+        env.gov,
+        env.users,
+    )
+    strategy = env.strategy
+    sim = sim_from_chain(vault, strategy, pool, users)
+
+    for i, op in enumerate(ops):
+        chain.sleep(1)
+        try:
+            expected = sim.apply(op)
+        except Revert:
+            expected = Revert
+
+        def send(fn, *args):
+            if expected is Revert:
+                with reverts():
+                    fn(*args)
+                return None
+            return fn(*args)
+
+        if op.kind == "deposit":
+            user, amount = users[op.args[0]], op.args[1]
+            token.mint(user, amount, {"from": user})
+            token.approve(vault, amount, {"from": user})
+            send(vault.deposit, amount, {"from": user})
+        elif op.kind == "withdraw":
+            user = users[op.args[0]]
+            shares = vault.balanceOf(user) * op.args[1] // MAX_BPS
+            before = token.balanceOf(user)
+            send(vault.withdraw, shares, user, MAX_BPS, {"from": user})
+            if expected is not Revert:
+                assert token.balanceOf(user) - before == expected, (i, op)
+        elif op.kind == "set_debt_ratio":
+            vault.updateStrategyDebtRatio(strategy, op.args[0], {"from": gov})
+        elif op.kind == "pool_gain":
+            amount = op.args[0]
+            if amount > 0:
+                token.mint(pool, amount, {"from": gov})
+            elif amount < 0:
+                token.burn(pool, -amount, {"from": gov})
+        elif op.kind == "set_penalty":
+            pool.setExitPenalty(op.args[0], {"from": gov})
+        elif op.kind == "harvest":
+            tx = send(strategy.harvest, {"from": gov})
+            if tx is not None:
+                event = tx.events["Harvested"]
+                actual = (event["profit"], event["loss"], event["debtPayment"])
+                assert actual == expected, (i, op, actual, expected)
+        elif op.kind == "emergency_exit":
+            strategy.setEmergencyExit({"from": gov})
+        elif op.kind == "migrate":
+            new = env.new_strategy()
+            vault.migrateStrategy(strategy, new, {"from": gov})
+            strategy = new
+
+        actual = _observe(vault, strategy, users)
+        assert actual == _expected(sim), (i, op, actual, _expected(sim))
+    return strategy
+
+
+def main(examples=500, steps=50):
+    corpus = fuzz(default_sim, int(examples), int(steps))
+    print(
+        f"{corpus.steps} model steps in {corpus.seconds:.1f}s "
+        f"({corpus.steps / max(corpus.seconds, 1e-9):,.0f}/s), "
+        f"{len(corpus.sequences)} sequences to replay"
+    )
+    for ops, features in corpus.sequences:
+        print(f"  {len(ops):>3} ops  {', '.join(sorted(features))}")
+    if corpus.failure is not None:
+        ops, error = corpus.failure
+        print(f"FAILED: {error}")
+        for op in ops:
+            print(f"  {op}")
@@ -0,0 +1,347 @@
+"""
+Gas benchmark of the strategy entry points on the local mock stack.
+
+Every path is measured from a fresh snapshot at several position sizes, the
+results are written to a versioned JSON report and compared to the committed
+baseline. Each run also writes its report to benchmarks/gas_report.json, the
+file to commit as the baseline after a change that moves the gas on purpose.
+`report` only writes the report, without a baseline to compare to:
+
+    brownie run gas_benchmark main report --network development
+    brownie run gas_benchmark main save --network development
+    brownie run gas_benchmark main compare --network development
+
+The per-path delta of a single commit is its report against a baseline saved
+at its parent, to another file than the committed one:
+
+    git checkout <commit>~1
+    brownie run gas_benchmark main save 0.02 /tmp/parent.json --network development
+    git checkout <commit>
+    brownie run gas_benchmark main compare 0.02 /tmp/parent.json --network development
+
+`builds` runs every path on two builds of the strategy side by side (e.g.
+contracts/test/StrategyUnoptimized.sol against Strategy.sol), checks both
+leave the same logs, return values and views behind and prints the gas
+delta of each path. The table is also written to benchmarks/gas_builds.txt:
+
+    brownie run gas_benchmark builds StrategyUnoptimized --network development
+"""
+import json
+import subprocess
+from pathlib import Path
+
+BASELINE = Path(__file__).parent.parent / "benchmarks" / "gas_baseline.json"
+REPORT = BASELINE.parent / "gas_report.json"
+BUILDS_TABLE = BASELINE.parent / "gas_builds.txt"
+REPORT_VERSION = 1
+# position sizes in whole want tokens
+SIZES = (1_000, 100_000, 10_000_000)
+DEFAULT_THRESHOLD = 0.02
+
+
+def _deposit(s, size):
+    amount = size * 10 ** s.token.decimals()
+    s.token.mint(s.user, amount, {"from": s.user})
+    s.token.approve(s.vault, amount, {"from": s.user})
+    s.vault.deposit(amount, {"from": s.user})
+
+
+def _invested(s, size):
+    _deposit(s, size)
+    s.strategy.harvest({"from": s.strategist})
+
+
+def _rewards(s, size):
+    _invested(s, size)
+    s.chain.sleep(86400)
+    s.chain.mine(1)
+
+
+def harvest_first_deposit(s, size):
+    _deposit(s, size)
+    return s.strategy.harvest({"from": s.strategist})
+
+
+def harvest_profit(s, size):
+    _rewards(s, size)
+    return s.strategy.harvest({"from": s.strategist})
+
+
+def harvest_loss(s, size):
+    _invested(s, size)
+    s.pool.setInterestRate(0, {"from": s.gov})
+    s.token.burn(s.pool, s.token.balanceOf(s.pool) // 100, {"from": s.gov})
+    return s.strategy.harvest({"from": s.strategist})
+
+
+def harvest_debt_repayment(s, size):
+    _invested(s, size)
+    s.vault.updateStrategyDebtRatio(s.strategy, 5_000, {"from": s.gov})
+    return s.strategy.harvest({"from": s.strategist})
+
+
+def harvest_emergency_exit(s, size):
+    _invested(s, size)
+    s.strategy.setEmergencyExit({"from": s.gov})
+    return s.strategy.harvest({"from": s.strategist})
+
+
+def tend(s, size):
+    _invested(s, size)
+    return s.strategy.tend({"from": s.strategist})
+
+
+def claim_rewards(s, size):
+    _rewards(s, size)
+    return s.strategy.claimRewards({"from": s.gov})
+
+
+def swap_reward_to_want(s, size):
+    _rewards(s, size)
+    s.strategy.claimRewards({"from": s.gov})
+    return s.strategy.swapRewardToWant({"from": s.gov})
+
+
+def set_trade_factory(s, size):
+    # replacing an existing trade factory also removes its permissions
+    return s.strategy.setTradeFactory(s.trade_factory, {"from": s.gov})
+
+
+def withdraw_partial(s, size):
+    _invested(s, size)
+    return s.vault.withdraw(
+        s.vault.balanceOf(s.user) // 10, s.user, 10_000, {"from": s.user}
+    )
+
+
+def withdraw_all(s, size):
+    _invested(s, size)
+    return s.vault.withdraw(s.vault.balanceOf(s.user), s.user, 10_000, {"from": s.user})
+
+
+PATHS = (
+    harvest_first_deposit,
+    harvest_profit,
+    harvest_loss,
+    harvest_debt_repayment,
+    harvest_emergency_exit,
+    tend,
+    claim_rewards,
+    swap_reward_to_want,
+    set_trade_factory,
+    withdraw_partial,
+    withdraw_all,
+)
+
+
+# views compared between builds after every path
+STRATEGY_VIEWS = (
+    "estimatedTotalAssets",
+    "balanceOfWant",
+    "totalLP",
+    "balanceOfLPInGauge",
+    "pendingRewards",
+    "balanceOfTruRewards",
+    "truPrice",
+    "lastVirtualPrice",
+    "tradeFactory",
+    "emergencyExit",
+)
+VAULT_VIEWS = ("totalAssets", "totalSupply", "totalDebt", "pricePerShare")
+# set per block, so different for two deployments
+TIMESTAMPS = ("activation", "lastReport")
+
+
+def observe(s, tx):
+    """What a path leaves behind, with the stack's own addresses masked"""
+    masks = {
+        a.address[2:].lower(): name
+        for name, a in (("strategy", s.strategy), ("vault", s.vault))
+    }
+
+    def mask(value):
+        value = value.hex() if isinstance(value, bytes) else str(value).lower()
+        for address, name in masks.items():
+            value = value.replace(address, f"<{name}>")
+        return value
+
+    params = s.vault.strategies(s.strategy).dict()
+    return {
+        "logs": [
+            (mask(log["address"]), [mask(t) for t in log["topics"]], mask(log["data"]))
+            for log in tx.logs
+        ],
+        "return_value": mask(tx.return_value),
+        "strategy": {v: mask(getattr(s.strategy, v)()) for v in STRATEGY_VIEWS},
+        "vault": {v: getattr(s.vault, v)() for v in VAULT_VIEWS},
+        "params": {k: v for k, v in params.items() if k not in TIMESTAMPS},
+        "user": s.token.balanceOf(s.user),
+    }
+
+
+def run_benchmarks(stack, sizes=SIZES, paths=PATHS, outcomes=None):
+    """
+    `stack` holds the deployed contracts and accounts (see `deploy`), with
+    the trade factory already set. Returns {path: {size: gas_used}}, and
+    fills `outcomes` with what `observe` sees after each path if given.
+    """
+    results = {}
+    stack.chain.snapshot()
+    for path in paths:
+        results[path.__name__] = {}
+        for size in sizes:
+            tx = path(stack, size)
+            results[path.__name__][str(size)] = tx.gas_used
+            if outcomes is not None:
+                outcomes[(path.__name__, str(size))] = observe(stack, tx)
+            stack.chain.revert()
+    return results
+
+
+def freeze(stacks, tru_per_strategy=1_000 * 10 ** 8):
+    """
+    Stops pool interest and gauge rewards so the paths no longer depend on
+    block times, and hands every strategy the same TRU to swap instead
+    """
+    s = stacks[0]
+    s.pool.setInterestRate(0, {"from": s.gov})
+    s.gauge.setRewardRate(s.pool, 0, {"from": s.gov})
+    for stack in stacks:
+        s.tru.mint(stack.strategy, tru_per_strategy, {"from": s.gov})
+
+
+def compare_builds(reference, candidate, sizes=SIZES, paths=PATHS):
+    """
+    Runs the paths on two stacks sharing the mocks (see `deploy_builds`),
+    frozen with `freeze`. Returns the gas of each and the (path, size) whose
+    outcomes differ.
+    """
+    before, after = {}, {}
+    gas_before = run_benchmarks(reference, sizes, paths, before)
+    gas_after = run_benchmarks(candidate, sizes, paths, after)
+    mismatches = [key for key in before if before[key] != after[key]]
+    return gas_before, gas_after, mismatches
+
+
+def _commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_report(results):
+    return {"version": REPORT_VERSION, "commit": _commit(), "results": results}
+
+
+def compare(baseline, report, threshold=DEFAULT_THRESHOLD):
+    """Returns the (path, size, before, after) entries that regressed"""
+    if baseline["version"] != report["version"]:
+        raise ValueError(
+            f"baseline is version {baseline['version']}, "
+            f"report is version {report['version']}"
+        )
+    regressions = []
+    for path, sizes in report["results"].items():
+        for size, gas in sizes.items():
+            before = baseline["results"].get(path, {}).get(size)
+            if before is not None and gas > before * (1 + threshold):
+                regressions.append((path, size, before, gas))
+    return regressions
+
+
+def format_table(baseline, report):
+    lines = [f"{'path':<26}{'size':>12}{'baseline':>12}{'current':>12}{'delta':>9}"]
+    for path, sizes in report["results"].items():
+        for size, gas in sizes.items():
+            before = baseline["results"].get(path, {}).get(size) if baseline else None
+            delta = f"{(gas - before) / before:+.2%}" if before else "new"
+            lines.append(f"{path:<26}{size:>12}{before or '-':>12}{gas:>12}{delta:>9}")
+    return "\n".join(lines)
+
+
+def deploy_builds(*containers):
+    """One vault and strategy per contract container, on the same mocks"""
+    from types import SimpleNamespace
+
+    from brownie import accounts, chain, config, project
+
+    from scripts.mocks import deploy_mocks, deploy_strategy, deploy_vault
+    from scripts.mocks import set_trade_factory as grant_trade_factory
+
+    Vault = project.load(
+        Path.home() / ".brownie" / "packages" / config["dependencies"][0]
+    ).Vault
+    user, rewards, guardian, management, strategist, keeper, gov, ymechs = [
+        accounts[i] for i in range(8)
+    ]
+    mocks = deploy_mocks(accounts[8], ymechs)
+    stacks = []
+    for Strategy in containers:
+        vault = deploy_vault(Vault, mocks.token, gov, rewards, guardian, management)
+        strategy = deploy_strategy(Strategy, strategist, keeper, gov, vault, mocks)
+        grant_trade_factory(strategy, mocks.trade_factory, ymechs, gov)
+        stacks.append(
+            SimpleNamespace(
+                chain=chain,
+                vault=vault,
+                strategy=strategy,
+                user=user,
+                gov=gov,
+                strategist=strategist,
+                **vars(mocks),
+            )
+        )
+    return stacks
+
+
+def deploy():
+    from brownie import Strategy
+
+    return deploy_builds(Strategy)[0]
+
+
+def main(command="compare", threshold=DEFAULT_THRESHOLD, baseline_path=BASELINE):
+    baseline_path = Path(baseline_path)
+    report = make_report(run_benchmarks(deploy()))
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+    print(format_table(baseline, report))
+    REPORT.parent.mkdir(exist_ok=True)
+    REPORT.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+
+    if command == "save":
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(REPORT.read_text())
+        print(f"baseline written to {baseline_path}")
+        return
+    if command == "report":
+        return
+
+    if baseline is None:
+        raise SystemExit(
+            f"no baseline at {baseline_path}, run `main save` or commit "
+            f"{REPORT.name} as the baseline"
+        )
+    regressions = compare(baseline, report, float(threshold))
+    for path, size, before, after in regressions:
+        print(f"REGRESSION {path} @ {size}: {before} -> {after}")
+    if regressions:
+        raise SystemExit(1)
+
+
+def builds(reference, candidate="Strategy"):
+    import brownie
+
+    stacks = deploy_builds(getattr(brownie, reference), getattr(brownie, candidate))
+    freeze(stacks)
+    before, after, mismatches = compare_builds(*stacks)
+    table = format_table(make_report(before), make_report(after))
+    print(table)
+    BUILDS_TABLE.parent.mkdir(exist_ok=True)
+    BUILDS_TABLE.write_text(f"{reference} -> {candidate}\n{table}\n")
+    for path, size in mismatches:
+        print(f"DIFFERENT OUTCOME {path} @ {size}")
+    if mismatches:
+        raise SystemExit(1)
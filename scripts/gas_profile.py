@@ -0,0 +1,378 @@
+"""
+Gas profile of a transaction from its debug trace.
+
+The struct logs of `debug_traceTransaction` are walked opcode by opcode. Every
+CALL/STATICCALL/DELEGATECALL/CALLCODE/CREATE opens a frame, labelled
+`Contract.function` from the call target and the selector in the calldata.
+A frame's inclusive gas is the gas before the call opcode minus the gas left
+when it returns (so the call's own cost is charged to it), its self gas is
+what remains once the children are taken out.
+
+Selectors are resolved from the project's ABIs: compiled artifacts under
+build/ and the dependency packages when present, ABI json files under
+interfaces/ (MultiCallOptimizedSwapper.json) and, without a compile, the
+function declarations of interfaces/*.sol and contracts/**/*.sol. Targets
+are named from the deployments brownie knows, otherwise from the ABI that
+has every selector called on them.
+
+The profile is written as folded stacks (flamegraph.pl, speedscope) and
+printed as a top-N table; a second transaction is diffed against the first.
+
+    brownie run gas_profile main <tx> [<tx to diff>] [top] [out.folded] --network ...
+"""
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import NamedTuple
+
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+
+ROOT = Path(__file__).parent.parent
+CALLS = {"CALL", "CALLCODE", "DELEGATECALL", "STATICCALL"}
+CREATES = {"CREATE", "CREATE2"}
+# stack position (from the top) of the target, args offset and args length
+CALL_ARGS = {
+    "CALL": (1, 3, 4),
+    "CALLCODE": (1, 3, 4),
+    "DELEGATECALL": (1, 2, 3),
+    "STATICCALL": (1, 2, 3),
+}
+# gas not spent by the root call's opcodes: 21000 + calldata, net of refunds
+INTRINSIC = "[intrinsic]"
+
+_FUNCTION = re.compile(r"function\s+(\w+)\s*\(([^)]*)\)([^{;]*)", re.S)
+_CONTRACT = re.compile(r"(?:contract|interface|library)\s+(\w+)")
+_ELEMENTARY = re.compile(r"^(address|bool|string|bytes\d*|u?int\d*)((?:\[\d*\])*)$")
+_NAMED = re.compile(r"^([A-Z]\w*)((?:\[\d*\])*)$")
+
+
+def _canonical(param):
+    """ABI type of a Solidity parameter, None if it is not a plain type"""
+    words = param.split()
+    if not words:
+        return None
+    match = _ELEMENTARY.match(words[0])
+    if match:
+        base, dims = match.groups()
+        base = {"uint": "uint256", "int": "int256", "byte": "bytes1"}.get(base, base)
+        return base + dims
+    match = _NAMED.match(words[0])
+    if match:
+        # contracts and interfaces are addresses (structs are not handled)
+        return "address" + match.group(2)
+    return None
+
+
+def _abi_type(item):
+    if item["type"].startswith("tuple"):
+        inner = ",".join(_abi_type(c) for c in item["components"])
+        return f"({inner}){item['type'][5:]}"
+    return item["type"]
+
+
+class Resolver:
+    """Function names by selector, and the contracts that have them"""
+
+    def __init__(self):
+        self.names = {}  # selector => function signature
+        self.owners = defaultdict(set)  # selector => contract names
+        self.sizes = defaultdict(int)  # contract name => functions
+
+    def add(self, contract, signature):
+        selector = function_signature_to_4byte_selector(signature)
+        self.names.setdefault(selector, signature)
+        if contract not in self.owners[selector]:
+            self.owners[selector].add(contract)
+            self.sizes[contract] += 1
+
+    def add_abi(self, contract, abi):
+        for item in abi:
+            if item.get("type") == "function":
+                types = ",".join(_abi_type(i) for i in item["inputs"])
+                self.add(contract, f"{item['name']}({types})")
+
+    def add_source(self, path):
+        """Functions declared in a Solidity file, without compiling it"""
+        text = re.sub(r"//[^\n]*|/\*.*?\*/", "", Path(path).read_text(), flags=re.S)
+        # every function is credited to the contract declared before it
+        starts = [(m.start(), m.group(1)) for m in _CONTRACT.finditer(text)]
+        for match in _FUNCTION.finditer(text):
+            owner = [name for start, name in starts if start < match.start()]
+            visibility = match.group(3).split()
+            if not owner or not {"external", "public"} & set(visibility):
+                continue
+            params = [p for p in match.group(2).split(",") if p.strip()]
+            types = [_canonical(p) for p in params]
+            if None not in types:
+                self.add(owner[-1], f"{match.group(1)}({','.join(types)})")
+
+    def add_build(self, build):
+        for artifact in sorted(Path(build).glob("*/*.json")):
+            data = json.loads(artifact.read_text())
+            if isinstance(data, dict) and "abi" in data:
+                self.add_abi(data.get("contractName", artifact.stem), data["abi"])
+
+    @classmethod
+    def from_project(cls, root=ROOT, packages=None):
+        resolver = cls()
+        if (Path(root) / "build").exists():
+            resolver.add_build(Path(root) / "build")
+        for package in packages or []:
+            if (Path(package) / "build").exists():
+                resolver.add_build(Path(package) / "build")
+            else:
+                for path in sorted((Path(package) / "contracts").rglob("*.sol")):
+                    resolver.add_source(path)
+        for path in sorted((Path(root) / "interfaces").glob("*.json")):
+            abi = json.loads(path.read_text())
+            resolver.add_abi(path.stem, abi["abi"] if isinstance(abi, dict) else abi)
+        sources = sorted((Path(root) / "interfaces").glob("*.sol"))
+        sources += sorted((Path(root) / "contracts").rglob("*.sol"))
+        for path in sources:
+            resolver.add_source(path)
+        return resolver
+
+    def function(self, selector):
+        if selector is None:
+            return "fallback"
+        signature = self.names.get(selector)
+        return signature.split("(")[0] if signature else "0x" + selector.hex()
+
+    def guess_contract(self, selectors):
+        """The smallest contract having all `selectors`, None if none has"""
+        owners = None
+        for selector in selectors:
+            found = self.owners.get(selector, set())
+            owners = set(found) if owners is None else owners & found
+        if not owners:
+            return None
+        return min(owners, key=lambda name: (self.sizes[name], name))
+
+
+class Call(NamedTuple):
+    step: int  # index of the opcode opening the frame
+    op: str
+    target: str  # checksummed, None for creations
+    selector: bytes  # None for creations and calls without one
+
+
+def _word(stack, position):
+    return int(stack[-1 - position], 16)
+
+
+def _memory(step, offset, length):
+    words = [w[2:] if w.startswith("0x") else w for w in step.get("memory") or []]
+    return bytes.fromhex("".join(words))[offset : offset + length]
+
+
+def decode_call(i, step):
+    op = step["op"]
+    if op in CREATES:
+        return Call(i, op, None, None)
+    target, offset, length = CALL_ARGS[op]
+    stack = step["stack"]
+    address = to_checksum_address(_word(stack, target).to_bytes(32, "big")[12:])
+    args = _memory(step, _word(stack, offset), min(_word(stack, length), 4))
+    return Call(i, op, address, args if len(args) == 4 else None)
+
+
+class Frame:
+    def __init__(self, label, start_gas, path):
+        self.label = label
+        self.start_gas = start_gas
+        self.path = path + (label,)
+        self.children = 0
+
+    def close(self, profile, end_gas):
+        inclusive = self.start_gas - end_gas
+        profile.record(self.path, inclusive, inclusive - self.children)
+        return inclusive
+
+
+class Profile:
+    def __init__(self):
+        self.folded = defaultdict(int)  # stack => self gas
+        # label => [calls, inclusive gas, self gas]
+        self.functions = defaultdict(lambda: [0, 0, 0])
+        self.gas_used = 0
+
+    def record(self, path, inclusive, self_gas):
+        self.folded[path] += self_gas
+        stats = self.functions[path[-1]]
+        stats[0] += 1
+        # recursion would count a frame twice in its own inclusive gas
+        if path[-1] not in path[:-1]:
+            stats[1] += inclusive
+        stats[2] += self_gas
+
+    def write_folded(self, path):
+        with open(path, "w") as f:
+            for stack, gas in sorted(self.folded.items()):
+                if gas > 0:
+                    f.write(f"{';'.join(stack)} {gas}\n")
+
+    def top(self, n=20, key="self"):
+        column = {"calls": 0, "inclusive": 1, "self": 2}[key]
+        rows = sorted(self.functions.items(), key=lambda r: r[1][column], reverse=True)
+        return rows[:n]
+
+
+def label_targets(calls, resolver, labels):
+    """Names of the call targets: known deployments first, then ABIs"""
+    selectors = defaultdict(set)
+    for call in calls:
+        if call.target is not None and call.selector is not None:
+            selectors[call.target].add(call.selector)
+    names = {}
+    for target, called in selectors.items():
+        names[target] = labels.get(target) or resolver.guess_contract(called)
+    return names
+
+
+def profile_trace(steps, to, input_selector, gas_used, resolver, labels=None):
+    """
+    `steps` are the struct logs of the transaction sent to `to` with calldata
+    starting with `input_selector`
+    """
+    labels = {to_checksum_address(a): n for a, n in (labels or {}).items()}
+    calls = [
+        decode_call(i, s) for i, s in enumerate(steps) if s["op"] in CALLS | CREATES
+    ]
+    to = to_checksum_address(to) if to else None
+    names = label_targets(
+        calls + [Call(-1, "CALL", to, input_selector)], resolver, labels
+    )
+
+    def label(call):
+        if call.target is None:
+            return "[create]"
+        contract = names.get(call.target) or call.target[:8]
+        return f"{contract}.{resolver.function(call.selector)}"
+
+    profile = Profile()
+    profile.gas_used = gas_used
+    if not steps:
+        return profile
+    root_call = Call(-1, "CALL", to, input_selector)
+    base = steps[0]["depth"]
+    frames = [Frame(label(root_call) if to else "[create]", steps[0]["gas"], ())]
+    opened = {c.step: c for c in calls}
+
+    for i, step in enumerate(steps):
+        depth = step["depth"] - base
+        while len(frames) - 1 > depth:
+            # returned to the caller
+            child = frames.pop()
+            frames[-1].children += child.close(profile, step["gas"])
+        call = opened.get(i)
+        if call is None:
+            continue
+        after = steps[i + 1] if i + 1 < len(steps) else None
+        if after is not None and after["depth"] - base == depth + 1:
+            frames.append(Frame(label(call), step["gas"], frames[-1].path))
+        elif after is not None:
+            # no code at the target, a precompile or a failed call
+            leaf = Frame(label(call), step["gas"], frames[-1].path)
+            frames[-1].children += leaf.close(profile, after["gas"])
+
+    last = steps[-1]
+    end_gas = last["gas"] - last.get("gasCost", 0)
+    while len(frames) > 1:
+        child = frames.pop()
+        frames[-1].children += child.close(profile, end_gas)
+    spent = frames[0].close(profile, end_gas)
+    if gas_used:
+        profile.record((INTRINSIC,), gas_used - spent, gas_used - spent)
+    return profile
+
+
+def diff(before, after):
+    """(label, calls, inclusive, self) deltas, largest inclusive change first"""
+    rows = []
+    for label in set(before.functions) | set(after.functions):
+        a = before.functions.get(label, [0, 0, 0])
+        b = after.functions.get(label, [0, 0, 0])
+        delta = tuple(y - x for x, y in zip(a, b))
+        if any(delta):
+            rows.append((label, *delta))
+    return sorted(rows, key=lambda r: abs(r[2]), reverse=True)
+
+
+def format_top(profile, n=20):
+    lines = [f"{'function':<48}{'calls':>7}{'inclusive':>12}{'self':>10}{'self %':>8}"]
+    for label, (calls, inclusive, self_gas) in profile.top(n):
+        share = self_gas / profile.gas_used if profile.gas_used else 0
+        lines.append(
+            f"{label:<48}{calls:>7}{inclusive:>12,}{self_gas:>10,}{share:>8.1%}"
+        )
+    lines.append(f"{'gas used':<48}{'':>7}{profile.gas_used:>12,}")
+    return "\n".join(lines)
+
+
+def format_diff(rows, n=20):
+    lines = [f"{'function':<48}{'calls':>7}{'inclusive':>12}{'self':>10}"]
+    for label, calls, inclusive, self_gas in rows[:n]:
+        lines.append(f"{label:<48}{calls:>+7}{inclusive:>+12,}{self_gas:>+10,}")
+    return "\n".join(lines)
+
+
+def fetch_trace(web3, txid):
+    """Struct logs of `txid` with memory, without storage"""
+    response = web3.provider.make_request(
+        "debug_traceTransaction",
+        [txid, {"disableStorage": True, "enableMemory": True, "disableMemory": False}],
+    )
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response["result"]["structLogs"]
+
+
+def profile_tx(web3, txid, resolver, labels=None):
+    tx = web3.eth.get_transaction(txid)
+    receipt = web3.eth.get_transaction_receipt(txid)
+    data = tx["input"]
+    data = bytes.fromhex(data[2:]) if isinstance(data, str) else bytes(data)
+    selector = data[:4] if len(data) >= 4 else None
+    return profile_trace(
+        fetch_trace(web3, txid),
+        tx["to"],
+        selector,
+        receipt["gasUsed"],
+        resolver,
+        labels,
+    )
+
+
+def project_labels():
+    """address => contract name of everything deployed in this session"""
+    from brownie import project
+
+    labels = {}
+    for p in project.get_loaded_projects():
+        for container in p:
+            for contract in container:
+                labels[contract.address] = container._name
+    return labels
+
+
+def _packages():
+    from brownie import config
+
+    home = Path.home() / ".brownie" / "packages"
+    return [home / dep for dep in config.get("dependencies", [])]
+
+
+def main(txid, other=None, top=20, out="gas.folded"):
+    from brownie import web3
+
+    resolver = Resolver.from_project(packages=_packages())
+    labels = project_labels()
+    profile = profile_tx(web3, txid, resolver, labels)
+    profile.write_folded(out)
+    print(format_top(profile, int(top)))
+    print(f"folded stacks written to {out}")
+    if other is not None:
+        second = profile_tx(web3, other, resolver, labels)
+        print(f"\n{other} against {txid}")
+        print(format_diff(diff(profile, second), int(top)))
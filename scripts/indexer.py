@@ -0,0 +1,356 @@
+"""
+Incremental event indexer for a fleet of strategies.
+
+Streams the strategy `Harvested`, vault `StrategyReported`, gauge `Claimed`
+and pool `Joined`/`Exited` events of every strategy with eth_getLogs over
+large block ranges into SQLite, one table per event. Each strategy keeps a
+checkpoint of its last indexed block so reruns only fetch new blocks, and the
+hashes of the last `reorg_depth` blocks are kept to roll back whatever a
+reorg replaced.
+
+    brownie run indexer main <db> <start block> <strategy> [...] --network ...
+"""
+import sqlite3
+from typing import NamedTuple, Tuple
+
+from eth_utils import event_signature_to_log_topic, to_checksum_address
+from web3.exceptions import BlockNotFound
+
+from scripts.abi import decode
+
+
+class Event(NamedTuple):
+    table: str
+    signature: str
+    # emitting contract, "strategy" or one of the strategy's dependencies
+    source: str
+    # topic position (1-3) holding the strategy, None if it is the emitter
+    strategy_topic: int
+    # (column, abi type) of the other indexed arguments and of the data
+    topics: Tuple[Tuple[str, str], ...]
+    data: Tuple[Tuple[str, str], ...]
+
+    @property
+    def topic0(self):
+        return "0x" + event_signature_to_log_topic(self.signature).hex()
+
+
+EVENTS = (
+    Event(
+        "harvested",
+        "Harvested(uint256,uint256,uint256,uint256)",
+        "strategy",
+        None,
+        (),
+        (
+            ("profit", "uint256"),
+            ("loss", "uint256"),
+            ("debt_payment", "uint256"),
+            ("debt_outstanding", "uint256"),
+        ),
+    ),
+    Event(
+        "strategy_reported",
+        "StrategyReported(address,uint256,uint256,uint256,uint256,uint256,uint256,"
+        "uint256,uint256)",
+        "vault",
+        1,
+        (),
+        (
+            ("gain", "uint256"),
+            ("loss", "uint256"),
+            ("debt_paid", "uint256"),
+            ("total_gain", "uint256"),
+            ("total_loss", "uint256"),
+            ("total_debt", "uint256"),
+            ("debt_added", "uint256"),
+            ("debt_ratio", "uint256"),
+        ),
+    ),
+    Event(
+        "claimed",
+        "Claimed(address,address,uint256)",
+        "gauge",
+        2,
+        (("token", "address"),),
+        (("amount", "uint256"),),
+    ),
+    Event(
+        "pool_joined",
+        "Joined(address,uint256,uint256)",
+        "pool",
+        1,
+        (),
+        (("deposited", "uint256"), ("minted", "uint256")),
+    ),
+    Event(
+        "pool_exited",
+        "Exited(address,uint256)",
+        "pool",
+        1,
+        (),
+        (("amount", "uint256"),),
+    ),
+)
+COMMON_COLUMNS = ("strategy", "address", "block", "log_index", "tx", "timestamp")
+
+
+def _topic(address):
+    return "0x" + "00" * 12 + to_checksum_address(address)[2:].lower()
+
+
+def _hex(value):
+    return value if isinstance(value, str) else "0x" + bytes(value).hex()
+
+
+class Store:
+    """
+    SQLite store. uint256 values are kept as decimal TEXT, since SQLite
+    integers are 64 bit, and turned back into ints by `events`.
+    """
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(str(path))
+        with self.db:
+            for event in EVENTS:
+                columns = [c for c, _ in event.topics + event.data]
+                self.db.execute(
+                    f"CREATE TABLE IF NOT EXISTS {event.table} ("
+                    "strategy TEXT, address TEXT, block INTEGER, log_index INTEGER, "
+                    "tx TEXT, timestamp INTEGER, "
+                    + "".join(f"{c} TEXT, " for c in columns)
+                    + "PRIMARY KEY (block, log_index))"
+                )
+                self.db.execute(
+                    f"CREATE INDEX IF NOT EXISTS {event.table}_strategy_time "
+                    f"ON {event.table} (strategy, timestamp)"
+                )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints "
+                "(strategy TEXT PRIMARY KEY, block INTEGER)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS block_hashes "
+                "(block INTEGER PRIMARY KEY, hash TEXT)"
+            )
+
+    def close(self):
+        self.db.close()
+
+    def checkpoint(self, strategy):
+        row = self.db.execute(
+            "SELECT block FROM checkpoints WHERE strategy = ?", (strategy,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def insert(self, event, rows):
+        columns = COMMON_COLUMNS + tuple(c for c, _ in event.topics + event.data)
+        self.db.executemany(
+            f"INSERT OR IGNORE INTO {event.table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            rows,
+        )
+
+    def events(self, table, strategy, start=None, end=None):
+        """Events of one strategy with start <= timestamp < end, oldest first"""
+        event = next(e for e in EVENTS if e.table == table)
+        query = f"SELECT * FROM {table} WHERE strategy = ?"
+        params = [to_checksum_address(strategy)]
+        if start is not None:
+            query += " AND timestamp >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND timestamp < ?"
+            params.append(end)
+        cursor = self.db.execute(query + " ORDER BY block, log_index", params)
+        names = [d[0] for d in cursor.description]
+        numeric = {c for c, t in event.topics + event.data if t.startswith("uint")}
+        return [
+            {k: int(v) if k in numeric else v for k, v in zip(names, row)}
+            for row in cursor
+        ]
+
+    def rollback(self, block):
+        """Drops everything indexed from `block` on"""
+        with self.db:
+            for event in EVENTS:
+                self.db.execute(f"DELETE FROM {event.table} WHERE block >= ?", (block,))
+            self.db.execute("DELETE FROM block_hashes WHERE block >= ?", (block,))
+            self.db.execute(
+                "UPDATE checkpoints SET block = ? WHERE block >= ?", (block - 1, block)
+            )
+
+
+class Indexer:
+    def __init__(
+        self, w3, store, strategies, start_block=0, chunk_size=10_000, reorg_depth=64
+    ):
+        """
+        `strategies` maps each strategy address to its {"vault", "gauge",
+        "pool"} addresses, see `sources`. Strategies without a checkpoint are
+        indexed from `start_block`.
+        """
+        self.w3 = w3
+        self.store = store
+        self.strategies = {
+            to_checksum_address(s): {k: to_checksum_address(v) for k, v in deps.items()}
+            for s, deps in strategies.items()
+        }
+        self.start_block = start_block
+        self.chunk_size = chunk_size
+        self.reorg_depth = reorg_depth
+        self.get_logs_calls = 0
+        self._timestamps = {}
+
+    def _block_hash(self, block):
+        try:
+            return _hex(self.w3.eth.get_block(block)["hash"])
+        except BlockNotFound:
+            # the new chain is shorter
+            return None
+
+    def _check_reorg(self):
+        stored = self.store.db.execute(
+            "SELECT block, hash FROM block_hashes ORDER BY block"
+        ).fetchall()
+        # blocks are hash linked, an unchanged tip means nothing below changed
+        if not stored or self._block_hash(stored[-1][0]) == stored[-1][1]:
+            return None
+        for block, stored_hash in stored:
+            if self._block_hash(block) != stored_hash:
+                break
+        # a reorg deeper than the window rolls back the whole window
+        self.store.rollback(block)
+        self._timestamps = {b: t for b, t in self._timestamps.items() if b < block}
+        return block
+
+    def _get_logs(self, event, start, end):
+        emitters = {
+            strategy if event.source == "strategy" else deps[event.source]
+            for strategy, deps in self.strategies.items()
+        }
+        topics = [event.topic0]
+        if event.strategy_topic is not None:
+            topics += [None] * (event.strategy_topic - 1)
+            topics.append([_topic(s) for s in self.strategies])
+        self.get_logs_calls += 1
+        return self.w3.eth.get_logs(
+            {
+                "fromBlock": start,
+                "toBlock": end,
+                "address": sorted(emitters),
+                "topics": topics,
+            }
+        )
+
+    def _timestamp(self, block):
+        if block not in self._timestamps:
+            self._timestamps[block] = self.w3.eth.get_block(block)["timestamp"]
+        return self._timestamps[block]
+
+    def _row(self, event, log):
+        topics = [bytes(t) for t in log["topics"]]
+        if event.strategy_topic is None:
+            strategy = to_checksum_address(log["address"])
+        else:
+            strategy = to_checksum_address(topics[event.strategy_topic][12:])
+        # the remaining indexed arguments, in topic order
+        indexed = [
+            decode([abi_type], topic)[0]
+            for (_, abi_type), topic in zip(
+                event.topics,
+                [t for i, t in enumerate(topics[1:], 1) if i != event.strategy_topic],
+            )
+        ]
+        values = indexed + list(decode([t for _, t in event.data], bytes(log["data"])))
+        return (
+            strategy,
+            to_checksum_address(log["address"]),
+            log["blockNumber"],
+            log["logIndex"],
+            _hex(log["transactionHash"]),
+            self._timestamp(log["blockNumber"]),
+            *[str(v) if isinstance(v, int) else v for v in values],
+        )
+
+    def _index_range(self, event, start, end, strategies):
+        rows = []
+        for log in self._get_logs(event, start, end):
+            row = self._row(event, log)
+            # a shared vault/pool can emit for strategies indexed further ahead
+            if row[0] in strategies:
+                rows.append(row)
+        self.store.insert(event, rows)
+        return len(rows)
+
+    def run(self, to_block=None):
+        """Indexes every strategy up to `to_block` (default: head), returns the rows added"""
+        if to_block is None:
+            to_block = self.w3.eth.block_number
+        self._check_reorg()
+
+        checkpoints = {s: self.store.checkpoint(s) for s in self.strategies}
+        start = min(
+            self.start_block - 1 if c is None else c for c in checkpoints.values()
+        )
+        start += 1
+        added = 0
+        while start <= to_block:
+            end = min(start + self.chunk_size - 1, to_block)
+            behind = {s for s, c in checkpoints.items() if c is None or c < start}
+            with self.store.db:
+                for event in EVENTS:
+                    added += self._index_range(event, start, end, behind)
+                self.store.db.executemany(
+                    "INSERT OR REPLACE INTO checkpoints (strategy, block) VALUES (?, ?)",
+                    [(s, end) for s in behind],
+                )
+            for s in behind:
+                checkpoints[s] = end
+            start = end + 1
+
+        self._remember_hashes(to_block)
+        return added
+
+    def _remember_hashes(self, head):
+        first = max(0, head - self.reorg_depth + 1)
+        known = {
+            b
+            for (b,) in self.store.db.execute(
+                "SELECT block FROM block_hashes WHERE block >= ?", (first,)
+            )
+        }
+        with self.store.db:
+            self.store.db.executemany(
+                "INSERT INTO block_hashes (block, hash) VALUES (?, ?)",
+                [
+                    (b, self._block_hash(b))
+                    for b in range(first, head + 1)
+                    if b not in known
+                ],
+            )
+            self.store.db.execute("DELETE FROM block_hashes WHERE block < ?", (first,))
+
+
+def sources(strategy):
+    """Contracts whose events are indexed for a deployed brownie strategy"""
+    return {
+        "vault": strategy.vault(),
+        "gauge": strategy.gauge(),
+        "pool": strategy.pool(),
+    }
+
+
+def main(db, start_block, *strategies):
+    from brownie import Strategy, web3
+
+    store = Store(db)
+    indexer = Indexer(
+        web3,
+        store,
+        {s: sources(Strategy.at(s)) for s in strategies},
+        start_block=int(start_block),
+    )
+    added = indexer.run()
+    print(f"{added} events indexed in {indexer.get_logs_calls} eth_getLogs calls")
+    store.close()
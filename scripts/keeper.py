@@ -0,0 +1,367 @@
+"""
+Asyncio keeper for many strategies.
+
+Each round polls harvestTrigger(callCost)/tendTrigger(callCost) of every due
+strategy with bounded concurrency, dry-runs harvest()/tend() with eth_call to
+drop the ones that would revert, and sends the rest through a single
+nonce-managed sender. Strategies that revert, or whose transaction has no
+receipt after `receipt_timeout` seconds, are backed off exponentially.
+
+    brownie run keeper main <strategy> [<strategy> ...] --network development
+"""
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+import aiohttp
+from eth_account import Account
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+
+HARVEST_TRIGGER = function_signature_to_4byte_selector("harvestTrigger(uint256)")
+TEND_TRIGGER = function_signature_to_4byte_selector("tendTrigger(uint256)")
+HARVEST = function_signature_to_4byte_selector("harvest()")
+TEND = function_signature_to_4byte_selector("tend()")
+# Error(string)
+ERROR_SELECTOR = "0x08c379a0"
+
+
+class RevertError(Exception):
+    pass
+
+
+def _uint(value):
+    return int(value).to_bytes(32, "big")
+
+
+def _hex(data):
+    return "0x" + data.hex()
+
+
+def _revert_reason(error):
+    data = error.get("data")
+    if isinstance(data, dict):
+        # ganache nests the result per transaction hash
+        data = next(iter(data.values()), {})
+        data = data.get("return") if isinstance(data, dict) else data
+    if isinstance(data, str) and data.startswith(ERROR_SELECTOR):
+        raw = bytes.fromhex(data[10:])
+        length = int.from_bytes(raw[32:64], "big")
+        return raw[64 : 64 + length].decode(errors="replace")
+    return error.get("message", "reverted")
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class RpcClient:
+    def __init__(self, url):
+        self.url = url
+        self.requests = 0
+        self._ids = itertools.count()
+        self._session = None
+
+    async def __aenter__(self):
+        self._session = aiohttp.ClientSession()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+    async def request(self, method, params):
+        self.requests += 1
+        payload = {
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+            "method": method,
+            "params": params,
+        }
+        async with self._session.post(self.url, json=payload) as response:
+            result = await response.json(content_type=None)
+        if "error" in result:
+            raise RevertError(_revert_reason(result["error"]))
+        return result["result"]
+
+    async def batch(self, calls):
+        """
+        Sends [(method, params)] as one JSON-RPC batch. Returns the results
+        in order, with a RevertError in place of each failed call.
+        """
+        if not calls:
+            return []
+        self.requests += len(calls)
+        ids = [next(self._ids) for _ in calls]
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in zip(ids, calls)
+        ]
+        async with self._session.post(self.url, json=payload) as response:
+            results = await response.json(content_type=None)
+        by_id = {r["id"]: r for r in results}
+        return [
+            RevertError(_revert_reason(by_id[i]["error"]))
+            if "error" in by_id[i]
+            else by_id[i]["result"]
+            for i in ids
+        ]
+
+
+class NonceSender:
+    """
+    Sends transactions from one account with locally assigned nonces, so
+    several transactions can be in flight at once. Signs with `private_key`
+    if given, otherwise relies on the node having the account unlocked.
+    """
+
+    def __init__(self, rpc, address, private_key=None, gas_limit=2_500_000):
+        self.rpc = rpc
+        self.address = to_checksum_address(address)
+        self.private_key = private_key
+        self.gas_limit = gas_limit
+        self._nonce = None
+        self._chain_id = None
+        self._lock = asyncio.Lock()
+
+    async def _sync_nonce(self):
+        self._nonce = int(
+            await self.rpc.request(
+                "eth_getTransactionCount", [self.address, "pending"]
+            ),
+            16,
+        )
+
+    async def send(self, to, data, gas_price):
+        async with self._lock:
+            if self._nonce is None:
+                await self._sync_nonce()
+            tx = {
+                "to": to,
+                "data": data,
+                "gas": self.gas_limit,
+                "gasPrice": gas_price,
+                "nonce": self._nonce,
+            }
+            try:
+                if self.private_key is None:
+                    txid = await self.rpc.request(
+                        "eth_sendTransaction", [self._rpc_tx(tx)]
+                    )
+                else:
+                    txid = await self.rpc.request(
+                        "eth_sendRawTransaction", [await self._sign(tx)]
+                    )
+            except RevertError:
+                # the node may have seen other transactions from this account
+                self.resync()
+                raise
+            self._nonce += 1
+            return txid
+
+    def resync(self):
+        # the next send asks the node for the nonce again
+        self._nonce = None
+
+    def _rpc_tx(self, tx):
+        return {
+            "from": self.address,
+            "to": tx["to"],
+            "data": _hex(tx["data"]),
+            **{k: hex(tx[k]) for k in ("gas", "gasPrice", "nonce")},
+        }
+
+    async def _sign(self, tx):
+        if self._chain_id is None:
+            self._chain_id = int(await self.rpc.request("eth_chainId", []), 16)
+        signed = Account.sign_transaction(
+            {**tx, "chainId": self._chain_id}, self.private_key
+        )
+        raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+        return _hex(bytes(raw))
+
+
+class KeeperMetrics:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.rounds = 0
+        self.checks = 0
+        self.sent = Counter()
+        self.confirmed = 0
+        self.failed = 0
+        self.dropped = Counter()
+        self.check_latency = []
+        self.inclusion_latency = []
+        self.round_sizes = []
+        self.round_durations = []
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        return {
+            "rounds": self.rounds,
+            "checks": self.checks,
+            "checks_per_second": self.checks / elapsed if elapsed else 0,
+            "strategies_per_round": max(self.round_sizes, default=0),
+            "round_seconds_p95": _percentile(self.round_durations, 95),
+            "sent": dict(self.sent),
+            "confirmed": self.confirmed,
+            "failed": self.failed,
+            "dropped": dict(self.dropped),
+            "check_latency_p50": _percentile(self.check_latency, 50),
+            "check_latency_p95": _percentile(self.check_latency, 95),
+            "inclusion_latency_p50": _percentile(self.inclusion_latency, 50),
+            "inclusion_latency_p95": _percentile(self.inclusion_latency, 95),
+        }
+
+
+class Keeper:
+    def __init__(
+        self,
+        rpc,
+        sender,
+        strategies,
+        call_cost=0,
+        gas_price=0,
+        concurrency=32,
+        backoff=1,
+        max_backoff=256,
+        receipt_timeout=120,
+    ):
+        self.rpc = rpc
+        self.sender = sender
+        self.strategies = [to_checksum_address(s) for s in strategies]
+        self.call_cost = call_cost
+        self.gas_price = gas_price
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.receipt_timeout = receipt_timeout
+        self.metrics = KeeperMetrics()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # strategy => (consecutive failures, first block it is due again)
+        self._backoff = {}
+        self._receipts = []
+        self._block = None
+
+    def _due(self, block):
+        return [s for s in self.strategies if self._backoff.get(s, (0, 0))[1] <= block]
+
+    def _fail(self, strategy, block):
+        failures = self._backoff.get(strategy, (0, 0))[0] + 1
+        delay = min(self.backoff * 2 ** (failures - 1), self.max_backoff)
+        self._backoff[strategy] = (failures, block + delay)
+
+    async def _call(self, strategy, data):
+        return await self.rpc.request(
+            "eth_call",
+            [
+                {"from": self.sender.address, "to": strategy, "data": _hex(data)},
+                "latest",
+            ],
+        )
+
+    async def _trigger(self, strategy, selector):
+        result = await self._call(strategy, selector + _uint(self.call_cost))
+        return int(result, 16) != 0
+
+    async def check(self, strategy, block):
+        async with self._semaphore:
+            start = time.monotonic()
+            self.metrics.checks += 1
+            try:
+                if await self._trigger(strategy, HARVEST_TRIGGER):
+                    action, data = "harvest", HARVEST
+                elif await self._trigger(strategy, TEND_TRIGGER):
+                    action, data = "tend", TEND
+                else:
+                    return None
+                # dry run, drops strategies that would revert
+                await self._call(strategy, data)
+            except RevertError as e:
+                self.metrics.dropped[str(e)] += 1
+                self._fail(strategy, block)
+                return None
+            finally:
+                self.metrics.check_latency.append(time.monotonic() - start)
+
+        try:
+            txid = await self.sender.send(strategy, data, self.gas_price)
+        except RevertError as e:
+            # rejected by the node, the other strategies of the round go on
+            self.metrics.dropped[str(e)] += 1
+            self._fail(strategy, block)
+            return None
+        self.metrics.sent[action] += 1
+        self._backoff.pop(strategy, None)
+        self._receipts.append(
+            asyncio.ensure_future(self._wait(strategy, txid, time.monotonic()))
+        )
+        return txid
+
+    async def _wait(self, strategy, txid, sent_at, poll_interval=0.1):
+        deadline = sent_at + self.receipt_timeout
+        while True:
+            receipt = await self.rpc.request("eth_getTransactionReceipt", [txid])
+            if receipt is not None:
+                break
+            if time.monotonic() >= deadline:
+                # dropped or stuck, the later nonces wait behind it
+                self.metrics.dropped["receipt timeout"] += 1
+                self.sender.resync()
+                self._fail(strategy, self._block)
+                return None
+            await asyncio.sleep(poll_interval)
+        self.metrics.inclusion_latency.append(time.monotonic() - sent_at)
+        if int(receipt["status"], 16) == 1:
+            self.metrics.confirmed += 1
+        else:
+            self.metrics.failed += 1
+        return receipt
+
+    async def run_round(self, block):
+        self._block = block
+        due = self._due(block)
+        start = time.monotonic()
+        txids = await asyncio.gather(*[self.check(s, block) for s in due])
+        self.metrics.rounds += 1
+        self.metrics.round_sizes.append(len(due))
+        self.metrics.round_durations.append(time.monotonic() - start)
+        return [t for t in txids if t is not None]
+
+    async def run(self, rounds=None, poll_interval=1):
+        last_block = None
+        for _ in itertools.count() if rounds is None else range(rounds):
+            block = int(await self.rpc.request("eth_blockNumber", []), 16)
+            while block == last_block:
+                await asyncio.sleep(poll_interval)
+                block = int(await self.rpc.request("eth_blockNumber", []), 16)
+            last_block = block
+            await self.run_round(block)
+            self._receipts = [r for r in self._receipts if not r.done()]
+        await asyncio.gather(*self._receipts)
+        self._receipts = []
+        return self.metrics.report()
+
+
+async def run_keeper(url, strategies, address, private_key=None, rounds=None, **kwargs):
+    async with RpcClient(url) as rpc:
+        sender = NonceSender(rpc, address, private_key)
+        keeper = Keeper(rpc, sender, strategies, **kwargs)
+        return await keeper.run(rounds=rounds)
+
+
+def main(*strategies):
+    from brownie import accounts, web3
+
+    keeper = accounts[0]
+    report = asyncio.run(
+        run_keeper(
+            web3.provider.endpoint_uri,
+            strategies,
+            keeper.address,
+            getattr(keeper, "private_key", None),
+            gas_price=web3.eth.gas_price,
+        )
+    )
+    print(report)
@@ -0,0 +1,504 @@
+"""
+Load generator: many depositors against a local strategy deployment.
+
+Deploys the mock stack, creates `users` fresh accounts (keys derived from the
+seed, minted the want they will deposit) and drives a random mix of
+deposits, withdrawals and harvests between them. User transactions are
+signed locally and sent as JSON-RPC batches, several batches in flight at
+once; a harvest waits for everything before it and is sent alone.
+
+Reports throughput, gas percentiles per operation, the penalty withdrawers
+paid (share value at the batch's price per share minus the want received)
+and the drift of the price per share. Pool interest and gauge rewards are
+stopped unless `frozen` is false, so the drift is what the withdrawals and
+harvests cost the remaining depositors. Each comma separated user count is
+run from the same fresh deployment:
+
+    brownie run load_generator main 100,1000,5000 [ops per user] [mix] --network development
+
+The mix is `deposit=60,withdraw=30,harvest=10` by default.
+"""
+import asyncio
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from typing import NamedTuple, Optional
+
+from eth_account import Account
+from eth_utils import function_signature_to_4byte_selector, keccak, to_checksum_address
+
+from scripts.keeper import RevertError, RpcClient, _hex, _percentile, _uint
+
+MAX_BPS = 10_000
+KINDS = ("deposit", "withdraw", "harvest")
+DEFAULT_MIX = "deposit=60,withdraw=30,harvest=10"
+# largest deposit in whole want tokens, amounts are log-uniform below it
+MAX_DEPOSIT = 1_000_000
+GAS_LIMIT = 2_500_000
+TRANSFER = keccak(text="Transfer(address,address,uint256)")
+
+MINT = function_signature_to_4byte_selector("mint(address,uint256)")
+APPROVE = function_signature_to_4byte_selector("approve(address,uint256)")
+DEPOSIT = function_signature_to_4byte_selector("deposit(uint256)")
+WITHDRAW = function_signature_to_4byte_selector("withdraw(uint256,address,uint256)")
+HARVEST = function_signature_to_4byte_selector("harvest()")
+BALANCE_OF = function_signature_to_4byte_selector("balanceOf(address)")
+PRICE_PER_SHARE = function_signature_to_4byte_selector("pricePerShare()")
+
+
+class Op(NamedTuple):
+    kind: str
+    user: Optional[int]
+    # want base units for a deposit, bps of the user's shares for a withdrawal
+    value: int
+
+
+def parse_mix(mix):
+    weights = dict.fromkeys(KINDS, 0)
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in weights:
+            raise ValueError(f"unknown operation {kind!r}, expected one of {KINDS}")
+        weights[kind] = int(weight)
+    if weights["deposit"] <= 0:
+        raise ValueError("the mix needs deposits")
+    return weights
+
+
+def plan(users, ops, mix, seed=0, unit=10 ** 6, max_deposit=MAX_DEPOSIT):
+    """
+    `ops` operations drawn from the `mix` weights. Withdrawals only go to
+    users holding shares and are full exits half of the time.
+    """
+    rng = random.Random(seed)
+    kinds, weights = zip(*parse_mix(mix).items())
+    holders = set()
+    out = []
+    for _ in range(ops):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "withdraw" and not holders:
+            kind = "deposit"
+        if kind == "deposit":
+            user = rng.randrange(users)
+            # odd base unit amounts, for the rounding
+            amount = int(unit * 10 ** rng.uniform(0, math.log10(max_deposit)))
+            out.append(Op("deposit", user, max(amount, 1)))
+            holders.add(user)
+        elif kind == "withdraw":
+            user = rng.choice(sorted(holders))
+            bps = MAX_BPS if rng.random() < 0.5 else rng.randint(1, MAX_BPS)
+            out.append(Op("withdraw", user, bps))
+            if bps == MAX_BPS:
+                holders.discard(user)
+        else:
+            out.append(Op("harvest", None, 0))
+    return out
+
+
+def funding(ops):
+    """Want to mint each user, what they deposit in total"""
+    amounts = defaultdict(int)
+    for op in ops:
+        if op.kind == "deposit":
+            amounts[op.user] += op.value
+    return dict(amounts)
+
+
+def batches(ops):
+    """
+    Splits the operations into batches that can be in flight together: every
+    user at most once in a batch, and a harvest alone between them.
+    """
+    out, current, seen = [], [], set()
+    for op in ops:
+        if op.kind == "harvest" or op.user in seen:
+            if current:
+                out.append(current)
+            current, seen = [], set()
+        if op.kind == "harvest":
+            out.append([op])
+            continue
+        current.append(op)
+        seen.add(op.user)
+    if current:
+        out.append(current)
+    return out
+
+
+def received(receipt, token, sender, recipient):
+    """`token` moved from `sender` to `recipient` in the receipt's logs"""
+    token, sender, recipient = (
+        a.lower() for a in (token, _topic(sender), _topic(recipient))
+    )
+    return sum(
+        int(log["data"], 16)
+        for log in receipt["logs"]
+        if log["address"].lower() == token
+        and len(log["topics"]) == 3
+        and log["topics"][0].lower() == _hex(TRANSFER)
+        and log["topics"][1].lower() == sender
+        and log["topics"][2].lower() == recipient
+    )
+
+
+def _topic(address):
+    if len(address) == 66:
+        return address
+    return "0x" + address[2:].lower().rjust(64, "0")
+
+
+def _address(address):
+    return bytes.fromhex(to_checksum_address(address)[2:]).rjust(32, b"\0")
+
+
+class Wallet:
+    """A locally signing account with its own nonce"""
+
+    def __init__(self, private_key):
+        self.private_key = private_key
+        self.address = Account.from_key(private_key).address
+        self.nonce = None
+
+    @classmethod
+    def derive(cls, seed, index):
+        return cls(keccak(text=f"load-generator:{seed}:{index}"))
+
+    def sign(self, to, data, gas_price, chain_id, value=0, gas=GAS_LIMIT):
+        signed = Account.sign_transaction(
+            {
+                "to": to,
+                "data": data,
+                "value": value,
+                "gas": gas,
+                "gasPrice": gas_price,
+                "nonce": self.nonce,
+                "chainId": chain_id,
+            },
+            self.private_key,
+        )
+        self.nonce += 1
+        raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+        return _hex(bytes(raw))
+
+
+class LoadMetrics:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.finished = None
+        self.sent = Counter()
+        self.failed = Counter()
+        self.rejected = Counter()
+        self.gas = defaultdict(list)
+        self.penalty = 0
+        self.withdrawn_value = 0
+        self.share_price = []
+
+    def report(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        confirmed = sum(len(g) for g in self.gas.values())
+        start, end = (
+            (self.share_price[0], self.share_price[-1]) if self.share_price else (0, 0)
+        )
+        return {
+            "transactions": confirmed,
+            "seconds": elapsed,
+            "tx_per_second": confirmed / elapsed if elapsed else 0,
+            "sent": dict(self.sent),
+            "failed": dict(self.failed),
+            "rejected": dict(self.rejected),
+            "gas": {
+                kind: {
+                    "count": len(gas),
+                    "p50": _percentile(gas, 50),
+                    "p95": _percentile(gas, 95),
+                    "p99": _percentile(gas, 99),
+                    "max": max(gas),
+                }
+                for kind, gas in sorted(self.gas.items())
+            },
+            "penalty": self.penalty,
+            "penalty_bps": self.penalty * MAX_BPS / self.withdrawn_value
+            if self.withdrawn_value
+            else 0,
+            "share_price_start": start,
+            "share_price_end": end,
+            "share_price_drift_bps": (end - start) * MAX_BPS / start if start else 0,
+        }
+
+
+class LoadRun:
+    """
+    Drives planned operations against `vault`/`strategy` from `wallets`, one
+    per user, with `harvester` sending the harvests. At most `concurrency`
+    batches of `batch_size` transactions are in flight at once.
+    """
+
+    def __init__(
+        self,
+        rpc,
+        vault,
+        strategy,
+        token,
+        harvester,
+        wallets,
+        gas_price=0,
+        batch_size=100,
+        concurrency=4,
+        harvest_interval=3600,
+        unit=10 ** 6,
+    ):
+        self.rpc = rpc
+        self.vault = to_checksum_address(vault)
+        self.strategy = to_checksum_address(strategy)
+        self.token = to_checksum_address(token)
+        self.harvester = harvester
+        self.wallets = wallets
+        self.gas_price = gas_price
+        self.batch_size = batch_size
+        self.harvest_interval = harvest_interval
+        # one share and one want token, the vault has the want's decimals
+        self.unit = unit
+        self.metrics = LoadMetrics()
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._chain_id = None
+
+    async def _calls(self, calls):
+        results = await self.rpc.batch(
+            [
+                ("eth_call", [{"to": to, "data": _hex(data)}, "latest"])
+                for to, data in calls
+            ]
+        )
+        for result in results:
+            if isinstance(result, RevertError):
+                raise result
+        return [int(r, 16) for r in results]
+
+    async def _sync(self, wallets):
+        if self._chain_id is None:
+            self._chain_id = int(await self.rpc.request("eth_chainId", []), 16)
+        pending = [w for w in wallets if w.nonce is None]
+        counts = await self.rpc.batch(
+            [("eth_getTransactionCount", [w.address, "pending"]) for w in pending]
+        )
+        for wallet, count in zip(pending, counts):
+            wallet.nonce = int(count, 16)
+
+    async def _send_chunk(self, chunk):
+        async with self._semaphore:
+            txids = await self.rpc.batch(
+                [("eth_sendRawTransaction", [raw]) for _, raw in chunk]
+            )
+            sent = []
+            for (kind, _), txid in zip(chunk, txids):
+                if isinstance(txid, RevertError):
+                    # ganache rejects a reverting transaction at submission
+                    self.metrics.rejected[kind] += 1
+                    sent.append(None)
+                else:
+                    self.metrics.sent[kind] += 1
+                    sent.append(txid)
+            return sent
+
+    async def _receipts(self, txids, poll_interval=0.05):
+        receipts = dict.fromkeys(t for t in txids if t is not None)
+        while True:
+            missing = [t for t, r in receipts.items() if r is None]
+            if not missing:
+                break
+            for start in range(0, len(missing), self.batch_size):
+                chunk = missing[start : start + self.batch_size]
+                results = await self.rpc.batch(
+                    [("eth_getTransactionReceipt", [t]) for t in chunk]
+                )
+                receipts.update(zip(chunk, results))
+            if any(r is None for r in receipts.values()):
+                await asyncio.sleep(poll_interval)
+        return [receipts.get(t) for t in txids]
+
+    async def send(self, txs):
+        """[(kind, wallet, to, data, value)] => receipts, None if rejected"""
+        await self._sync({id(tx[1]): tx[1] for tx in txs}.values())
+        signed = [
+            (kind, wallet.sign(to, data, self.gas_price, self._chain_id, value))
+            for kind, wallet, to, data, value in txs
+        ]
+        chunks = [
+            signed[start : start + self.batch_size]
+            for start in range(0, len(signed), self.batch_size)
+        ]
+        txids = [
+            t
+            for sent in await asyncio.gather(*map(self._send_chunk, chunks))
+            for t in sent
+        ]
+        receipts = await self._receipts(txids)
+        for (kind, *_), receipt in zip(txs, receipts):
+            if receipt is None:
+                continue
+            if int(receipt["status"], 16) == 1:
+                self.metrics.gas[kind].append(int(receipt["gasUsed"], 16))
+            else:
+                self.metrics.failed[kind] += 1
+        return receipts
+
+    async def setup(self, amounts, funder=None, eth_per_user=10 ** 17):
+        """Mints every user the want it deposits and approves the vault"""
+        users = [self.wallets[u] for u in sorted(amounts)]
+        if funder is not None and self.gas_price:
+            await self.send(
+                [("fund", funder, w.address, b"", eth_per_user) for w in users]
+            )
+        await self.send(
+            [
+                (
+                    "mint",
+                    w,
+                    self.token,
+                    MINT + _address(w.address) + _uint(amounts[u]),
+                    0,
+                )
+                for u, w in zip(sorted(amounts), users)
+            ]
+        )
+        await self.send(
+            [
+                (
+                    "approve",
+                    w,
+                    self.token,
+                    APPROVE + _address(self.vault) + _uint(2 ** 256 - 1),
+                    0,
+                )
+                for w in users
+            ]
+        )
+        # only the planned operations count
+        self.metrics = LoadMetrics()
+
+    async def _share_price(self):
+        (price,) = await self._calls([(self.vault, PRICE_PER_SHARE)])
+        self.metrics.share_price.append(price)
+        return price
+
+    async def run_batch(self, ops):
+        if ops[0].kind == "harvest":
+            await self.rpc.request("evm_increaseTime", [self.harvest_interval])
+            await self.send([("harvest", self.harvester, self.strategy, HARVEST, 0)])
+            return
+
+        withdrawals = [op for op in ops if op.kind == "withdraw"]
+        price, *shares = await self._calls(
+            [(self.vault, PRICE_PER_SHARE)]
+            + [
+                (self.vault, BALANCE_OF + _address(self.wallets[op.user].address))
+                for op in withdrawals
+            ]
+        )
+        shares = dict(zip((op.user for op in withdrawals), shares))
+        txs, values = [], []
+        for op in ops:
+            wallet = self.wallets[op.user]
+            if op.kind == "deposit":
+                txs.append(
+                    ("deposit", wallet, self.vault, DEPOSIT + _uint(op.value), 0)
+                )
+                continue
+            amount = shares[op.user] * op.value // MAX_BPS
+            if amount == 0:
+                continue
+            data = WITHDRAW + _uint(amount) + _address(wallet.address) + _uint(MAX_BPS)
+            txs.append(("withdraw", wallet, self.vault, data, 0))
+            values.append((len(txs) - 1, wallet, amount))
+
+        receipts = await self.send(txs)
+        for index, wallet, amount in values:
+            receipt = receipts[index]
+            if receipt is None or int(receipt["status"], 16) != 1:
+                continue
+            value = amount * price // self.unit
+            self.metrics.withdrawn_value += value
+            self.metrics.penalty += max(
+                value - received(receipt, self.token, self.vault, wallet.address), 0
+            )
+
+    async def run(self, ops):
+        await self._share_price()
+        for batch in batches(ops):
+            await self.run_batch(batch)
+        await self._share_price()
+        self.metrics.finished = time.monotonic()
+        return self.metrics.report()
+
+
+async def run_load(
+    url, vault, strategy, token, harvester, ops, users, seed=0, funder=None, **kwargs
+):
+    wallets = [Wallet.derive(seed, i) for i in range(users)]
+    async with RpcClient(url) as rpc:
+        load = LoadRun(rpc, vault, strategy, token, harvester, wallets, **kwargs)
+        await load.setup(funding(ops), funder)
+        return await load.run(ops)
+
+
+def format_report(reports):
+    """One row per user count and operation"""
+    lines = [
+        f"{'users':>6} {'op':<9} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    ]
+    for users, report in reports.items():
+        for kind, gas in report["gas"].items():
+            lines.append(
+                f"{users:>6} {kind:<9} {gas['count']:>6} {gas['p50']:>8} "
+                f"{gas['p95']:>8} {gas['p99']:>8} {gas['max']:>8}"
+            )
+    lines.append("")
+    lines.append(
+        f"{'users':>6} {'tx/s':>8} {'failed':>7} {'penalty':>14} {'bps':>7} {'drift bps':>10}"
+    )
+    for users, report in reports.items():
+        failed = sum(report["failed"].values()) + sum(report["rejected"].values())
+        lines.append(
+            f"{users:>6} {report['tx_per_second']:>8.1f} {failed:>7} "
+            f"{report['penalty']:>14} {report['penalty_bps']:>7.2f} "
+            f"{report['share_price_drift_bps']:>10.4f}"
+        )
+    return "\n".join(lines)
+
+
+def main(users="100,1000", ops_per_user=5, mix=DEFAULT_MIX, seed=0, frozen=True):
+    from brownie import accounts, chain, web3
+
+    from scripts.gas_benchmark import deploy
+
+    s = deploy()
+    if str(frozen).lower() not in ("0", "false", "no"):
+        s.pool.setInterestRate(0, {"from": s.gov})
+        s.gauge.setRewardRate(s.pool, 0, {"from": s.gov})
+    unit = 10 ** s.token.decimals()
+    gas_price = web3.eth.gas_price
+    chain.snapshot()
+
+    reports = {}
+    for count in (int(u) for u in str(users).split(",")):
+        ops = plan(count, count * int(ops_per_user), mix, int(seed), unit)
+        reports[count] = asyncio.run(
+            run_load(
+                web3.provider.endpoint_uri,
+                s.vault,
+                s.strategy,
+                s.token,
+                Wallet(s.strategist.private_key),
+                ops,
+                count,
+                int(seed),
+                Wallet(accounts[0].private_key),
+                gas_price=gas_price,
+                unit=unit,
+            )
+        )
+        chain.revert()
+    print(format_report(reports))
+    return reports
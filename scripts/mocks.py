@@ -0,0 +1,105 @@
+"""
+Deploys the mock TrueFi/Uniswap/ySwap stack in contracts/test on a local chain.
+
+Used by the `local` test profile in tests/conftest.py and by scripts that need
+a full strategy deployment without a mainnet fork.
+"""
+from types import SimpleNamespace
+
+from brownie import (
+    MockERC20,
+    MockGauge,
+    MockMultiCallSwapper,
+    MockPool,
+    MockTradeFactory,
+    MockUniRouter,
+    MockWETH,
+)
+
+# 5% APR on the liquid balance, 0.1% liquid exit penalty
+POOL_INTEREST_RATE = 500
+POOL_EXIT_PENALTY = 9_990
+# whole tokens other lenders hold in each pool, an empty pool has no virtual price
+POOL_SEED = 1_000_000
+# 0.01 TRU per second for the pool
+GAUGE_REWARD_RATE = 10 ** 6
+
+
+def deploy_mocks(deployer, ymechs):
+    token = deployer.deploy(MockERC20, "USD Coin", "USDC", 6)
+    tru = deployer.deploy(MockERC20, "TrueFi", "TRU", 8)
+    weth = deployer.deploy(MockWETH)
+
+    # seed TRU/WETH and WETH/USDC at roughly TRU = $0.2, WETH = $3000
+    unirouter = deployer.deploy(MockUniRouter, weth)
+    for (token_a, amount_a), (token_b, amount_b) in [
+        ((tru, 15_000_000 * 10 ** 8), (weth, 1_000 * 10 ** 18)),
+        ((weth, 1_000 * 10 ** 18), (token, 3_000_000 * 10 ** 6)),
+    ]:
+        token_a.mint(deployer, amount_a, {"from": deployer})
+        token_b.mint(deployer, amount_b, {"from": deployer})
+        token_a.approve(unirouter, amount_a, {"from": deployer})
+        token_b.approve(unirouter, amount_b, {"from": deployer})
+        unirouter.addLiquidity(token_a, token_b, amount_a, amount_b, {"from": deployer})
+
+    gauge = deployer.deploy(MockGauge, tru)
+    pool = deploy_pool(deployer, token, gauge)
+
+    trade_factory = ymechs.deploy(MockTradeFactory)
+    multicall_swapper = ymechs.deploy(MockMultiCallSwapper, trade_factory)
+
+    return SimpleNamespace(
+        token=token,
+        tru=tru,
+        weth=weth,
+        unirouter=unirouter,
+        pool=pool,
+        gauge=gauge,
+        trade_factory=trade_factory,
+        multicall_swapper=multicall_swapper,
+    )
+
+
+def deploy_pool(
+    deployer,
+    token,
+    gauge,
+    interest_rate=POOL_INTEREST_RATE,
+    exit_penalty=POOL_EXIT_PENALTY,
+    reward_rate=GAUGE_REWARD_RATE,
+):
+    pool = deployer.deploy(MockPool, token, interest_rate, exit_penalty)
+    seed = POOL_SEED * 10 ** token.decimals()
+    token.mint(deployer, seed, {"from": deployer})
+    token.approve(pool, seed, {"from": deployer})
+    pool.join(seed, {"from": deployer})
+    gauge.setRewardRate(pool, reward_rate, {"from": deployer})
+    return pool
+
+
+def deploy_vault(Vault, token, gov, rewards, guardian, management):
+    vault = guardian.deploy(Vault)
+    vault.initialize(token, gov, rewards, "", "", guardian, management)
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.setManagement(management, {"from": gov})
+    return vault
+
+
+def deploy_strategy(Strategy, strategist, keeper, gov, vault, mocks, debt_ratio=10_000):
+    strategy = strategist.deploy(
+        Strategy,
+        vault,
+        mocks.pool,
+        mocks.gauge,
+        mocks.tru,
+        mocks.unirouter,
+        [mocks.tru, mocks.weth, mocks.token],
+    )
+    strategy.setKeeper(keeper)
+    vault.addStrategy(strategy, debt_ratio, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    return strategy
+
+
+def set_trade_factory(strategy, trade_factory, ymechs, gov):
+    trade_factory.grantRole(trade_factory.STRATEGY(), strategy, {"from": ymechs})
+    strategy.setTradeFactory(trade_factory, {"from": gov})
@@ -0,0 +1,264 @@
+"""
+Integer model of the Strategy accounting, vectorized over scenarios.
+
+Every field of `StrategyState` is a numpy array of Python ints (dtype=object),
+one element per scenario, so the uint256 math matches Strategy.sol bit for bit
+while running over tens of thousands of scenarios per call. The pool follows
+TrueFi's join/liquidExit math with a flat exit penalty per scenario, which is
+how contracts/test/MockPool.sol behaves.
+"""
+import numpy as np
+
+WAD = 10 ** 18
+MAX_BPS = 10_000
+
+FIELDS = (
+    "want",  # idle want held by the strategy
+    "lp",  # pool LP held by the strategy
+    "staked",  # pool LP staked in the gauge
+    "pool_value",  # pool.poolValue()
+    "pool_supply",  # pool.totalSupply()
+    "penalty",  # pool.liquidExitPenalty(), 10_000 means no penalty
+    "debt",  # vault.strategies(strategy).totalDebt
+)
+
+
+def _ints(values, size):
+    if np.ndim(values) == 0:
+        return np.full(size, int(values), dtype=object)
+    return np.array([int(v) for v in values], dtype=object)
+
+
+class StrategyState:
+    __slots__ = FIELDS
+
+    def __init__(self, **fields):
+        size = max(np.size(fields[f]) for f in FIELDS)
+        for f in FIELDS:
+            setattr(self, f, _ints(fields[f], size))
+
+    def __len__(self):
+        return len(self.want)
+
+    def copy(self):
+        return StrategyState(**{f: getattr(self, f).copy() for f in FIELDS})
+
+    def take(self, index):
+        return StrategyState(**{f: getattr(self, f)[index] for f in FIELDS})
+
+
+# ******** views ************
+
+
+def get_virtual_price(s):
+    return s.pool_value * WAD // s.pool_supply
+
+
+def total_lp(s):
+    return s.lp + s.staked
+
+
+def total_lp_to_want(s):
+    return total_lp(s) * get_virtual_price(s) // WAD
+
+
+def estimated_total_assets(s):
+    return total_lp_to_want(s) + s.want
+
+
+def exit_penalty_fee_lp(s, amount):
+    return (MAX_BPS - s.penalty) * amount // MAX_BPS
+
+
+def exit_penalty_fee_want(s, amount):
+    return exit_penalty_fee_lp(s, amount) * get_virtual_price(s) // WAD
+
+
+# ******** state transitions, these update `s` in place ************
+
+
+def _join(s, amount):
+    can_price = (s.pool_supply > 0) & (s.pool_value > 0)
+    minted = np.where(
+        can_price, amount * s.pool_supply // np.maximum(s.pool_value, 1), amount
+    )
+    s.pool_value += amount
+    s.pool_supply += minted
+    s.want -= amount
+    s.lp += minted
+
+
+def _liquid_exit(s, amount):
+    out = s.pool_value * amount // s.pool_supply
+    out = out * s.penalty // MAX_BPS
+    s.lp -= amount
+    s.pool_supply -= amount
+    s.pool_value -= out
+    s.want += out
+
+
+def lp_for_want(s, amount_want):
+    """
+    Strategy._lpForWant: LP whose liquidExit output after the penalty covers
+    `amount_want`, capped at the staked LP. The model penalty is flat, so the
+    contract's fixed-point rounds settle on the first one, and the whole pool
+    is liquid, so the contract's cap at the liquid value never applies.
+    """
+    amount_want = _ints(amount_want, len(s))
+    kept = np.maximum(s.penalty, 1)
+    gross = (amount_want * MAX_BPS + kept - 1) // kept
+    value = np.maximum(s.pool_value, 1)
+    lp = (gross * s.pool_supply + value - 1) // value
+    lp = np.where(s.penalty == 0, s.staked, lp)
+    lp = np.where((amount_want == 0) | (s.pool_value == 0), 0, lp)
+    return np.minimum(lp, s.staked)
+
+
+def preview_withdraw(s, amounts):
+    """
+    Want received and LP exited by `_withdrawSome` for each size in
+    `amounts`, from a single-scenario state; does not change `s`
+    """
+    amounts = _ints(amounts, 1)
+    many = s.take(np.zeros(len(amounts), dtype=int))
+    lp = lp_for_want(many, amounts)
+    withdraw_some(many, amounts)
+    return many.want - s.want[0], lp
+
+
+def withdraw_some(s, amount_want):
+    withdrawn = lp_for_want(s, amount_want)
+    # gauge.unstake
+    s.staked -= withdrawn
+    s.lp += withdrawn
+    _liquid_exit(s, withdrawn)
+
+
+def liquidate_position(s, amount_needed):
+    amount_needed = _ints(amount_needed, len(s))
+    enough = s.want > amount_needed
+    withdraw_some(s, np.where(enough, 0, amount_needed - s.want))
+    short = amount_needed > s.want
+    liquidated = np.where(enough | ~short, amount_needed, s.want)
+    loss = np.where(enough | ~short, 0, amount_needed - s.want)
+    return liquidated, loss
+
+
+def liquidate_all_positions(s):
+    # gauge.exit, then liquidExit of every LP
+    s.lp += s.staked
+    s.staked = np.zeros(len(s), dtype=object)
+    _liquid_exit(s, s.lp)
+    return s.want.copy()
+
+
+def prepare_return(s, debt_outstanding):
+    debt_outstanding = _ints(debt_outstanding, len(s))
+    assets = estimated_total_assets(s)
+    loss = np.where(s.debt > assets, s.debt - assets, 0)
+    profit = np.where(s.debt > assets, 0, assets - s.debt)
+
+    freed, withdrawal_loss = liquidate_position(s, debt_outstanding + profit)
+    debt_payment = np.minimum(debt_outstanding, freed)
+    loss = loss + withdrawal_loss
+
+    # net out PnL
+    net_profit = np.where(profit > loss, profit - loss, 0)
+    net_loss = np.where(profit > loss, 0, loss - profit)
+    return net_profit, net_loss, debt_payment
+
+
+def report(s, profit, debt_payment, credit):
+    # want moved by vault.report(): the vault pulls profit + debtPayment and
+    # sends `credit`, netted against each other
+    s.want += _ints(credit, len(s)) - profit - debt_payment
+    s.debt += _ints(credit, len(s)) - debt_payment
+
+
+def buffer(s, idle, buffer_bps, band_bps):
+    """Idle want target and hysteresis band of the liquid buffer"""
+    total = total_lp_to_want(s) + idle
+    return total * buffer_bps // MAX_BPS, total * band_bps // MAX_BPS
+
+
+def adjust_position(s, debt_outstanding, buffer_bps=0, band_bps=0):
+    debt_outstanding = _ints(debt_outstanding, len(s))
+    idle = np.where(s.want > debt_outstanding, s.want - debt_outstanding, 0)
+    target, band = buffer(s, idle, buffer_bps, band_bps)
+    # refill the buffer once it drops below the band
+    refill = np.where(idle + band < target, target - idle, 0)
+    if refill.any():
+        withdraw_some(s, refill)
+    # invest what is above the band, keeping the buffer
+    _join(s, np.where(idle > target + band, idle - target, 0))
+    # gauge.stake
+    s.staked += s.lp
+    s.lp = np.zeros(len(s), dtype=object)
+
+
+# ******** differential check against a deployed strategy ************
+
+
+def from_chain(strategy, vault, pool):
+    """Read the model inputs of a deployed strategy as a one-scenario state"""
+    return StrategyState(
+        want=strategy.balanceOfWant(),
+        lp=pool.balanceOf(strategy),
+        staked=strategy.balanceOfLPInGauge(),
+        pool_value=pool.poolValue(),
+        pool_supply=pool.totalSupply(),
+        penalty=pool.liquidExitPenalty(strategy.totalLP()),
+        debt=vault.strategies(strategy).dict()["totalDebt"],
+    )
+
+
+def differential_check(
+    chain, strategy, vault, pool, scenarios, apply, sample=None, seed=0
+):
+    """
+    Replay scenarios on chain and assert the model is bit-exact.
+
+    `apply(scenario)` puts the chain into the scenario (e.g. sets the mock
+    pool penalty, donates or burns pool assets). The model then predicts the
+    views and the `Harvested` event from the on-chain inputs, `harvest()` is
+    sent and compared. The pool must not accrue value between the read and
+    the harvest, so run this on the mocks with a zero interest rate.
+    """
+    indexes = range(len(scenarios))
+    if sample is not None and sample < len(scenarios):
+        indexes = np.random.default_rng(seed).choice(
+            len(scenarios), sample, replace=False
+        )
+
+    checked = 0
+    for i in indexes:
+        chain.snapshot()
+        try:
+            apply(scenarios[i])
+            s = from_chain(strategy, vault, pool)
+            outstanding = vault.debtOutstanding(strategy)
+            expected_views = {
+                "estimatedTotalAssets": estimated_total_assets(s)[0],
+                "getVirtualPrice": get_virtual_price(s)[0],
+                "exitPenaltyFeeWant": exit_penalty_fee_want(s, total_lp(s))[0],
+            }
+            actual_views = {
+                "estimatedTotalAssets": strategy.estimatedTotalAssets(),
+                "getVirtualPrice": strategy.getVirtualPrice(),
+                "exitPenaltyFeeWant": strategy.exitPenaltyFeeWant(strategy.totalLP()),
+            }
+            assert expected_views == actual_views, (
+                scenarios[i],
+                expected_views,
+                actual_views,
+            )
+
+            profit, loss, debt_payment = prepare_return(s, outstanding)
+            event = strategy.harvest().events["Harvested"]
+            expected = (profit[0], loss[0], debt_payment[0])
+            actual = (event["profit"], event["loss"], event["debtPayment"])
+            assert expected == actual, (scenarios[i], expected, actual)
+        finally:
+            chain.revert()
+        checked += 1
+    return checked
@@ -0,0 +1,91 @@
+"""
+Wall time of the test suite at several worker counts.
+
+`brownie test -n <workers>` runs the suite on pytest-xdist. Every worker
+launches its own ganache on the network's port + worker id, with the same
+mnemonic and so the same accounts, and builds its own fixtures. Brownie
+schedules whole modules (module isolation) and merges the workers' results
+into build/tests.json.
+
+This script times the serial run and the parallel runs, and next to each one
+prints the bound set by module scheduling: modules timed in the serial run
+are packed longest first onto the workers, and the slowest worker is the
+best time any run can reach. A speedup far below the bound points at worker
+startup cost; a bound far below linear points at one module dominating.
+
+    python scripts/parallel_timing.py [network] [workers ...]
+
+(not `brownie run`, which would hold a chain on the port worker 0 uses)
+"""
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from pathlib import Path
+
+
+def run_suite(workers, network="development", junit=None, args=()):
+    """Seconds taken by `brownie test`, serially when `workers` is 1"""
+    cmd = ["brownie", "test", "--network", network, *args]
+    if workers > 1:
+        cmd += ["-n", str(workers)]
+    if junit is not None:
+        cmd += [f"--junitxml={junit}"]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} failed:\n{result.stdout[-4000:]}")
+    return elapsed
+
+
+def module_times(junit):
+    """Seconds per test module from a junit xml report"""
+    times = defaultdict(float)
+    for case in ET.parse(junit).iter("testcase"):
+        # classname is "tests.test_module" or "tests.test_module.TestClass"
+        parts = case.get("classname", "").split(".")
+        module = next((p for p in parts if p.startswith("test_")), parts[-1])
+        times[module] += float(case.get("time", 0))
+    return dict(times)
+
+
+def schedule_bound(times, workers):
+    """Makespan of the modules packed longest first onto `workers`"""
+    loads = [0.0] * workers
+    for seconds in sorted(times.values(), reverse=True):
+        loads[loads.index(min(loads))] += seconds
+    return max(loads)
+
+
+def format_table(serial, runs, times):
+    lines = [
+        f"{'workers':>8}{'wall s':>10}{'speedup':>10}{'bound s':>10}{'efficiency':>12}"
+    ]
+    for workers, seconds in sorted(runs.items()):
+        lines.append(
+            f"{workers:>8}{seconds:>10.1f}{serial / seconds:>10.2f}"
+            f"{schedule_bound(times, workers):>10.1f}"
+            f"{serial / seconds / workers:>12.0%}"
+        )
+    slowest = sorted(times.items(), key=lambda t: t[1], reverse=True)[:5]
+    lines.append("slowest modules: " + ", ".join(f"{m} {s:.1f}s" for m, s in slowest))
+    return "\n".join(lines)
+
+
+def main(network="development", *workers):
+    counts = sorted({int(w) for w in workers} | {1}) if workers else [1, 2, 4, 8]
+    with tempfile.TemporaryDirectory() as tmp:
+        junit = Path(tmp) / "serial.xml"
+        runs = {1: run_suite(1, network, junit)}
+        times = module_times(junit)
+    for count in counts:
+        if count > 1:
+            runs[count] = run_suite(count, network)
+    print(format_table(runs[1], runs, times))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
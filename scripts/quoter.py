@@ -0,0 +1,208 @@
+"""
+Local UniswapV2 quoting for ySwap trades.
+
+Reserves of every pair in a token graph are loaded with one Multicall2 read,
+then outputs for many amounts over many candidate paths are computed with the
+router's getAmountOut math (0.3% fee, integer division per hop). Amounts are
+numpy arrays of Python ints (dtype=object) like scripts/model.py, so quotes
+match `getAmountsOut` exactly instead of costing one eth_call each.
+"""
+import itertools
+
+import numpy as np
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+
+FEE = 997
+FEE_BASE = 1_000
+
+GET_RESERVES = function_signature_to_4byte_selector("getReserves()")
+GET_PAIR = function_signature_to_4byte_selector("getPair(address,address)")
+ROUTER_GET_RESERVES = function_signature_to_4byte_selector(
+    "getReserves(address,address)"
+)
+
+
+def _address(token):
+    return to_checksum_address(getattr(token, "address", token))
+
+
+def _word(address):
+    return bytes(12) + bytes.fromhex(address[2:])
+
+
+def _uints(data, count):
+    """The first `count` static words of an ABI encoded return value"""
+    data = bytes(data)
+    return tuple(
+        int.from_bytes(data[i * 32 : (i + 1) * 32], "big") for i in range(count)
+    )
+
+
+def _ints(values):
+    return np.array([int(v) for v in np.ravel(values)], dtype=object).reshape(
+        np.shape(values)
+    )
+
+
+def get_amount_out(amount_in, reserve_in, reserve_out):
+    """
+    UniswapV2Library.getAmountOut, broadcast over its arguments. Where the
+    router would revert (no input or no liquidity) the quote is 0.
+    """
+    amount_in, reserve_in, reserve_out = np.broadcast_arrays(
+        _ints(amount_in), _ints(reserve_in), _ints(reserve_out)
+    )
+    valid = (amount_in > 0) & (reserve_in > 0) & (reserve_out > 0)
+    amount_in_with_fee = amount_in * FEE
+    numerator = amount_in_with_fee * reserve_out
+    denominator = reserve_in * FEE_BASE + amount_in_with_fee
+    out = np.zeros(amount_in.shape, dtype=object)
+    out[valid] = numerator[valid] // denominator[valid]
+    return out
+
+
+class RouterReserves:
+    """Reserves of a router that keeps them itself (contracts/test/MockUniRouter)"""
+
+    def __init__(self, router):
+        self.router = _address(router)
+
+    def calls(self, pairs, block=None):
+        return [
+            (self.router, ROUTER_GET_RESERVES + _word(a) + _word(b)) for a, b in pairs
+        ]
+
+    def decode(self, pair, data):
+        return _uints(data, 2)
+
+
+class PairReserves:
+    """
+    Reserves of UniswapV2/Sushiswap pairs. Pair addresses are resolved through
+    the factory once, in a batch, and kept for later loads.
+    """
+
+    def __init__(self, multicall, factory):
+        self.multicall = multicall
+        self.factory = _address(factory)
+        self.pairs = {}
+
+    def _resolve(self, pairs, block):
+        missing = sorted({tuple(sorted(p)) for p in pairs} - self.pairs.keys())
+        if not missing:
+            return
+        calls = [(self.factory, GET_PAIR + _word(a) + _word(b)) for a, b in missing]
+        results = self.multicall.tryAggregate.call(False, calls, block_identifier=block)
+        for key, (success, data) in zip(missing, results):
+            pair = bytes(data)[12:32] if success else bytes(20)
+            self.pairs[key] = to_checksum_address(pair) if any(pair) else None
+
+    def calls(self, pairs, block=None):
+        self._resolve(pairs, block)
+        # pairs without a pool are read from the factory and decode to no reserves
+        return [
+            (self.pairs[tuple(sorted(p))] or self.factory, GET_RESERVES) for p in pairs
+        ]
+
+    def decode(self, pair, data):
+        if self.pairs[tuple(sorted(pair))] is None:
+            return 0, 0
+        reserve0, reserve1 = _uints(data, 2)
+        # token0 is the lower address
+        if int(pair[0], 16) < int(pair[1], 16):
+            return reserve0, reserve1
+        return reserve1, reserve0
+
+
+def reserve_source(multicall, router):
+    """Mock routers expose their reserves, real ones are read through the factory"""
+    if hasattr(router, "factory"):
+        return PairReserves(multicall, router.factory())
+    return RouterReserves(router)
+
+
+def candidate_paths(token_in, token_out, connectors=(), max_hops=2):
+    """The direct path plus every path through up to `max_hops - 1` connectors"""
+    token_in, token_out = _address(token_in), _address(token_out)
+    connectors = [
+        c for c in map(_address, connectors) if c not in (token_in, token_out)
+    ]
+    paths = []
+    for hops in range(1, max_hops + 1):
+        for middle in itertools.permutations(connectors, hops - 1):
+            paths.append((token_in, *middle, token_out))
+    return paths
+
+
+class Quoter:
+    def __init__(self, reserves, block=None):
+        # (token_in, token_out) => (reserve_in, reserve_out)
+        self.reserves = reserves
+        self.block = block
+
+    @classmethod
+    def load(cls, multicall, source, paths, block=None):
+        """Reads the reserves of every hop of `paths` in one eth_call"""
+        pairs = sorted({tuple(sorted(hop)) for p in paths for hop in zip(p, p[1:])})
+        calls = source.calls(pairs, block)
+        results = multicall.tryAggregate.call(False, calls, block_identifier=block)
+        reserves = {}
+        for (a, b), (success, data) in zip(pairs, results):
+            reserve_a, reserve_b = source.decode((a, b), data) if success else (0, 0)
+            reserves[(a, b)] = (reserve_a, reserve_b)
+            reserves[(b, a)] = (reserve_b, reserve_a)
+        return cls(reserves, block)
+
+    def _path_reserves(self, paths):
+        # shape (paths, hops, 2)
+        return _ints(
+            [[self.reserves.get(hop, (0, 0)) for hop in zip(p, p[1:])] for p in paths]
+        )
+
+    def quote(self, amounts, paths):
+        """
+        Output of every path for every amount, shape (len(paths), len(amounts)).
+        Paths of the same length are evaluated together, one hop at a time.
+        """
+        amounts = _ints(np.atleast_1d(amounts))
+        paths = [tuple(map(_address, p)) for p in paths]
+        out = np.zeros((len(paths), len(amounts)), dtype=object)
+        by_length = {}
+        for i, p in enumerate(paths):
+            by_length.setdefault(len(p), []).append(i)
+        for indexes in by_length.values():
+            reserves = self._path_reserves([paths[i] for i in indexes])
+            current = np.broadcast_to(amounts, (len(indexes), len(amounts)))
+            for hop in range(reserves.shape[1]):
+                current = get_amount_out(
+                    current, reserves[:, hop, 0:1], reserves[:, hop, 1:2]
+                )
+            out[indexes] = current
+        return out
+
+    def best(self, amounts, paths):
+        """Best output per amount and the index of the path giving it"""
+        quotes = self.quote(amounts, paths)
+        index = np.argmax(quotes, axis=0)
+        return quotes[index, np.arange(quotes.shape[1])], index
+
+    def rank(self, amount, paths):
+        """[(amount_out, path)] for one trade size, best route first"""
+        paths = [tuple(map(_address, p)) for p in paths]
+        quotes = self.quote([amount], paths)[:, 0]
+        return sorted(zip(quotes, paths), key=lambda q: q[0], reverse=True)
+
+    def swap(self, amount, path):
+        """
+        Quotes one trade and moves the reserves like swapExactTokensForTokens,
+        so trades executed back to back in one transaction are quoted in order.
+        """
+        path = tuple(map(_address, path))
+        amount = int(amount)
+        for hop in zip(path, path[1:]):
+            reserve_in, reserve_out = self.reserves.get(hop, (0, 0))
+            out = get_amount_out([amount], [reserve_in], [reserve_out])[0]
+            self.reserves[hop] = (reserve_in + amount, reserve_out - out)
+            self.reserves[hop[::-1]] = (reserve_out - out, reserve_in + amount)
+            amount = out
+        return amount
@@ -0,0 +1,151 @@
+"""
+Batched reads of strategy and vault state for a fleet of strategies.
+
+All views of every strategy are packed into one Multicall2.tryAggregate
+eth_call pinned to a block, decoded into `StrategyReading` records and cached
+per block number. `Batch` and the view lists below are shared with
+scripts/snapshot.py and scripts/client.py.
+"""
+from collections import OrderedDict
+from typing import NamedTuple
+
+from brownie import web3
+from brownie.exceptions import VirtualMachineError
+
+# (field, strategy view without arguments)
+STRATEGY_VIEWS = (
+    ("estimated_total_assets", "estimatedTotalAssets"),
+    ("virtual_price", "getVirtualPrice"),
+    ("total_lp", "totalLP"),
+    ("lp_in_gauge", "balanceOfLPInGauge"),
+    ("pending_rewards", "pendingRewards"),
+    ("tru_rewards", "balanceOfTruRewards"),
+    ("exit_penalty_fee", "totalExitPenaltyFee"),
+)
+# (field, key of vault.strategies(strategy))
+STRATEGY_PARAMS = (
+    ("debt_ratio", "debtRatio"),
+    ("total_debt", "totalDebt"),
+    ("total_gain", "totalGain"),
+    ("total_loss", "totalLoss"),
+    ("last_report", "lastReport"),
+)
+
+
+class Batch:
+    """
+    (contract, view, args) calls read together with one Multicall2.tryAggregate
+    eth_call pinned to a block. Calldata is encoded once, a call that reverts
+    reads as None. Without a multicall the views are read one by one.
+    """
+
+    def __init__(self, multicall, calls=()):
+        self.multicall = multicall
+        self.eth_calls = 0
+        self._views = []
+        self._calls = []
+        for contract, view, args in calls:
+            self.add(contract, view, *args)
+
+    def __len__(self):
+        return len(self._views)
+
+    def add(self, contract, view, *args):
+        fn = getattr(contract, view)
+        self._views.append((fn, args))
+        self._calls.append((contract.address, fn.encode_input(*args)))
+        return self
+
+    def read(self, block):
+        if self.multicall is None:
+            return [self._call(fn, args, block) for fn, args in self._views]
+        self.eth_calls += 1
+        results = self.multicall.tryAggregate.call(
+            False, self._calls, block_identifier=block
+        )
+        return [
+            fn.decode_output(data) if success else None
+            for (fn, _), (success, data) in zip(self._views, results)
+        ]
+
+    def _call(self, fn, args, block):
+        self.eth_calls += 1
+        try:
+            return fn.call(*args, block_identifier=block)
+        except VirtualMachineError:
+            return None
+
+
+def strategy_params(params):
+    """STRATEGY_PARAMS of a decoded vault.strategies(), all None if it reverted"""
+    params = params.dict() if params is not None else {}
+    return [params.get(key) for _, key in STRATEGY_PARAMS]
+
+
+class StrategyReading(NamedTuple):
+    strategy: str
+    block: int
+    estimated_total_assets: int
+    virtual_price: int
+    total_lp: int
+    lp_in_gauge: int
+    pending_rewards: int
+    tru_rewards: int
+    exit_penalty_fee: int  # exitPenaltyFeeWant(totalLP()) of the same block
+    debt_ratio: int
+    total_debt: int
+    total_gain: int
+    total_loss: int
+    last_report: int
+
+
+class FleetReader:
+    def __init__(self, multicall, strategies, vaults=None, cache_size=16):
+        from brownie import interface
+
+        self.multicall = multicall
+        self.strategies = list(strategies)
+        if vaults is None:
+            vaults = [interface.VaultAPI(s.vault()) for s in self.strategies]
+        self.vaults = list(vaults)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+        self._batch = Batch(multicall)
+        for strategy, vault in zip(self.strategies, self.vaults):
+            for _, fn in STRATEGY_VIEWS:
+                self._batch.add(strategy, fn)
+            self._batch.add(vault, "strategies", strategy)
+
+    @property
+    def eth_calls(self):
+        return self._batch.eth_calls
+
+    def read(self, block=None):
+        if block is None:
+            block = web3.eth.block_number
+        if block in self._cache:
+            self._cache.move_to_end(block)
+            return self._cache[block]
+
+        per_strategy = len(STRATEGY_VIEWS) + 1
+        values = self._batch.read(block)
+
+        readings = []
+        for i, strategy in enumerate(self.strategies):
+            views = values[i * per_strategy : (i + 1) * per_strategy]
+            # a failed call reads as None, the vault's fields too
+            readings.append(
+                StrategyReading(
+                    strategy.address,
+                    block,
+                    *views[:-1],
+                    *strategy_params(views[-1]),
+                )
+            )
+
+        readings = tuple(readings)
+        self._cache[block] = readings
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return readings
@@ -0,0 +1,141 @@
+"""
+Claim/sell cadence for compounding TRU rewards.
+
+Selling a batch of A TRU costs the claim and swap gas, the fee and price
+impact of the swap along `swapPath`, and the yield the TRU does not earn while it piles
+up (on average A / 2 for A / rewardRate seconds). Gas is spread over larger
+batches while impact and carry grow with them, so the cost per TRU has one
+minimum. Every batch size of a geometric grid is priced at once with the
+router math of scripts/quoter.py and the cheapest one is returned as the
+`setRewardThresholds` arguments: harvest claims inline and releases the TRU
+to the trade factory in the same call, so both thresholds are the batch size.
+
+    brownie run reward_scheduler main <strategy> <multicall> [pool apr bps]
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from scripts.quoter import Quoter, get_amount_out, reserve_source
+
+YEAR = 365 * 86400
+# gauge.claim inside harvest and the ySwap settlement of one batch
+CLAIM_GAS = 120_000
+SWAP_GAS = 250_000
+
+
+class Schedule(NamedTuple):
+    min_rewards_to_claim: int  # TRU wei
+    min_rewards_to_sell: int  # TRU wei
+    interval: float  # seconds between sells
+    cost_bps: float  # gas, impact and carry per batch, bps of its mid value
+
+
+def batch_costs(
+    batches,
+    reward_rate,
+    hop_reserves,
+    gas_price,
+    want_per_eth,
+    pool_apr,
+    claim_gas=CLAIM_GAS,
+    swap_gas=SWAP_GAS,
+):
+    """
+    Cost in want of selling each of `batches` (TRU wei), and the mid value of
+    the batches. `hop_reserves` is [(reserve_in, reserve_out)] for every hop
+    of the swap path, `reward_rate` TRU wei per second and `want_per_eth`
+    want units per 1 ETH.
+    """
+    batches = np.array([int(b) for b in batches], dtype=object)
+    out = batches
+    mid = batches.astype(float)
+    for reserve_in, reserve_out in hop_reserves:
+        out = get_amount_out(out, reserve_in, reserve_out)
+        mid = mid * reserve_out / reserve_in
+    impact = mid - out.astype(float)
+    gas = (claim_gas + swap_gas) * gas_price * want_per_eth / 1e18
+    seconds = batches.astype(float) / reward_rate
+    carry = mid / 2 * pool_apr * seconds / YEAR
+    return gas + impact + carry, mid
+
+
+def plan(
+    reward_rate,
+    hop_reserves,
+    gas_price,
+    want_per_eth,
+    pool_apr,
+    min_interval=3600,
+    max_interval=YEAR,
+    points=512,
+    **gas,
+):
+    """
+    Cheapest batch size per TRU sold among batches of `min_interval` to
+    `max_interval` seconds of rewards
+    """
+    seconds = np.geomspace(min_interval, max_interval, points)
+    batches = [max(1, int(reward_rate * t)) for t in seconds]
+    cost, mid = batch_costs(
+        batches, reward_rate, hop_reserves, gas_price, want_per_eth, pool_apr, **gas
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_unit = np.where(mid > 0, cost / mid, np.inf)
+    best = int(np.argmin(per_unit))
+    return Schedule(
+        batches[best],
+        batches[best],
+        batches[best] / reward_rate,
+        float(per_unit[best] * 10_000),
+    )
+
+
+def reward_rate(strategy, blocks=6_500):
+    """TRU wei per second accrued by `strategy` over the last `blocks`"""
+    from brownie import chain
+
+    head = chain.height
+    start = max(0, head - blocks)
+    pending = [strategy.pendingRewards(block_identifier=b) for b in (start, head)]
+    elapsed = chain[head].timestamp - chain[start].timestamp
+    claimed = strategy.balanceOfTruRewards() - strategy.balanceOfTruRewards(
+        block_identifier=start
+    )
+    # a claim in between moves pending rewards to the strategy balance
+    return max(pending[1] - pending[0] + claimed, 0) / max(elapsed, 1)
+
+
+def swap_path(strategy):
+    """`swapPath` has no length getter, it is read up to the want token"""
+    path = [strategy.swapPath(0)]
+    while path[-1] != strategy.want():
+        path.append(strategy.swapPath(len(path)))
+    return path
+
+
+def main(strategy, multicall, pool_apr_bps=500):
+    from brownie import Contract, Multicall2, Strategy, web3
+
+    strategy = Strategy.at(strategy)
+    multicall = Multicall2.at(multicall)
+    # full router abi, so the reserves come from the factory pairs on mainnet
+    router = Contract(strategy.unirouter())
+    path = swap_path(strategy)
+    quoter = Quoter.load(multicall, reserve_source(multicall, router), [path])
+    schedule = plan(
+        reward_rate(strategy),
+        [quoter.reserves[hop] for hop in zip(path, path[1:])],
+        web3.eth.gas_price,
+        strategy.ethToWant(10 ** 18),
+        int(pool_apr_bps) / 10_000,
+    )
+    print(
+        f"sell every {schedule.interval / 3600:.1f}h: "
+        f"{schedule.min_rewards_to_sell / 1e18:,.2f} TRU at "
+        f"{schedule.cost_bps:.1f} bps"
+    )
+    print(
+        f"strategy.setRewardThresholds({schedule.min_rewards_to_claim}, "
+        f"{schedule.min_rewards_to_sell})"
+    )
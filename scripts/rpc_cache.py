@@ -0,0 +1,296 @@
+"""
+Caching JSON-RPC proxy for fork tests.
+
+Ganache forks mainnet at a fixed block and reads every account, slot and
+call it touches from the upstream node, with that block number in the
+params. Those answers never change, so the proxy keeps them in an
+append-only file keyed by (method, params), the params including the block:
+
+    record = sha256(key) (32 bytes) | len(result) (4 bytes) | result JSON
+
+The file is memory mapped and an in-memory index of key => offset is
+rebuilt from the record headers when it is opened. Requests for moving
+blocks ("latest", "pending") and non-deterministic methods always go
+upstream. Once the file is over `max_bytes`, the least recently used
+records are dropped by rewriting it. With `offline=True` a miss is an error
+instead of an upstream call, so a recorded run can be replayed with no
+network at all.
+
+    brownie run rpc_cache main <upstream url> [cache file] [port] [max MB]
+    brownie networks modify mainnet-fork fork=http://127.0.0.1:8549
+"""
+import hashlib
+import json
+import mmap
+import os
+import threading
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+KEY_SIZE = 32
+HEADER_SIZE = KEY_SIZE + 4
+# position of the block parameter of the methods answered from the cache,
+# None for methods that do not depend on the block
+CACHEABLE = {
+    "eth_chainId": None,
+    "net_version": None,
+    "eth_getCode": 1,
+    "eth_getBalance": 1,
+    "eth_getTransactionCount": 1,
+    "eth_call": 1,
+    "eth_getStorageAt": 2,
+    "eth_getProof": 2,
+    "eth_getBlockByNumber": 0,
+    "eth_getBlockByHash": None,
+    "eth_getTransactionByHash": None,
+    "eth_getTransactionReceipt": None,
+}
+MOVING_BLOCKS = {"latest", "pending", "safe", "finalized"}
+# a rewrite keeps the most recently used records up to this share of max_bytes
+LOW_WATER = 0.75
+
+
+def cache_key(method, params):
+    """Key of a request, None if its answer can change"""
+    if method not in CACHEABLE:
+        return None
+    position = CACHEABLE[method]
+    params = params or []
+    if position is not None:
+        # a missing block parameter defaults to latest
+        if len(params) <= position or params[position] in MOVING_BLOCKS:
+            return None
+    key = json.dumps([method, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(key.encode()).digest()
+
+
+class DiskCache:
+    def __init__(self, path, max_bytes=512 * 2 ** 20):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, "a+b")
+        self.size = os.path.getsize(self.path)
+        self._map = None
+        self._remap()
+        # key => offset of the result, and last use (file order on open)
+        self._index = {}
+        self._used = {}
+        self._tick = 0
+        offset = 0
+        while offset + HEADER_SIZE <= self.size:
+            key = bytes(self._map[offset : offset + KEY_SIZE])
+            length = int.from_bytes(
+                self._map[offset + KEY_SIZE : offset + HEADER_SIZE], "big"
+            )
+            if offset + HEADER_SIZE + length > self.size:
+                break
+            self._index[key] = (offset + HEADER_SIZE, length)
+            self._touch(key)
+            offset += HEADER_SIZE + length
+        if offset < self.size:
+            # torn write of an interrupted run
+            self._file.truncate(offset)
+            self.size = offset
+            self._remap()
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = (
+            mmap.mmap(self._file.fileno(), self.size, access=mmap.ACCESS_READ)
+            if self.size
+            else None
+        )
+
+    def _touch(self, key):
+        self._tick += 1
+        self._used[key] = self._tick
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+            self._file.close()
+
+    def get(self, key):
+        """Cached result (decoded JSON) or None"""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            offset, length = entry
+            if self._map is None or offset + length > len(self._map):
+                self._remap()
+            self._touch(key)
+            return json.loads(self._map[offset : offset + length])
+
+    def put(self, key, result):
+        data = json.dumps(result, separators=(",", ":")).encode()
+        with self._lock:
+            if key in self._index:
+                return
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(key + len(data).to_bytes(4, "big") + data)
+            self._file.flush()
+            self._index[key] = (self.size + HEADER_SIZE, len(data))
+            self._touch(key)
+            self.size += HEADER_SIZE + len(data)
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        if self._map is None or len(self._map) < self.size:
+            self._remap()
+        budget = int(self.max_bytes * LOW_WATER)
+        kept = []
+        for key in sorted(self._index, key=self._used.get, reverse=True):
+            length = self._index[key][1]
+            if budget < HEADER_SIZE + length:
+                break
+            budget -= HEADER_SIZE + length
+            kept.append(key)
+        self.evictions += len(self._index) - len(kept)
+
+        # oldest first, so the next open rebuilds the same recency order
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as out:
+            for key in reversed(kept):
+                offset, length = self._index[key]
+                out.write(key + length.to_bytes(4, "big"))
+                out.write(self._map[offset : offset + length])
+        self._map.close()
+        self._map = None
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._open()
+
+
+class Upstream:
+    def __init__(self, url, timeout=60):
+        self.url = url
+        self.timeout = timeout
+        self.calls = 0
+
+    def request(self, payload):
+        self.calls += 1
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+
+class CachingProxy:
+    """Answers JSON-RPC requests (single or batched) from the cache first"""
+
+    def __init__(self, cache, upstream, offline=False):
+        self.cache = cache
+        self.upstream = upstream
+        self.offline = offline
+        self.hits = Counter()
+        self.misses = Counter()
+        self._stats = threading.Lock()
+
+    def handle(self, payload):
+        batch = isinstance(payload, list)
+        requests = payload if batch else [payload]
+        responses = [None] * len(requests)
+        forward = []
+        for i, request in enumerate(requests):
+            method = request.get("method")
+            key = cache_key(method, request.get("params"))
+            result = None if key is None else self.cache.get(key)
+            with self._stats:
+                (self.misses if result is None else self.hits)[method] += 1
+            if result is not None:
+                responses[i] = {
+                    "jsonrpc": "2.0",
+                    "id": request.get("id"),
+                    "result": result,
+                }
+            elif self.offline:
+                responses[i] = {
+                    "jsonrpc": "2.0",
+                    "id": request.get("id"),
+                    "error": {"code": -32000, "message": f"rpc cache miss: {method}"},
+                }
+            else:
+                forward.append((i, key))
+
+        if forward:
+            # misses of a batch go upstream as one batch, ids are our indexes
+            upstream = [dict(requests[i], id=i) for i, _ in forward]
+            answers = self.upstream.request(upstream if batch else upstream[0])
+            answers = {a["id"]: a for a in (answers if batch else [answers])}
+            for i, key in forward:
+                answer = dict(answers[i], id=requests[i].get("id"))
+                if key is not None and "result" in answer:
+                    self.cache.put(key, answer["result"])
+                responses[i] = answer
+        return responses if batch else responses[0]
+
+    def report(self):
+        methods = sorted(set(self.hits) | set(self.misses))
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        lines = [f"{'method':<28}{'hits':>10}{'misses':>10}{'hit rate':>10}"]
+        for method in methods + ["total"]:
+            h = hits if method == "total" else self.hits[method]
+            m = misses if method == "total" else self.misses[method]
+            lines.append(f"{method:<28}{h:>10}{m:>10}{h / max(h + m, 1):>10.1%}")
+        lines.append(
+            f"{self.upstream.calls} upstream calls, {len(self.cache)} cached results, "
+            f"{self.cache.size / 2 ** 20:.1f} MB, {self.cache.evictions} evicted"
+        )
+        return "\n".join(lines)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = json.dumps(self.server.proxy.handle(payload)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(proxy, host="127.0.0.1", port=8549):
+    """Starts the proxy in a background thread, returns the server"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.proxy = proxy
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(upstream, path=".rpc-cache", port=8549, max_mb=512):
+    offline = upstream == "offline"
+    cache = DiskCache(path, int(max_mb) * 2 ** 20)
+    proxy = CachingProxy(cache, Upstream(None if offline else upstream), offline)
+    server = serve(proxy, port=int(port))
+    print(f"rpc cache on http://127.0.0.1:{port}, {len(cache)} results in {path}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(proxy.report())
+        cache.close()
@@ -0,0 +1,161 @@
+"""
+Snapshots of one strategy and its vault, and the diff between two of them.
+
+`Snapshotter.take` reads every field of `Snapshot` with one
+Multicall2.tryAggregate eth_call pinned to a block, through the `Batch` and
+the strategy views of scripts/reader.py. `diff` compares two snapshots field
+by field and checks the `INVARIANTS`, so tests/utils/checks.py and the
+per-block monitor below use the same engine. Without a multicall the views
+are read one by one.
+
+    brownie run snapshot main <strategy> <multicall> --network ...
+"""
+from typing import NamedTuple, Tuple
+
+from brownie import web3
+
+from scripts import reader
+
+# (field, strategy view), the fleet reader's views and the idle want
+STRATEGY_VIEWS = reader.STRATEGY_VIEWS + (("want_in_strategy", "balanceOfWant"),)
+# (field, vault view)
+VAULT_VIEWS = (
+    ("price_per_share", "pricePerShare"),
+    ("vault_total_assets", "totalAssets"),
+    ("vault_total_supply", "totalSupply"),
+)
+
+
+class Snapshot(NamedTuple):
+    block: int
+    want_in_strategy: int
+    total_lp: int
+    lp_in_gauge: int
+    virtual_price: int
+    pending_rewards: int
+    tru_rewards: int
+    estimated_total_assets: int
+    exit_penalty_fee: int
+    price_per_share: int
+    vault_total_assets: int
+    vault_total_supply: int
+    want_in_vault: int
+    debt_ratio: int
+    total_debt: int
+    total_gain: int
+    total_loss: int
+    last_report: int
+
+    @property
+    def lp_in_wallet(self):
+        return self.total_lp - self.lp_in_gauge
+
+
+# name, check(before, after); `before` is None for a single snapshot
+INVARIANTS = (
+    ("lp_in_gauge <= total_lp", lambda a, b: b.lp_in_gauge <= b.total_lp),
+    ("debt_ratio <= 10_000", lambda a, b: b.debt_ratio <= 10_000),
+    (
+        "total_debt <= vault_total_assets",
+        lambda a, b: b.total_debt <= b.vault_total_assets,
+    ),
+    ("block moves forward", lambda a, b: a is None or a.block <= b.block),
+    ("total_gain never drops", lambda a, b: a is None or a.total_gain <= b.total_gain),
+    ("total_loss never drops", lambda a, b: a is None or a.total_loss <= b.total_loss),
+    (
+        "last_report never drops",
+        lambda a, b: a is None or a.last_report <= b.last_report,
+    ),
+    (
+        "pricePerShare only drops on a reported loss",
+        lambda a, b: a is None
+        or a.price_per_share <= b.price_per_share
+        or a.total_loss < b.total_loss,
+    ),
+)
+
+
+class Diff(NamedTuple):
+    before: Snapshot
+    after: Snapshot
+    deltas: dict  # field => after - before, changed fields only
+    violations: Tuple[str, ...]
+
+    def __bool__(self):
+        return bool(self.deltas)
+
+
+def check(after, before=None):
+    """Names of the invariants `after` (coming from `before`) breaks"""
+    broken = []
+    for name, holds in INVARIANTS:
+        try:
+            if not holds(before, after):
+                broken.append(name)
+        except TypeError:
+            # a view that reverted reads as None, nothing to check
+            pass
+    return tuple(broken)
+
+
+def diff(before, after):
+    deltas = {
+        field: None if a is None or b is None else b - a
+        for field, a, b in zip(Snapshot._fields[1:], before[1:], after[1:])
+        if a != b
+    }
+    return Diff(before, after, deltas, check(after, before))
+
+
+class Snapshotter:
+    def __init__(self, multicall, strategy, vault=None):
+        from brownie import interface
+
+        self.multicall = multicall
+        self.strategy = strategy
+        self.vault = vault or interface.VaultAPI(strategy.vault())
+        want = interface.IERC20(self.vault.token())
+
+        self._fields = [field for field, _ in STRATEGY_VIEWS + VAULT_VIEWS]
+        self._fields += ["want_in_vault"] + [f for f, _ in reader.STRATEGY_PARAMS]
+        self._batch = reader.Batch(multicall)
+        for _, fn in STRATEGY_VIEWS:
+            self._batch.add(strategy, fn)
+        for _, fn in VAULT_VIEWS:
+            self._batch.add(self.vault, fn)
+        self._batch.add(want, "balanceOf", self.vault)
+        self._batch.add(self.vault, "strategies", strategy)
+
+    @property
+    def eth_calls(self):
+        return self._batch.eth_calls
+
+    def take(self, block=None):
+        if block is None:
+            block = web3.eth.block_number
+        values = self._batch.read(block)
+        values += reader.strategy_params(values.pop())
+        return Snapshot(block, **dict(zip(self._fields, values)))
+
+
+def format_diff(d):
+    lines = [f"block {d.before.block} -> {d.after.block}"]
+    lines += [
+        f"  {field:<24}{'n/a' if delta is None else format(delta, '+,'):>32}"
+        for field, delta in d.deltas.items()
+    ]
+    lines += [f"  VIOLATED {name}" for name in d.violations]
+    return "\n".join(lines)
+
+
+def main(strategy, multicall):
+    from brownie import Multicall2, Strategy, chain
+
+    snapshotter = Snapshotter(Multicall2.at(multicall), Strategy.at(strategy))
+    previous = snapshotter.take()
+    for block in chain.new_blocks():
+        current = snapshotter.take(block.number)
+        d = diff(previous, current)
+        if d or d.violations:
+            print(format_diff(d))
+        previous = current
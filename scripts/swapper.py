@@ -0,0 +1,148 @@
+"""
+Calldata for ySwap trades settled through the MultiCallOptimizedSwapper.
+
+The swapper payload is a uint8 optimizations header followed by
+(address target, uint256 length, bytes calldata) segments, packed without
+padding. `MultiCallBuilder` writes the segments straight into one growing
+buffer with precomputed selectors, and `encode_trades` lays out the
+approve/swap/transfer calls of several strategies' trades so a single
+`trade_factory.execute` settles all of them.
+"""
+from typing import NamedTuple, Sequence
+
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+
+# optimizations flag the ymechs multicall swapper is called with
+OPTIMIZATIONS = 5
+APPROVE = function_signature_to_4byte_selector("approve(address,uint256)")
+TRANSFER = function_signature_to_4byte_selector("transfer(address,uint256)")
+SWAP_EXACT_TOKENS_FOR_TOKENS = function_signature_to_4byte_selector(
+    "swapExactTokensForTokens(uint256,uint256,address[],address,uint256)"
+)
+MAX_UINT256 = 2 ** 256 - 1
+
+
+class Trade(NamedTuple):
+    strategy: str
+    token_in: str
+    token_out: str
+    amount_in: int
+    min_amount_out: int
+    path: Sequence[str]
+
+    def details(self):
+        """AsyncTradeExecutionDetails tuple for trade_factory.execute"""
+        return (
+            self.strategy,
+            self.token_in,
+            self.token_out,
+            self.amount_in,
+            self.min_amount_out,
+        )
+
+
+def _address(value):
+    return bytes.fromhex(to_checksum_address(getattr(value, "address", value))[2:])
+
+
+def _word(value):
+    return int(value).to_bytes(32, "big")
+
+
+def _address_word(value):
+    return bytes(12) + _address(value)
+
+
+class MultiCallBuilder:
+    def __init__(self, optimizations=OPTIMIZATIONS, capacity=2048):
+        self.optimizations = optimizations
+        self._buffer = bytearray(capacity)
+        self.reset()
+
+    def reset(self):
+        self._buffer[0] = self.optimizations
+        self._size = 1
+        return self
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, size):
+        if self._size + size > len(self._buffer):
+            self._buffer.extend(bytes(max(len(self._buffer), size)))
+
+    def _write(self, data):
+        end = self._size + len(data)
+        self._buffer[self._size : end] = data
+        self._size = end
+
+    def call(self, target, *parts):
+        """Appends one call to `target` whose calldata is the concatenated `parts`"""
+        length = sum(len(p) for p in parts)
+        self._reserve(52 + length)
+        self._write(_address(target))
+        self._write(_word(length))
+        for part in parts:
+            self._write(part)
+        return self
+
+    def approve(self, token, spender, amount):
+        return self.call(token, APPROVE, _address_word(spender), _word(amount))
+
+    def transfer(self, token, to, amount):
+        return self.call(token, TRANSFER, _address_word(to), _word(amount))
+
+    def swap_exact_tokens_for_tokens(
+        self, router, amount_in, min_amount_out, path, to, deadline=MAX_UINT256
+    ):
+        # the path is the only dynamic argument, stored after the 5 head words
+        return self.call(
+            router,
+            SWAP_EXACT_TOKENS_FOR_TOKENS,
+            _word(amount_in),
+            _word(min_amount_out),
+            _word(5 * 32),
+            _address_word(to),
+            _word(deadline),
+            _word(len(path)),
+            *[_address_word(token) for token in path],
+        )
+
+    def build(self):
+        return bytes(self._buffer[: self._size])
+
+
+def encode_trades(trades, router, swapper, amounts_out, builder=None):
+    """
+    Payload swapping every trade through `router` and sending `amounts_out[i]`
+    of the output token to trade i's strategy. The swapper approves the router
+    once per input token for the sum of the trades.
+    """
+    builder = (builder or MultiCallBuilder()).reset()
+    totals = {}
+    for trade in trades:
+        totals[trade.token_in] = totals.get(trade.token_in, 0) + trade.amount_in
+    for token, total in totals.items():
+        builder.approve(token, router, total)
+    for trade, amount_out in zip(trades, amounts_out):
+        builder.swap_exact_tokens_for_tokens(
+            router, trade.amount_in, 0, trade.path, swapper
+        )
+        builder.transfer(trade.token_out, trade.strategy, amount_out)
+    return builder.build()
+
+
+def quote_trades(quoter, trades):
+    """Outputs of `trades` executed in order, each one moving the reserves"""
+    return [quoter.swap(trade.amount_in, trade.path) for trade in trades]
+
+
+def execute(trade_factory, swapper, trades, data, sender):
+    """One trade_factory.execute for all `trades`"""
+    if len(trades) == 1:
+        return trade_factory.execute["tuple,address,bytes"](
+            trades[0].details(), swapper, data, {"from": sender}
+        )
+    return trade_factory.execute["tuple[],address,bytes"](
+        [trade.details() for trade in trades], swapper, data, {"from": sender}
+    )
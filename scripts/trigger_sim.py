@@ -0,0 +1,195 @@
+"""
+Monte Carlo check of the harvest trigger against synthetic price/gas paths.
+
+Every path draws hourly ETH and TRU prices (geometric brownian motion) and a
+mean-reverting log gas price. A policy decides each hour whether to harvest;
+a harvest pays gas, pays the liquid exit penalty on the pool gain it reports,
+and reinvests the TRU rewards at the current price. Policies are compared by
+the net value of the position at the end of the horizon:
+
+    cost_aware   Strategy.harvestTrigger: profit factor * callCost priced in
+                 want vs pool gain net of penalty + TRU at the harvest price
+    wei_as_want  the previous trigger, callCost in wei compared to want units
+                 (ethToWant returned its input), so only maxReportDelay fires
+    every_<n>h   fixed schedule
+
+Values are floats in USD: this measures decisions, not accounting, which
+scripts/model.py covers exactly.
+
+    brownie run trigger_sim main
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+HOUR = 3600
+YEAR = 365 * 24 * HOUR
+
+
+class Market(NamedTuple):
+    eth: np.ndarray  # (steps, paths) USD per ETH
+    tru: np.ndarray  # USD per TRU
+    gas: np.ndarray  # gwei
+
+
+class Params(NamedTuple):
+    assets: float = 1_000_000.0  # USD in the pool
+    pool_apr: float = 0.05
+    reward_apr: float = 0.08  # TRU emissions, at the initial TRU price
+    exit_penalty: float = 0.001
+    harvest_gas: int = 600_000
+    profit_factor: float = 100.0
+    min_report_delay: int = 0
+    max_report_delay: int = 30 * 24 * HOUR
+    want_decimals: int = 6
+
+
+def simulate_market(
+    paths,
+    steps,
+    seed=0,
+    eth=3_000.0,
+    tru=0.2,
+    gas=40.0,
+    eth_vol=0.8,
+    tru_vol=1.2,
+    gas_vol=0.6,
+    gas_reversion=0.1,
+):
+    """Hourly paths; volatilities are annualized for prices, hourly for gas"""
+    rng = np.random.default_rng(seed)
+    dt = HOUR / YEAR
+
+    def gbm(start, vol):
+        shocks = rng.standard_normal((steps, paths)) * vol * np.sqrt(dt)
+        return start * np.exp(np.cumsum(shocks - 0.5 * vol ** 2 * dt, axis=0))
+
+    log_gas = np.empty((steps, paths))
+    log_gas[0] = np.log(gas)
+    noise = rng.standard_normal((steps, paths)) * gas_vol
+    for t in range(1, steps):
+        log_gas[t] = (
+            log_gas[t - 1] + gas_reversion * (np.log(gas) - log_gas[t - 1]) + noise[t]
+        )
+    return Market(gbm(eth, eth_vol), gbm(tru, tru_vol), np.exp(log_gas))
+
+
+def harvest_trigger(
+    elapsed,
+    call_cost_want,
+    realizable_profit,
+    profit_factor=100,
+    min_report_delay=0,
+    max_report_delay=86400,
+):
+    """Strategy.harvestTrigger without the debt/loss branches, vectorized"""
+    due = elapsed >= max_report_delay
+    pays = profit_factor * call_cost_want < realizable_profit
+    return (elapsed >= min_report_delay) & (due | pays)
+
+
+def cost_aware(state, market, t, p):
+    call_cost_usd = p.harvest_gas * market.gas[t] * 1e-9 * market.eth[t]
+    profit = state["gain"] * (1 - p.exit_penalty) + state["tru"] * state["tru_price"]
+    return harvest_trigger(
+        state["elapsed"],
+        call_cost_usd,
+        profit,
+        p.profit_factor,
+        p.min_report_delay,
+        p.max_report_delay,
+    )
+
+
+def wei_as_want(state, market, t, p):
+    call_cost_wei = p.harvest_gas * market.gas[t] * 1e9
+    profit = state["gain"] * (1 - p.exit_penalty) + state["tru"] * state["tru_price"]
+    return harvest_trigger(
+        state["elapsed"],
+        call_cost_wei,
+        profit * 10 ** p.want_decimals,
+        p.profit_factor,
+        p.min_report_delay,
+        p.max_report_delay,
+    )
+
+
+def every(hours):
+    def policy(state, market, t, p):
+        return state["elapsed"] >= hours * HOUR
+
+    policy.__name__ = f"every_{hours}h"
+    return policy
+
+
+POLICIES = (cost_aware, wei_as_want, every(24), every(24 * 7))
+
+
+def run_policy(policy, market, params=Params()):
+    """Net value per path at the end of the horizon, plus harvest count and gas"""
+    steps, paths = market.eth.shape
+    p = params
+    pool_rate = p.pool_apr * HOUR / YEAR
+    tru_per_hour = p.assets * p.reward_apr * HOUR / YEAR / market.tru[0]
+    state = {
+        "principal": np.full(paths, p.assets),
+        "gain": np.zeros(paths),
+        "tru": np.zeros(paths),
+        "tru_price": market.tru[0].copy(),
+        "elapsed": np.zeros(paths),
+    }
+    gas_spent = np.zeros(paths)
+    harvests = np.zeros(paths, dtype=int)
+
+    for t in range(steps):
+        state["gain"] += (state["principal"] + state["gain"]) * pool_rate
+        state["tru"] += tru_per_hour
+        state["elapsed"] += HOUR
+
+        h = policy(state, market, t, p)
+        gas_spent[h] += p.harvest_gas * market.gas[t, h] * 1e-9 * market.eth[t, h]
+        state["principal"][h] += (
+            state["gain"][h] * (1 - p.exit_penalty) + state["tru"][h] * market.tru[t, h]
+        )
+        state["gain"][h] = 0
+        state["tru"][h] = 0
+        state["tru_price"][h] = market.tru[t, h]
+        state["elapsed"][h] = 0
+        harvests += h
+
+    value = state["principal"] + state["gain"] + state["tru"] * market.tru[-1]
+    return value - gas_spent, harvests, gas_spent
+
+
+def compare(market, params=Params(), policies=POLICIES):
+    results = {}
+    for policy in policies:
+        net, harvests, gas = run_policy(policy, market, params)
+        results[policy.__name__] = {
+            "net": net,
+            "mean_net": float(net.mean()),
+            "p5_net": float(np.percentile(net, 5)),
+            "mean_harvests": float(harvests.mean()),
+            "mean_gas": float(gas.mean()),
+        }
+    return results
+
+
+def format_table(results, baseline="wei_as_want"):
+    base = results[baseline]["net"]
+    lines = [
+        f"{'policy':<14}{'mean net':>16}{'p5 net':>16}{'harvests':>10}"
+        f"{'gas USD':>10}{'beats ' + baseline:>20}"
+    ]
+    for name, r in results.items():
+        lines.append(
+            f"{name:<14}{r['mean_net']:>16,.0f}{r['p5_net']:>16,.0f}"
+            f"{r['mean_harvests']:>10.1f}{r['mean_gas']:>10,.0f}"
+            f"{(r['net'] > base).mean():>20.1%}"
+        )
+    return "\n".join(lines)
+
+
+def main(paths=2_000, days=90, seed=0):
+    market = simulate_market(int(paths), int(days) * 24, int(seed))
+    print(format_table(compare(market)))
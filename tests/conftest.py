@@ -1,99 +1,166 @@
 import pytest
 from brownie import config
 from brownie import Contract
+from brownie import network
+from utils.snapshots import ChainStates
 
 
-@pytest.fixture
-def gov(accounts):
-    yield accounts.at("0xFEB4acf3df3cDEA7399794D0869ef76A6EfAff52", force=True)
+# `brownie test --network development` runs the suite against the mocks in
+# contracts/test instead of a mainnet fork
+@pytest.fixture(scope="session")
+def local():
+    yield "fork" not in network.show_active()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
+def gov(accounts, local):
+    if local:
+        yield accounts[6]
+    else:
+        yield accounts.at("0xFEB4acf3df3cDEA7399794D0869ef76A6EfAff52", force=True)
+
+
+@pytest.fixture(scope="session")
 def user(accounts):
     yield accounts[0]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def rewards(accounts):
     yield accounts[1]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def guardian(accounts):
     yield accounts[2]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def management(accounts):
     yield accounts[3]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def strategist(accounts):
     yield accounts[4]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def keeper(accounts):
     yield accounts[5]
 
-@pytest.fixture
-def trade_factory():
-    yield Contract("0x99d8679bE15011dEAD893EB4F5df474a4e6a8b29")
 
+@pytest.fixture(scope="session")
+def ymechs_safe(accounts, local):
+    if local:
+        yield accounts[7]
+    else:
+        yield Contract("0x2C01B4AD51a67E2d8F02208F54dF9aC4c0B778B6")
 
-@pytest.fixture
-def ymechs_safe():
-    yield Contract("0x2C01B4AD51a67E2d8F02208F54dF9aC4c0B778B6")
 
 @pytest.fixture(scope="module")
-def multicall_swapper(interface):
-    yield interface.MultiCallOptimizedSwapper(
-        # "0xceB202F25B50e8fAF212dE3CA6C53512C37a01D2"
-        "0xB2F65F254Ab636C96fb785cc9B4485cbeD39CDAA"
-    )
+def mocks(local, accounts, ymechs_safe):
+    if not local:
+        yield None
+        return
 
+    from scripts.mocks import deploy_mocks
 
-@pytest.fixture
-def token():
-    token_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"  # this should be the address of the ERC-20 used by the strategy/vault (DAI)
-    yield Contract(token_address)
+    yield deploy_mocks(accounts[8], ymechs_safe)
 
-@pytest.fixture
-def tru():
-    tru_address = "0x4C19596f5aAfF459fA38B0f7eD92F11AE6543784"
-    yield Contract(tru_address)
 
+@pytest.fixture(scope="module")
+def trade_factory(local, mocks):
+    if local:
+        yield mocks.trade_factory
+    else:
+        yield Contract("0x99d8679bE15011dEAD893EB4F5df474a4e6a8b29")
 
-@pytest.fixture
-def amount(accounts, token, user):
+
+@pytest.fixture(scope="module")
+def multicall_swapper(interface, local, mocks):
+    if local:
+        yield mocks.multicall_swapper
+    else:
+        yield interface.MultiCallOptimizedSwapper(
+            # "0xceB202F25B50e8fAF212dE3CA6C53512C37a01D2"
+            "0xB2F65F254Ab636C96fb785cc9B4485cbeD39CDAA"
+        )
+
+
+@pytest.fixture(scope="module")
+def token(local, mocks):
+    if local:
+        yield mocks.token
+    else:
+        token_address = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"  # this should be the address of the ERC-20 used by the strategy/vault (DAI)
+        yield Contract(token_address)
+
+
+@pytest.fixture(scope="module")
+def tru(local, mocks):
+    if local:
+        yield mocks.tru
+    else:
+        tru_address = "0x4C19596f5aAfF459fA38B0f7eD92F11AE6543784"
+        yield Contract(tru_address)
+
+
+@pytest.fixture(scope="module")
+def amount(accounts, token, user, local):
     amount = 100_000 * 10 ** token.decimals()
-    # In order to get some funds for the token you are about to use,
-    # it impersonate an exchange address to use it's funds.
-    reserve = accounts.at("0xCFFAd3200574698b78f32232aa9D63eABD290703", force=True)
-    token.transfer(user, amount, {"from": reserve})
+    if local:
+        token.mint(user, amount)
+    else:
+        # In order to get some funds for the token you are about to use,
+        # it impersonate an exchange address to use it's funds.
+        reserve = accounts.at("0xCFFAd3200574698b78f32232aa9D63eABD290703", force=True)
+        token.transfer(user, amount, {"from": reserve})
     yield amount
 
 
-@pytest.fixture
-def weth():
-    token_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
-    yield Contract(token_address)
+@pytest.fixture(scope="module")
+def weth(local, mocks):
+    if local:
+        yield mocks.weth
+    else:
+        token_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+        yield Contract(token_address)
 
-@pytest.fixture
-def unirouter():
-    unirouter_address = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
-    yield Contract(unirouter_address)
 
+@pytest.fixture(scope="module")
+def unirouter(local, mocks):
+    if local:
+        yield mocks.unirouter
+    else:
+        unirouter_address = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
+        yield Contract(unirouter_address)
 
-@pytest.fixture
+
+@pytest.fixture(scope="module")
+def pool(local, mocks):
+    if local:
+        yield mocks.pool
+    else:
+        yield Contract("0xA991356d261fbaF194463aF6DF8f0464F8f1c742")
+
+
+@pytest.fixture(scope="module")
+def gauge(local, mocks):
+    if local:
+        yield mocks.gauge
+    else:
+        yield Contract("0xec6c3FD795D6e6f202825Ddb56E01b3c128b0b10")
+
+
+@pytest.fixture(scope="module")
 def weth_amout(user, weth):
     weth_amout = 10 ** weth.decimals()
     user.transfer(weth, weth_amout)
     yield weth_amout
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def vault(pm, gov, rewards, guardian, management, token):
     Vault = pm(config["dependencies"][0]).Vault
     vault = guardian.deploy(Vault)
@@ -103,22 +170,141 @@ def vault(pm, gov, rewards, guardian, management, token):
     yield vault
 
 
-@pytest.fixture
-def strategy(strategist, keeper, vault, Strategy, gov):
-    strategy = strategist.deploy(Strategy, vault, "0xA991356d261fbaF194463aF6DF8f0464F8f1c742",
-    ["0x4C19596f5aAfF459fA38B0f7eD92F11AE6543784","0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2","0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48" ])
+@pytest.fixture(scope="module")
+def strategy(
+    strategist, keeper, vault, Strategy, gov, pool, gauge, tru, unirouter, weth, token
+):
+    strategy = strategist.deploy(
+        Strategy, vault, pool, gauge, tru, unirouter, [tru, weth, token]
+    )
     strategy.setKeeper(keeper)
     vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
     yield strategy
 
-@pytest.fixture
-def prepare_trade_factory(strategy, trade_factory, ymechs_safe, gov):
+
+@pytest.fixture(scope="module")
+def trade_factory_role(strategy, trade_factory, ymechs_safe):
     trade_factory.grantRole(
-    trade_factory.STRATEGY(),
-    strategy.address,
-    {"from": ymechs_safe, "gas_price": "0 gwei"},
+        trade_factory.STRATEGY(),
+        strategy.address,
+        {"from": ymechs_safe, "gas_price": "0 gwei"},
+    )
+
+
+# Everything above is deployed once per module. Each test then starts from a
+# cached snapshot of the deepest state it requests, in this order:
+STATES = ["prepare_trade_factory", "funded", "harvested", "rewards_accrued"]
+
+
+@pytest.fixture(scope="module")
+def chain_states(
+    chain,
+    vault,
+    strategy,
+    token,
+    amount,
+    user,
+    gov,
+    strategist,
+    trade_factory,
+    trade_factory_role,
+    multicall_swapper,
+    weth_amout,
+):
+    states = ChainStates()
+
+    def set_trade_factory():
+        strategy.setTradeFactory(trade_factory.address, {"from": gov})
+
+    def fund():
+        token.approve(vault.address, amount, {"from": user})
+        vault.deposit(amount, {"from": user})
+
+    def harvest():
+        chain.sleep(1)
+        strategy.harvest({"from": strategist})
+
+    def accrue_rewards():
+        chain.sleep(86400 * 5)
+        chain.mine(1)
+
+    for parent, name, build in zip(
+        ["base"] + STATES,
+        STATES,
+        [set_trade_factory, fund, harvest, accrue_rewards],
+    ):
+        states.register(name, build, parent)
+    states.capture("base")
+    yield states
+
+
+# every module starts from a fresh chain, so it behaves the same whichever
+# xdist worker runs it (`brownie test -n auto`, one ganache per worker).
+# Listed first among the module fixtures, before anything is deployed.
+@pytest.fixture(scope="module", autouse=True)
+def fresh_chain(module_isolation):
+    pass
+
+
+def _depth(fixturenames):
+    if "vault" not in fixturenames:
+        return -1
+    return next(
+        (i + 1 for i in reversed(range(len(STATES))) if STATES[i] in fixturenames), 0
+    )
+
+
+# the cached state only moves forward (see ChainStates), so the tests of each
+# module run from the shallowest state to the deepest, the ones without the
+# vault first
+def pytest_collection_modifyitems(items):
+    modules = {}
+    for item in items:
+        modules.setdefault(item.module, len(modules))
+    items.sort(
+        key=lambda item: (
+            modules[item.module],
+            _depth(getattr(item, "fixturenames", ())),
+        )
     )
-    strategy.setTradeFactory(trade_factory.address, {"from": gov})
+
+
+@pytest.fixture(autouse=True)
+def isolation(request):
+    if "vault" not in request.fixturenames:
+        request.getfixturevalue("fn_isolation")
+        yield
+        return
+
+    chain_states = request.getfixturevalue("chain_states")
+    depth = _depth(request.fixturenames)
+    chain_states.restore(STATES[depth - 1] if depth else "base")
+    yield
+    chain_states.invalidate()
+
+
+# trade factory set on the strategy
+@pytest.fixture
+def prepare_trade_factory():
+    pass
+
+
+# `amount` deposited into the vault, not yet invested
+@pytest.fixture
+def funded(prepare_trade_factory):
+    pass
+
+
+# first harvest done, funds are in the gauge
+@pytest.fixture
+def harvested(funded):
+    pass
+
+
+# 5 days of TRU rewards pending in the gauge
+@pytest.fixture
+def rewards_accrued(harvested):
+    pass
 
 
 @pytest.fixture(scope="session")
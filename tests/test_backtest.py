@@ -0,0 +1,72 @@
+import csv
+
+import numpy as np
+import pytest
+
+from scripts import backtest
+from scripts.backtest import Params, grid, run, synthetic_series
+
+PARAMS = grid(
+    cadence_hours=(24, 168), buffer_bps=(0, 200), swap_threshold=(0, 10 ** 10)
+)
+
+
+@pytest.fixture(scope="module")
+def series(tmp_path_factory):
+    path = tmp_path_factory.mktemp("series")
+    synthetic_series(path, hours=24 * 90, seed=1)
+    return path
+
+
+def test_ingest_csv_matches_the_arrays(series, tmp_path):
+    columns = backtest.open_series(series)
+    with open(tmp_path / "pool.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(backtest.SERIES)
+        writer.writerows(zip(*(columns[name].tolist() for name in backtest.SERIES)))
+
+    ingested = backtest.ingest_csv(
+        tmp_path / "pool.csv", tmp_path / "npy", chunk_rows=100
+    )
+    for name in backtest.SERIES:
+        assert isinstance(ingested[name], np.memmap)
+        assert np.array_equal(ingested[name], columns[name])
+
+
+def test_open_series_rejects_ragged_columns(series, tmp_path):
+    columns = {k: np.asarray(v) for k, v in backtest.open_series(series).items()}
+    columns["penalty"] = columns["penalty"][:-1]
+    for name, column in columns.items():
+        np.save(tmp_path / f"{name}.npy", column)
+    with pytest.raises(ValueError, match="different lengths"):
+        backtest.open_series(tmp_path)
+
+
+def test_results_do_not_depend_on_chunks_or_workers(series):
+    whole = run(series, PARAMS)
+    chunked = run(series, PARAMS, chunk_rows=97)
+    pooled = backtest.backtest(series, PARAMS, workers=3)
+    for other in (chunked, pooled):
+        for key in ("penalty", "gas", "harvests", "swaps"):
+            assert np.array_equal(whole[key], other[key]), key
+        for key in ("net_apr", "max_drawdown"):
+            assert np.allclose(whole[key], other[key]), key
+
+
+def test_buffer_and_cadence_tradeoffs(series):
+    results = run(series, PARAMS)
+    by_params = {p: {k: v[i] for k, v in results.items()} for i, p in enumerate(PARAMS)}
+
+    daily = by_params[Params(cadence_hours=24)]
+    weekly = by_params[Params(cadence_hours=168)]
+    assert daily["harvests"] > weekly["harvests"]
+    assert daily["gas"] == daily["harvests"] * backtest.Config().harvest_gas
+
+    # an idle buffer pays the profit out without exiting the pool
+    buffered = by_params[Params(cadence_hours=24, buffer_bps=200)]
+    assert buffered["penalty"] < daily["penalty"]
+
+    # the threshold holds the TRU back for fewer, larger swaps
+    held = by_params[Params(cadence_hours=24, swap_threshold=10 ** 10)]
+    assert held["swaps"] < daily["swaps"] == daily["harvests"] - 1
+    assert all(0 <= d < 1 for d in results["max_drawdown"])
@@ -0,0 +1,139 @@
+import json
+
+import pytest
+from brownie import config
+
+from scripts.batch_deploy import (
+    BatchDeploy,
+    ManifestError,
+    State,
+    contract_address,
+    load_manifest,
+)
+
+
+def test_contract_address():
+    deployer = "0x6ac7ea33f8831ea9dcc53393aaa88b25a785dbf0"
+    assert contract_address(deployer, 0) == "0xcd234A471b72ba2F1Ccf0A70FCABA648a5eeCD8d"
+    assert contract_address(deployer, 1) == "0x343c43A37D37dfF08AE8C4A11544c718AbB4fCF8"
+
+
+def test_manifest_errors_are_reported_together(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(
+        json.dumps(
+            {
+                "defaults": {"gauge": "0x" + "11" * 20, "tru": "0x" + "22" * 20},
+                "strategies": [
+                    {"name": "a", "vault": "0x" + "33" * 20, "pool": "0x" + "44" * 20},
+                    {"name": "b", "vault": "0xnot", "pool": "0x" + "44" * 20},
+                ],
+            }
+        )
+    )
+    with pytest.raises(ManifestError) as error:
+        load_manifest(path)
+    assert "a: missing unirouter, swap_path" in str(error.value)
+    assert "b: missing unirouter, swap_path" in str(error.value)
+
+
+def _write_manifest(path, entries, mocks, keeper):
+    path.write_text(
+        json.dumps(
+            {
+                "defaults": {
+                    "gauge": mocks.gauge.address,
+                    "tru": mocks.tru.address,
+                    "unirouter": mocks.unirouter.address,
+                    "keeper": keeper.address,
+                    "trade_factory": mocks.trade_factory.address,
+                    "debt_ratio": 5_000,
+                },
+                "strategies": entries,
+            }
+        )
+    )
+    return load_manifest(path)[1]
+
+
+def test_batch_deploy_resumes(
+    local,
+    pm,
+    web3,
+    accounts,
+    tmp_path,
+    mocks,
+    Strategy,
+    gov,
+    strategist,
+    keeper,
+    guardian,
+    rewards,
+    management,
+    ymechs_safe,
+):
+    if not local:
+        pytest.skip("deploys against the mock pools")
+    from scripts.mocks import deploy_pool
+
+    Vault = pm(config["dependencies"][0]).Vault
+    vaults = []
+    for _ in range(2):
+        vault = guardian.deploy(Vault)
+        vault.initialize(mocks.token, gov, rewards, "", "", guardian, management)
+        vaults.append(vault)
+    pools = [mocks.pool, deploy_pool(accounts[8], mocks.token, mocks.gauge)]
+    path = [mocks.tru.address, mocks.weth.address, mocks.token.address]
+    entries = [
+        {"name": f"s{i}", "vault": v.address, "pool": p.address, "swap_path": path}
+        for i, (v, p) in enumerate(zip(vaults, pools))
+    ]
+    state = State(str(tmp_path / "state.json"), web3.eth.chain_id)
+
+    def run(entries):
+        batch = BatchDeploy(
+            _write_manifest(tmp_path / "manifest.json", entries, mocks, keeper),
+            strategist,
+            Strategy,
+            Vault,
+            web3,
+            governance=gov,
+            state=state,
+        )
+        return batch, batch.run()
+
+    # a bad entry stops the run before anything is sent
+    nonce = strategist.nonce
+    with pytest.raises(ManifestError, match="swap path"):
+        run([dict(entries[0], swap_path=path[::-1])])
+    assert strategist.nonce == nonce
+
+    # the first run stops halfway: the trade factory has no role for s0 yet
+    batch, summary = run(entries[:1])
+    assert [step for _, step, _ in batch.sent] == ["deploy", "setKeeper", "addStrategy"]
+    assert summary["s0"]["setTradeFactory"] == "queued"
+    s0 = Strategy.at(summary["s0"]["strategy"])
+    assert s0.keeper() == keeper
+    assert vaults[0].strategies(s0).dict()["activation"] > 0
+
+    # the rerun only sends what is missing
+    trade_factory = mocks.trade_factory
+    trade_factory.grantRole(trade_factory.STRATEGY(), s0, {"from": ymechs_safe})
+    batch, summary = run(entries)
+    assert [(name, step) for name, step, _ in batch.sent] == [
+        ("s1", "deploy"),
+        ("s1", "setKeeper"),
+        ("s0", "setTradeFactory"),
+        ("s1", "addStrategy"),
+    ]
+    assert s0.tradeFactory() == trade_factory
+    assert summary["s1"]["setTradeFactory"] == "queued"
+    s1 = Strategy.at(summary["s1"]["strategy"])
+    assert s1.pool() == pools[1] and s1.vault() == vaults[1]
+
+    batch, summary = run(entries)
+    assert batch.sent == []
+    assert (
+        json.loads((tmp_path / "state.json").read_text())["entries"]["s1"]["strategy"]
+        == s1.address
+    )
@@ -0,0 +1,69 @@
+from scripts.client import StrategyClient
+
+
+def test_client_views_match_the_strategy(chain, strategy, vault, unirouter, harvested):
+    chain.sleep(3600)
+    chain.mine(1)
+    client = StrategyClient(strategy, vault)
+
+    position = client.position()
+    assert position.block == chain.height
+    assert position.estimated_total_assets == strategy.estimatedTotalAssets()
+    assert position.exit_penalty_fee == strategy.exitPenaltyFeeWant(strategy.totalLP())
+    assert position.exit_penalty_fee == strategy.totalExitPenaltyFee()
+    assert position.nav == position.estimated_total_assets - position.exit_penalty_fee
+    assert position.total_debt == vault.strategies(strategy).dict()["totalDebt"]
+    tru = strategy.pendingRewards() + strategy.balanceOfTruRewards()
+    assert position.tru == tru > 0
+    path = [strategy.swapPath(i) for i in range(3)]
+    assert client.swap_path() == tuple(path)
+    assert position.tru_in_want == unirouter.getAmountsOut(tru, path)[-1]
+
+    # the same block is served from the cache, one eth_blockNumber per read
+    requests = client.requests
+    assert client.position() == position
+    assert client.requests == requests + 1
+
+
+def test_client_moves_to_new_blocks(chain, strategy, vault, strategist, harvested):
+    client = StrategyClient(strategy, vault, poll_interval=3600)
+    before = client.position()
+
+    # a block mined elsewhere is not seen until the poll interval passes
+    chain.sleep(3600)
+    chain.mine(1)
+    assert client.position() == before
+    client.poll_interval = 0
+    assert client.position().block == before.block + 1
+    client.poll_interval = 3600
+
+    # its own transaction moves the client to the receipt's block
+    tx = client.harvest(strategist)
+    after = client.position()
+    assert after.block == tx.block_number
+    assert after.estimated_total_assets == strategy.estimatedTotalAssets()
+    # older blocks stay readable
+    assert client.position(before.block) == before
+
+
+def test_client_prefetch(chain, accounts, strategy, vault, Multicall2, harvested):
+    multicall = accounts[0].deploy(Multicall2)
+    chain.mine(1)
+    client = StrategyClient(strategy, vault, multicall=multicall, poll_interval=3600)
+
+    client.prefetch()
+    requests = client.requests
+    client.position()
+    # only the router quote is left
+    assert client.requests - requests <= 1
+
+    # a new block is one eth_call and one quote
+    chain.mine(1)
+    client.poll_interval = 0
+    block = client.prefetch()
+    requests = client.requests
+    uncached = StrategyClient(strategy, vault)
+    assert client.position(block) == uncached.position(block)
+    assert client.requests - requests <= 1
+    # against every view read on its own, prefetch included
+    assert uncached.requests > 5 * (client.requests - requests + 1)
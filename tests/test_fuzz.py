@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+
+from scripts import fuzz
+
+
+def test_model_sequences_keep_the_invariants():
+    corpus = fuzz.fuzz(fuzz.default_sim, max_examples=100, max_steps=30)
+    assert corpus.failure is None, corpus.failure
+    features = set().union(*(f for _, f in corpus.sequences))
+    assert {"loss", "withdraw_liquidates", "emergency_harvest", "migrate"} <= features
+
+
+def test_broken_accounting_is_shrunk():
+    class LeakySim(fuzz.Sim):
+        # a withdrawal that forgets to burn the shares
+        def withdraw(self, user, bps):
+            supply = self.supply
+            value = super().withdraw(user, bps)
+            self.supply = supply
+            return value
+
+    def start():
+        sim = fuzz.default_sim()
+        return LeakySim(sim.s)
+
+    corpus = fuzz.fuzz(start, max_examples=100, max_steps=30)
+    ops, error = corpus.failure
+    assert "total supply is the sum of the shares" in str(error)
+    assert [op.kind for op in ops] == ["deposit", "withdraw"]
+
+
+def test_replay_corpus_on_chain(
+    local,
+    chain,
+    accounts,
+    Strategy,
+    strategist,
+    gov,
+    vault,
+    strategy,
+    token,
+    pool,
+    gauge,
+    tru,
+    unirouter,
+    weth,
+):
+    if not local:
+        pytest.skip("sequences are set up through the mock pool")
+    fuzz.prepare_chain(vault, strategy, pool, gov)
+
+    def new_strategy():
+        return strategist.deploy(
+            Strategy, vault, pool, gauge, tru, unirouter, [tru, weth, token]
+        )
+
+    env = SimpleNamespace(
+        chain=chain,
+        vault=vault,
+        strategy=strategy,
+        token=token,
+        pool=pool,
+        gov=gov,
+        users=[accounts[0], accounts[1], accounts[9]],
+        new_strategy=new_strategy,
+    )
+    corpus = fuzz.fuzz(fuzz.default_sim, max_examples=100, max_steps=30)
+    # the shortest sequence of each feature combination
+    for ops, _ in sorted(corpus.sequences, key=lambda s: len(s[0]))[:10]:
+        chain.snapshot()
+        try:
+            fuzz.replay(ops, env)
+        finally:
+            chain.revert()
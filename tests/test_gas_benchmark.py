@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import pytest
+
+from scripts import gas_benchmark
+
+
+def report(results):
+    return {"version": gas_benchmark.REPORT_VERSION, "commit": None, "results": results}
+
+
+def test_compare_flags_regressions_over_threshold():
+    baseline = report({"tend": {"1000": 100_000}, "harvest_profit": {"1000": 200_000}})
+    current = report({"tend": {"1000": 101_000}, "harvest_profit": {"1000": 205_000}})
+
+    assert gas_benchmark.compare(baseline, current, 0.02) == [
+        ("harvest_profit", "1000", 200_000, 205_000)
+    ]
+    assert gas_benchmark.compare(baseline, current, 0.05) == []
+
+
+def test_compare_rejects_other_versions():
+    baseline = report({})
+    baseline["version"] = gas_benchmark.REPORT_VERSION - 1
+    with pytest.raises(ValueError):
+        gas_benchmark.compare(baseline, report({}), 0.02)
+
+
+def test_benchmark_paths(
+    local,
+    chain,
+    vault,
+    strategy,
+    user,
+    gov,
+    strategist,
+    token,
+    tru,
+    pool,
+    gauge,
+    trade_factory,
+    prepare_trade_factory,
+):
+    if not local:
+        pytest.skip("benchmarks run on the mock stack")
+    stack = SimpleNamespace(
+        chain=chain,
+        vault=vault,
+        strategy=strategy,
+        user=user,
+        gov=gov,
+        strategist=strategist,
+        token=token,
+        tru=tru,
+        pool=pool,
+        gauge=gauge,
+        trade_factory=trade_factory,
+    )
+    results = gas_benchmark.run_benchmarks(stack, sizes=(1_000,))
+
+    assert set(results) == {p.__name__ for p in gas_benchmark.PATHS}
+    assert all(r["1000"] > 21_000 for r in results.values())
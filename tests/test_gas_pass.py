@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pytest
+from brownie import config
+
+from scripts import gas_benchmark
+from scripts.mocks import deploy_strategy, deploy_vault, set_trade_factory
+
+
+def test_optimized_build_matches_reference(
+    local,
+    chain,
+    pm,
+    mocks,
+    Strategy,
+    StrategyUnoptimized,
+    user,
+    rewards,
+    guardian,
+    management,
+    strategist,
+    keeper,
+    gov,
+    ymechs_safe,
+):
+    if not local:
+        pytest.skip("both builds run on the mock stack")
+    Vault = pm(config["dependencies"][0]).Vault
+    stacks = []
+    for container in (StrategyUnoptimized, Strategy):
+        vault = deploy_vault(Vault, mocks.token, gov, rewards, guardian, management)
+        strategy = deploy_strategy(container, strategist, keeper, gov, vault, mocks)
+        set_trade_factory(strategy, mocks.trade_factory, ymechs_safe, gov)
+        stacks.append(
+            SimpleNamespace(
+                chain=chain,
+                vault=vault,
+                strategy=strategy,
+                user=user,
+                gov=gov,
+                strategist=strategist,
+                **vars(mocks),
+            )
+        )
+    reference, optimized = stacks
+    assert [optimized.strategy.swapPath(i) for i in range(3)] == [
+        reference.strategy.swapPath(i) for i in range(3)
+    ]
+    assert optimized.strategy.pool() == reference.strategy.pool()
+
+    gas_benchmark.freeze(stacks)
+    before, after, mismatches = gas_benchmark.compare_builds(
+        reference, optimized, sizes=(1_000, 10_000_000)
+    )
+    print(
+        gas_benchmark.format_table(
+            gas_benchmark.make_report(before), gas_benchmark.make_report(after)
+        )
+    )
+    assert mismatches == []
+    for path, sizes in after.items():
+        for size, gas in sizes.items():
+            assert gas <= before[path][size], (path, size)
@@ -0,0 +1,121 @@
+import pytest
+from eth_utils import function_signature_to_4byte_selector as selector
+
+from scripts import gas_profile
+from scripts.gas_profile import Resolver, diff, profile_trace
+
+STRATEGY = "0x" + "11" * 20
+GAUGE = "0x" + "22" * 20
+POOL = "0x" + "33" * 20
+TOKEN = "0x" + "44" * 20
+EOA = "0x" + "55" * 20
+
+
+def _call(op, gas, depth, target, signature=None, memory=None):
+    # calldata at memory offset 0, stack top last
+    if memory is None:
+        memory = [(selector(signature) + b"\0" * 28).hex()]
+    args = [hex(68), hex(0)]
+    if op == "CALL":
+        args.append(hex(0))  # value
+    return {
+        "op": op,
+        "gas": gas,
+        "gasCost": 100,
+        "depth": depth,
+        "stack": ["0x0", "0x0"] + args + [target, hex(gas)],
+        "memory": memory,
+    }
+
+
+def _step(gas, depth, op="PUSH1"):
+    return {"op": op, "gas": gas, "gasCost": 3, "depth": depth, "stack": []}
+
+
+def _harvest_trace():
+    # harvest -> gauge.staked, pool.liquidExit -> token.transfer, call to an EOA
+    # (the pool is named after the smallest contract with liquidExit, IPool)
+    return [
+        _step(1_000, 1),
+        _call("STATICCALL", 990, 1, GAUGE, "staked(address,address)"),
+        _step(900, 2),
+        _step(880, 2, "RETURN"),
+        _call("CALL", 950, 1, POOL, "liquidExit(uint256)"),
+        _step(800, 2),
+        _call("CALL", 790, 2, TOKEN, "transfer(address,uint256)"),
+        _step(700, 3),
+        _step(690, 3, "RETURN"),
+        _step(760, 2, "STOP"),
+        _call("CALL", 740, 1, EOA, memory=[]),
+        _step(735, 1, "STOP") | {"gasCost": 0},
+    ]
+
+
+def _resolver():
+    # BaseStrategy and ERC20 come from the packages, not in the repo sources
+    resolver = Resolver.from_project()
+    resolver.add("Strategy", "harvest()")
+    resolver.add("ERC20", "transfer(address,uint256)")
+    return resolver
+
+
+def test_profile_attributes_gas_to_calls(tmp_path):
+    profile = profile_trace(
+        _harvest_trace(),
+        STRATEGY,
+        selector("harvest()"),
+        21_265,
+        _resolver(),
+        labels={STRATEGY: "Strategy", TOKEN: "USDC"},
+    )
+    functions = dict(profile.functions)
+    # [calls, inclusive, self]
+    assert functions["IGauge.staked"] == [1, 40, 40]
+    assert functions["IPool.liquidExit"] == [1, 210, 180]
+    assert functions["USDC.transfer"] == [1, 30, 30]
+    assert functions[EOA[:8] + ".fallback"] == [1, 5, 5]
+    assert functions["Strategy.harvest"] == [1, 265, 10]
+    assert functions[gas_profile.INTRINSIC][2] == 21_000
+    assert sum(profile.folded.values()) == profile.gas_used
+
+    out = tmp_path / "harvest.folded"
+    profile.write_folded(out)
+    assert "Strategy.harvest;IPool.liquidExit;USDC.transfer 30" in out.read_text()
+    assert profile.top(1)[0][0] == gas_profile.INTRINSIC
+
+
+def test_diff_ranks_the_regression_first():
+    resolver = _resolver()
+    labels = {STRATEGY: "Strategy", TOKEN: "USDC"}
+    before = profile_trace(
+        _harvest_trace(), STRATEGY, selector("harvest()"), 21_265, resolver, labels
+    )
+    slower = _harvest_trace()
+    # the transfer burns 50 more gas
+    slower[7]["gas"], slower[8]["gas"] = 650, 640
+    slower[9]["gas"], slower[10]["gas"], slower[11]["gas"] = 710, 690, 685
+    after = profile_trace(
+        slower, STRATEGY, selector("harvest()"), 21_315, resolver, labels
+    )
+
+    rows = diff(before, after)
+    assert rows[0][0] in ("Strategy.harvest", "IPool.liquidExit", "USDC.transfer")
+    assert ("USDC.transfer", 0, 50, 50) in rows
+    assert ("IGauge.staked", 0, 0, 0) not in rows
+
+
+def test_profile_harvest(local, chain, web3, strategy, strategist, harvested):
+    if not local:
+        pytest.skip("traces the mock stack")
+    chain.sleep(3600)
+    chain.mine(1)
+    tx = strategy.harvest({"from": strategist})
+
+    resolver = Resolver.from_project(packages=gas_profile._packages())
+    profile = gas_profile.profile_tx(
+        web3, tx.txid, resolver, gas_profile.project_labels()
+    )
+    labels = set(profile.functions)
+    assert any(label.endswith(".liquidExit") for label in labels)
+    assert any(label.endswith(".report") for label in labels)
+    assert sum(profile.folded.values()) == tx.gas_used
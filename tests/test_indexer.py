@@ -0,0 +1,46 @@
+from brownie import web3
+
+from scripts.indexer import Indexer, Store, sources
+
+
+def test_incremental_index_and_reorg(
+    tmp_path, chain, vault, strategy, gauge, pool, user, gov, strategist, harvested
+):
+    store = Store(tmp_path / "events.sqlite")
+    indexer = Indexer(
+        web3,
+        store,
+        {strategy.address: sources(strategy)},
+        start_block=strategy.tx.block_number,
+        chunk_size=5,
+    )
+    assert indexer.run() >= 3
+    (harvest,) = store.events("harvested", strategy)
+    (report,) = store.events("strategy_reported", strategy)
+    assert report["gain"] == harvest["profit"]
+    assert report["total_debt"] == vault.strategies(strategy).dict()["totalDebt"]
+    assert len(store.events("pool_joined", strategy)) == 1
+
+    # nothing new, nothing fetched
+    calls = indexer.get_logs_calls
+    assert indexer.run() == 0
+    assert indexer.get_logs_calls == calls
+
+    chain.snapshot()
+    chain.sleep(86400)
+    vault.withdraw(vault.balanceOf(user) // 2, user, 10_000, {"from": user})
+    strategy.claimRewards({"from": gov})
+    assert indexer.run() == 2
+    (exited,) = store.events("pool_exited", strategy)
+    (claimed,) = store.events("claimed", strategy)
+    assert claimed["token"] == pool.address
+    assert store.events("claimed", strategy, start=claimed["timestamp"] + 1) == []
+
+    # replace the last blocks, the exit and claim are rolled back
+    chain.revert()
+    chain.sleep(86400)
+    strategy.harvest({"from": strategist})
+    indexer.run()
+    assert store.events("pool_exited", strategy) == []
+    assert store.events("claimed", strategy) == []
+    assert len(store.events("harvested", strategy)) == 2
@@ -0,0 +1,32 @@
+# Brownie hands whole modules to the xdist workers and resets the chain
+# around each one (module_isolation). Inside a module the cached chain states
+# are restored before every test, whatever the tests before it did and in
+# whichever order the tests are written.
+
+
+def test_without_vault_sends(accounts):
+    accounts[9].transfer(accounts[7], accounts[9].balance() // 2)
+
+
+def test_without_vault_reverted(accounts):
+    # fn_isolation reverted the transfer of the test above
+    assert accounts[9].balance() == accounts[7].balance()
+
+
+def test_harvested_withdraws(vault, strategy, user, harvested):
+    assert vault.strategies(strategy).dict()["totalDebt"] > 0
+    vault.withdraw(vault.balanceOf(user), user, 10_000, {"from": user})
+    assert vault.balanceOf(user) == 0
+
+
+def test_funded_runs_before_harvested(vault, strategy, token, amount, funded):
+    # written after the harvested test, run before it: the deposit is still
+    # in the vault and nothing was invested
+    assert vault.strategies(strategy).dict()["totalDebt"] == 0
+    assert token.balanceOf(vault) == amount
+
+
+def test_harvested_again(vault, strategy, amount, harvested):
+    # the withdrawal above was reverted with the rest of its test
+    assert vault.strategies(strategy).dict()["totalDebt"] > 0
+    assert vault.totalAssets() >= amount
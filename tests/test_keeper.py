@@ -0,0 +1,100 @@
+import asyncio
+
+from brownie import web3
+
+from scripts.keeper import Keeper, NonceSender, RevertError, RpcClient
+
+
+def run_keeper(strategies, keeper, rounds=1):
+    async def run():
+        async with RpcClient(web3.provider.endpoint_uri) as rpc:
+            k = Keeper(rpc, NonceSender(rpc, keeper.address), strategies)
+            return await k.run(rounds=rounds), k
+
+    return asyncio.run(run())
+
+
+class TriggeredRpc:
+    # every trigger is on, every dry run passes and every transaction succeeds
+    async def request(self, method, params):
+        if method == "eth_getTransactionReceipt":
+            return {"status": "0x1"}
+        return "0x" + "0" * 63 + "1"
+
+
+class PendingRpc(TriggeredRpc):
+    # the transactions never get a receipt
+    async def request(self, method, params):
+        if method == "eth_getTransactionReceipt":
+            return None
+        return await super().request(method, params)
+
+
+class RejectingSender:
+    address = "0x" + "0" * 40
+
+    def __init__(self, rejected=None):
+        self.rejected = rejected
+        self.resyncs = 0
+
+    def resync(self):
+        self.resyncs += 1
+
+    async def send(self, to, data, gas_price):
+        if to.lower() == self.rejected:
+            raise RevertError("nonce too low")
+        return "0x" + to[2:].lower()
+
+
+def test_keeper_harvests_triggered_strategy(vault, strategy, keeper, funded):
+    report, _ = run_keeper([strategy], keeper)
+
+    assert report["sent"] == {"harvest": 1}
+    assert report["confirmed"] == 1
+    assert vault.strategies(strategy).dict()["totalDebt"] > 0
+
+
+def test_keeper_drops_reverting_strategy(
+    chain, token, vault, strategy, user, amount, keeper
+):
+    # no trade factory, harvest() would revert
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.mine(1)
+
+    report, k = run_keeper([strategy], keeper)
+
+    assert report["sent"] == {}
+    assert any("Trade factory must be set." in reason for reason in report["dropped"])
+    # backed off for the next block
+    assert k._due(chain.height) == []
+    assert vault.strategies(strategy).dict()["totalDebt"] == 0
+
+
+def test_keeper_backs_off_rejected_send():
+    good, bad = ("0x" + c * 40 for c in "ab")
+    k = Keeper(TriggeredRpc(), RejectingSender(bad), [good, bad])
+
+    txids = asyncio.run(k.run_round(10))
+
+    assert txids == ["0x" + "a" * 40]
+    assert k.metrics.sent == {"harvest": 1}
+    assert k.metrics.dropped == {"nonce too low": 1}
+    # backed off until the next block
+    assert k._due(10) == [k.strategies[0]]
+
+
+def test_keeper_times_out_missing_receipt():
+    strategy = "0x" + "a" * 40
+    sender = RejectingSender()
+    k = Keeper(PendingRpc(), sender, [strategy], receipt_timeout=0)
+
+    report = asyncio.run(k.run(rounds=1))
+
+    assert report["sent"] == {"harvest": 1}
+    assert report["confirmed"] == 0
+    assert report["dropped"] == {"receipt timeout": 1}
+    assert sender.resyncs == 1
+    # backed off until the next block
+    assert k._due(1) == []
+    assert k._due(2) == [k.strategies[0]]
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from scripts import load_generator
+from scripts.load_generator import Op, Wallet, batches, funding, parse_mix, plan
+
+
+def test_plan_is_deterministic_and_withdraws_from_holders():
+    ops = plan(50, 2_000, "deposit=5,withdraw=4,harvest=1", seed=3)
+    assert ops == plan(50, 2_000, "deposit=5,withdraw=4,harvest=1", seed=3)
+    assert {op.kind for op in ops} == {"deposit", "withdraw", "harvest"}
+
+    holders = set()
+    for op in ops:
+        if op.kind == "deposit":
+            assert 10 ** 6 <= op.value <= load_generator.MAX_DEPOSIT * 10 ** 6
+            holders.add(op.user)
+        elif op.kind == "withdraw":
+            assert op.user in holders
+            assert 1 <= op.value <= load_generator.MAX_BPS
+            if op.value == load_generator.MAX_BPS:
+                holders.discard(op.user)
+
+    amounts = funding(ops)
+    assert sum(amounts.values()) == sum(op.value for op in ops if op.kind == "deposit")
+
+
+def test_parse_mix_rejects_unknown_operations():
+    assert parse_mix("deposit=1") == {"deposit": 1, "withdraw": 0, "harvest": 0}
+    with pytest.raises(ValueError, match="unknown operation"):
+        parse_mix("deposit=1,tend=1")
+    with pytest.raises(ValueError, match="needs deposits"):
+        parse_mix("withdraw=1")
+
+
+def test_batches_keep_users_apart_and_harvests_alone():
+    ops = [
+        Op("deposit", 0, 1),
+        Op("deposit", 1, 1),
+        Op("withdraw", 0, 10),
+        Op("harvest", None, 0),
+        Op("deposit", 2, 1),
+    ]
+    assert batches(ops) == [ops[:2], ops[2:3], ops[3:4], ops[4:]]
+
+    ops = plan(20, 500, load_generator.DEFAULT_MIX, seed=1)
+    split = batches(ops)
+    assert [op for batch in split for op in batch] == ops
+    for batch in split:
+        users = [op.user for op in batch]
+        assert len(users) == len(set(users))
+        assert len(batch) == 1 or "harvest" not in {op.kind for op in batch}
+
+
+def test_received_sums_matching_transfers():
+    vault, user, other = ("0x" + c * 40 for c in "abc")
+    token = "0x" + "d" * 40
+
+    def log(address, sender, recipient, value):
+        return {
+            "address": address,
+            "topics": [
+                "0x" + load_generator.TRANSFER.hex(),
+                load_generator._topic(sender),
+                load_generator._topic(recipient),
+            ],
+            "data": hex(value),
+        }
+
+    receipt = {
+        "logs": [
+            log(token, vault, user, 700),
+            log(token, vault, other, 50),
+            log(vault, user, "0x" + "0" * 40, 1_000),
+            log(token, vault, user, 5),
+        ]
+    }
+    assert load_generator.received(receipt, token, vault, user) == 705
+
+
+def test_load_run(
+    local, web3, vault, strategy, token, pool, strategist, gov, prepare_trade_factory
+):
+    if not local:
+        pytest.skip("mints want to the generated accounts")
+    pool.setInterestRate(0, {"from": gov})
+    users = 20
+    ops = plan(users, 100, load_generator.DEFAULT_MIX, seed=7)
+
+    report = asyncio.run(
+        load_generator.run_load(
+            web3.provider.endpoint_uri,
+            vault,
+            strategy,
+            token,
+            Wallet(strategist.private_key),
+            ops,
+            users,
+            seed=7,
+            batch_size=8,
+        )
+    )
+
+    assert report["failed"] == {} and report["rejected"] == {}
+    planned = {
+        kind: sum(op.kind == kind for op in ops) for kind in ("deposit", "harvest")
+    }
+    for kind, count in planned.items():
+        assert report["gas"][kind]["count"] == count
+    assert report["gas"]["withdraw"]["count"] > 0
+    # the exit penalty is 10 bps of what the strategy liquidates
+    assert 0 <= report["penalty_bps"] <= 20
+    print(load_generator.format_report({users: report}))
@@ -0,0 +1,152 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from scripts import model
+
+
+def make_state(n=1, **overrides):
+    fields = dict(
+        want=0,
+        lp=0,
+        staked=100_000 * 10 ** 6,
+        pool_value=110_000 * 10 ** 6,
+        pool_supply=100_000 * 10 ** 6,
+        penalty=9_990,
+        debt=100_000 * 10 ** 6,
+    )
+    fields.update(overrides)
+    fields = {
+        k: np.full(n, v, dtype=object) if np.ndim(v) == 0 else v
+        for k, v in fields.items()
+    }
+    return model.StrategyState(**fields)
+
+
+def test_views():
+    s = make_state()
+    assert model.get_virtual_price(s)[0] == 11 * 10 ** 17
+    assert model.estimated_total_assets(s)[0] == 110_000 * 10 ** 6
+    # 0.1% of the LP, priced at 1.1
+    assert model.exit_penalty_fee_want(s, model.total_lp(s))[0] == 110 * 10 ** 6
+
+
+def test_prepare_return_profit_and_withdrawal_loss():
+    s = make_state()
+    profit, loss, debt_payment = model.prepare_return(s, 0)
+    # 10k profit is freed from the pool in one exit, penalty included
+    assert profit[0] == 10_000 * 10 ** 6
+    assert s.want[0] >= 10_000 * 10 ** 6
+    assert loss[0] == 0
+    assert debt_payment[0] == 0
+    gross = -(-10_000 * 10 ** 6 * 10_000 // 9_990)
+    assert s.staked[0] == 100_000 * 10 ** 6 - -(-gross * 100_000 // 110_000)
+
+
+def test_preview_withdraw_covers_target_exactly():
+    s = make_state()
+    amounts = [1, 10 ** 6, 12_345_678_901, 50_000 * 10 ** 6, 10 ** 12]
+    out, lp = model.preview_withdraw(s, amounts)
+    value = model.estimated_total_assets(s)[0]
+    for amount, got, burnt in zip(amounts, out, lp):
+        if burnt == s.staked[0]:
+            # capped at the staked LP: everything minus the penalty
+            assert got == value * 9_990 // 10_000
+            continue
+        assert got >= amount
+        # one LP less would come up short
+        assert (
+            s.pool_value[0] * (burnt - 1) // s.pool_supply[0]
+        ) * 9_990 // 10_000 < amount
+
+
+def test_liquidate_uses_idle_want_first():
+    s = make_state(want=5 * 10 ** 6)
+    liquidated, loss = model.liquidate_position(s, 10 ** 6)
+    assert (liquidated[0], loss[0]) == (10 ** 6, 0)
+    assert s.staked[0] == 100_000 * 10 ** 6
+
+
+def test_adjust_position_joins_and_stakes():
+    s = make_state(want=11_000 * 10 ** 6, staked=0)
+    model.adjust_position(s, 1_000 * 10 ** 6)
+    assert s.want[0] == 1_000 * 10 ** 6
+    assert s.lp[0] == 0
+    assert s.staked[0] == 10_000 * 10 ** 6 * 100_000 // 110_000
+    assert s.pool_value[0] == 120_000 * 10 ** 6
+
+
+def test_buffer_hysteresis():
+    # 10% buffer, 2% band, on ~100k of assets
+    s = make_state(
+        want=10_000 * 10 ** 6,
+        staked=90_000 * 10 ** 6,
+        pool_value=99_000 * 10 ** 6,
+        pool_supply=90_000 * 10 ** 6,
+    )
+    staked = s.staked[0]
+    # inside the band: nothing moves
+    s.want[0] = 9_000 * 10 ** 6
+    model.adjust_position(s, 0, 1_000, 200)
+    assert (s.want[0], s.staked[0]) == (9_000 * 10 ** 6, staked)
+    # above the band: drained back to the target
+    s.want[0] = 14_000 * 10 ** 6
+    model.adjust_position(s, 0, 1_000, 200)
+    assert s.want[0] == (99_000 + 14_000) * 10 ** 6 // 10
+    # below the band: refilled from the pool, less the exit penalty
+    s.want[0] = 1_000 * 10 ** 6
+    model.adjust_position(s, 0, 1_000, 200)
+    assert s.staked[0] < staked
+    assert (
+        pytest.approx(s.want[0], rel=2e-3) == model.estimated_total_assets(s)[0] // 10
+    )
+
+
+def test_vectorized_matches_per_scenario():
+    rng = np.random.default_rng(1)
+    n = 2_000
+    s = make_state(
+        n,
+        want=rng.integers(0, 10 ** 10, n),
+        staked=rng.integers(10 ** 9, 10 ** 12, n),
+        pool_value=rng.integers(10 ** 12, 10 ** 13, n),
+        pool_supply=rng.integers(10 ** 12, 10 ** 13, n),
+        penalty=rng.integers(9_000, 10_001, n),
+        debt=rng.integers(10 ** 9, 10 ** 12, n),
+    )
+    outstanding = rng.integers(0, 10 ** 11, n)
+    batch = model.prepare_return(s.copy(), outstanding)
+    for i in range(0, n, 97):
+        single = model.prepare_return(s.take([i]), outstanding[i])
+        assert [int(x[0]) for x in single] == [int(x[i]) for x in batch]
+
+
+def test_differential_check_against_strategy(
+    local, chain, token, vault, strategy, pool, gov, harvested
+):
+    if not local:
+        pytest.skip("scenarios are set up through the mock pool")
+    pool.setInterestRate(0)
+
+    def apply(scenario):
+        penalty, pool_gain, debt_ratio = scenario
+        pool.setExitPenalty(penalty)
+        if pool_gain > 0:
+            token.mint(pool, pool_gain)
+        elif pool_gain < 0:
+            token.burn(pool, -pool_gain)
+        vault.updateStrategyDebtRatio(strategy, debt_ratio, {"from": gov})
+        chain.sleep(1)
+
+    scenarios = list(
+        itertools.product(
+            [10_000, 9_990, 9_500],
+            [1_000 * 10 ** 6, 0, -500 * 10 ** 6],
+            [10_000, 5_000, 0],
+        )
+    )
+    checked = model.differential_check(
+        chain, strategy, vault, pool, scenarios, apply, sample=10
+    )
+    assert checked == 10
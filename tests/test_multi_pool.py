@@ -0,0 +1,119 @@
+import brownie
+import pytest
+
+
+@pytest.fixture
+def multi_pool(
+    local,
+    accounts,
+    MultiPoolStrategy,
+    mocks,
+    vault,
+    strategy,
+    strategist,
+    keeper,
+    gov,
+    trade_factory,
+    ymechs_safe,
+):
+    if not local:
+        pytest.skip("needs several mock pools on the mock gauge")
+    from scripts.mocks import deploy_pool, set_trade_factory
+
+    # same gauge, different liquid exit penalties
+    pools = [mocks.pool] + [
+        deploy_pool(accounts[8], mocks.token, mocks.gauge, exit_penalty=penalty)
+        for penalty in (10_000, 9_900)
+    ]
+    multi = strategist.deploy(
+        MultiPoolStrategy,
+        vault,
+        pools,
+        [5_000, 3_000, 2_000],
+        mocks.gauge,
+        mocks.tru,
+        mocks.unirouter,
+        [mocks.tru, mocks.weth, mocks.token],
+    )
+    multi.setKeeper(keeper)
+    vault.updateStrategyDebtRatio(strategy, 0, {"from": gov})
+    vault.addStrategy(multi, 10_000, 0, 2 ** 256 - 1, 1_000, {"from": gov})
+    set_trade_factory(multi, trade_factory, ymechs_safe, gov)
+    return multi, pools
+
+
+def test_allocates_by_weight(chain, vault, token, user, amount, strategist, multi_pool):
+    multi, pools = multi_pool
+    token.approve(vault, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    multi.harvest({"from": strategist})
+
+    total = multi.estimatedTotalAssets()
+    assert pytest.approx(total, rel=1e-5) == amount
+    for i, weight in enumerate([5_000, 3_000, 2_000]):
+        assert pytest.approx(multi.poolAssets(i), rel=1e-4) == total * weight // 10_000
+
+    # rebalancing happens on new deposits
+    multi.setWeights([2_000, 3_000, 5_000], {"from": strategist})
+    with brownie.reverts("!weights"):
+        multi.setWeights([5_000, 5_000, 1], {"from": strategist})
+
+
+def test_single_claim_and_cheapest_exit(
+    chain, gauge, tru, vault, token, user, amount, strategist, multi_pool
+):
+    multi, pools = multi_pool
+    token.approve(vault, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    multi.harvest({"from": strategist})
+    chain.sleep(86400)
+    chain.mine(1)
+
+    pending = multi.pendingRewards()
+    assert pending > 0
+    tx = multi.harvest({"from": strategist})
+    # every pool claimed through one gauge.claim call
+    claims = [
+        s
+        for s in tx.subcalls
+        if s["to"] == gauge and s.get("function", "").startswith("claim(")
+    ]
+    assert len(claims) == 1
+    assert len(tx.events["Claimed"]) == len(pools)
+    assert tru.balanceOf(multi) >= pending
+    assert multi.pendingRewards() == 0
+
+    # the pool without exit penalty is exited first
+    staked = [multi.balanceOfLPInGauge(i) for i in range(len(pools))]
+    vault.withdraw(amount // 10, user, 10_000, {"from": user})
+    assert multi.balanceOfLPInGauge(1) < staked[1]
+    assert multi.balanceOfLPInGauge(0) == staked[0]
+    assert multi.balanceOfLPInGauge(2) == staked[2]
+    # no penalty, nothing lost
+    assert token.balanceOf(user) >= amount // 10 - 1
+
+
+def test_exit_skips_illiquid_pool_and_covers_penalty(
+    chain, vault, token, user, gov, amount, strategist, multi_pool
+):
+    multi, pools = multi_pool
+    token.approve(vault, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    multi.harvest({"from": strategist})
+
+    # the pool without exit penalty is fully lent out, quoting its penalty
+    # for the withdrawal would revert
+    pools[1].setInterestRate(0, {"from": gov})
+    pools[1].borrow(pools[1].liquidValue(), {"from": gov})
+    assert pools[1].liquidValue() == 0
+
+    # the next cheapest pool frees the amount plus its 0.1% exit penalty
+    staked = [multi.balanceOfLPInGauge(i) for i in range(len(pools))]
+    vault.withdraw(amount // 10, user, 0, {"from": user})
+    assert multi.balanceOfLPInGauge(0) < staked[0]
+    assert multi.balanceOfLPInGauge(1) == staked[1]
+    assert multi.balanceOfLPInGauge(2) == staked[2]
+    assert token.balanceOf(user) >= amount // 10 - 1
@@ -6,7 +6,16 @@ from utils import checks
 
 
 def test_operation(
-    chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, prepare_trade_factory
+    chain,
+    accounts,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    RELATIVE_APPROX,
+    prepare_trade_factory,
 ):
     # Deposit to the vault
     user_balance_before = token.balanceOf(user)
@@ -28,20 +37,28 @@ def test_operation(
     penaltyFee = strategy.exitPenaltyFeeWant(strategy.totalLP())
     vault.withdraw(vault.balanceOf(user), user, 10_000, {"from": user})
     assert (
-        pytest.approx(token.balanceOf(user) + penaltyFee, rel=RELATIVE_APPROX) == user_balance_before
+        pytest.approx(token.balanceOf(user) + penaltyFee, rel=RELATIVE_APPROX)
+        == user_balance_before
     )
-    print(strategy.estimatedTotalAssets()) # tiny amount is remaining because of the math on "withdrawSome()"
-    checks.check_vault_empty(vault)
+    print(
+        strategy.estimatedTotalAssets()
+    )  # tiny amount is remaining because of the math on "withdrawSome()"
+    checks.check_vault_empty(strategy)
 
 
 def test_emergency_exit(
-    chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, prepare_trade_factory
+    chain,
+    accounts,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    RELATIVE_APPROX,
+    harvested,
 ):
-    # Deposit to the vault
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    chain.sleep(1)
-    strategy.harvest()
+    # starts deposited and harvested
     penaltyFee = strategy.exitPenaltyFeeWant(strategy.totalLP())
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
@@ -49,30 +66,48 @@ def test_emergency_exit(
     strategy.setEmergencyExit()
     chain.sleep(1)
     strategy.harvest()
-    assert pytest.approx(token.balanceOf(vault) + penaltyFee, rel=RELATIVE_APPROX) == amount
+    assert (
+        pytest.approx(token.balanceOf(vault) + penaltyFee, rel=RELATIVE_APPROX)
+        == amount
+    )
     checks.check_strategy_empty(strategy)
 
 
 def test_profitable_harvest(
-    chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, prepare_trade_factory, ymechs_safe, multicall_swapper, unirouter, weth, tru, trade_factory, gov
+    chain,
+    accounts,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    RELATIVE_APPROX,
+    rewards_accrued,
+    ymechs_safe,
+    multicall_swapper,
+    unirouter,
+    weth,
+    tru,
+    trade_factory,
+    gov,
 ):
-    # Deposit to the vault
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    assert token.balanceOf(vault.address) == amount
-
-    # Harvest 1: Send funds through the strategy
-    chain.sleep(1)
-    strategy.harvest()
-    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+    # starts harvested once with 5 days of rewards accrued
     before_pps = vault.pricePerShare()
 
-    # TODO: Add some code before harvest #2 to simulate earning yield
-
     # Harvest 2: Realize profit
-    chain.sleep(86400 * 5)
-    chain.mine(1)
-    test_yswap.yswap(chain, strategy, token, tru, unirouter, weth, multicall_swapper, ymechs_safe, gov, trade_factory)
+    test_yswap.yswap(
+        chain,
+        strategy,
+        token,
+        tru,
+        unirouter,
+        weth,
+        multicall_swapper,
+        ymechs_safe,
+        gov,
+        trade_factory,
+    )
     tx = strategy.harvest()
     checks.check_harvest_profitable(tx)
     chain.sleep(3600 * 6)  # 6 hrs needed for profits to unlock
@@ -84,7 +119,16 @@ def test_profitable_harvest(
 
 
 def test_change_debt(
-    chain, gov, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, prepare_trade_factory
+    chain,
+    gov,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    RELATIVE_APPROX,
+    prepare_trade_factory,
 ):
     # Deposit to the vault and harvest
     token.approve(vault.address, amount, {"from": user})
@@ -108,11 +152,13 @@ def test_change_debt(
     zx = strategy.harvest()
     print("strategy total estimated change debt:", strategy.estimatedTotalAssets())
     assert strategy.estimatedTotalAssets() >= half
-    # penalty fee taken by vault 
+    # penalty fee taken by vault
     # vault received (half - penaltyFee)
 
 
-def test_sweep(gov, vault, strategy, token, user, amount, weth, weth_amout, prepare_trade_factory):
+def test_sweep(
+    gov, vault, strategy, token, user, amount, weth, weth_amout, prepare_trade_factory
+):
     # Strategy want token doesn't work
     token.transfer(strategy, amount, {"from": user})
     assert token.address == strategy.want()
@@ -138,7 +184,17 @@ def test_sweep(gov, vault, strategy, token, user, amount, weth, weth_amout, prep
 
 
 def test_triggers(
-    chain, gov, vault, strategy, token, amount, user, weth, weth_amout, strategist, prepare_trade_factory
+    chain,
+    gov,
+    vault,
+    strategy,
+    token,
+    amount,
+    user,
+    weth,
+    weth_amout,
+    strategist,
+    prepare_trade_factory,
 ):
     # Deposit to the vault and harvest
     token.approve(vault.address, amount, {"from": user})
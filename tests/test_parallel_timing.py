@@ -0,0 +1,21 @@
+from scripts.parallel_timing import format_table, module_times, schedule_bound
+
+
+def test_module_times_and_schedule_bound(tmp_path):
+    junit = tmp_path / "report.xml"
+    junit.write_text(
+        '<testsuites><testsuite name="pytest">'
+        '<testcase classname="tests.test_harvests" name="a" time="40"/>'
+        '<testcase classname="tests.test_harvests" name="b" time="20"/>'
+        '<testcase classname="tests.test_shutdown" name="c" time="30"/>'
+        '<testcase classname="tests.test_model" name="d" time="10"/>'
+        "</testsuite></testsuites>"
+    )
+    times = module_times(junit)
+    assert times == {"test_harvests": 60, "test_shutdown": 30, "test_model": 10}
+    assert schedule_bound(times, 1) == 100
+    # modules are not split, the biggest one bounds every worker count
+    assert schedule_bound(times, 2) == 60
+    assert schedule_bound(times, 8) == 60
+    table = format_table(100, {1: 100, 2: 55}, times)
+    assert "1.82" in table and "test_harvests 60.0s" in table
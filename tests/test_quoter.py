@@ -0,0 +1,59 @@
+import numpy as np
+from eth_utils import to_checksum_address
+
+from scripts.quoter import Quoter, candidate_paths, get_amount_out, reserve_source
+
+A, B, C = [to_checksum_address(f"0x{i:040x}") for i in (1, 2, 3)]
+
+
+def _get_amounts_out(reserves, amount, path):
+    # UniswapV2Library.getAmountsOut, one hop at a time
+    for hop in zip(path, path[1:]):
+        reserve_in, reserve_out = reserves[hop]
+        amount_with_fee = amount * 997
+        amount = amount_with_fee * reserve_out // (reserve_in * 1000 + amount_with_fee)
+    return amount
+
+
+def test_quotes_match_router_math():
+    reserves = {}
+    for (a, b), (reserve_a, reserve_b) in {
+        (A, B): (15_000_000 * 10 ** 8, 1_000 * 10 ** 18),
+        (B, C): (1_000 * 10 ** 18, 3_000_000 * 10 ** 6),
+        (A, C): (10 ** 12, 2 * 10 ** 11),
+    }.items():
+        reserves[(a, b)] = (reserve_a, reserve_b)
+        reserves[(b, a)] = (reserve_b, reserve_a)
+    quoter = Quoter(reserves)
+    paths = candidate_paths(A, C, [B])
+    assert paths == [(A, C), (A, B, C)]
+
+    amounts = np.random.default_rng(0).integers(1, 10 ** 15, 500)
+    quotes = quoter.quote(amounts, paths)
+    assert quotes.shape == (2, 500)
+    for i, path in enumerate(paths):
+        for j in range(0, 500, 37):
+            assert quotes[i, j] == _get_amounts_out(reserves, int(amounts[j]), path)
+
+    best, index = quoter.best(amounts, paths)
+    assert list(best) == [max(quotes[:, j]) for j in range(500)]
+    ranked = quoter.rank(10 ** 13, paths)
+    assert [q for q, _ in ranked] == sorted(quoter.quote([10 ** 13], paths)[:, 0])[::-1]
+
+
+def test_no_liquidity_quotes_zero():
+    assert list(get_amount_out([0, 10], [10 ** 6, 0], [10 ** 6, 10 ** 6])) == [0, 0]
+    assert Quoter({}).quote([10 ** 6], [(A, B)])[0, 0] == 0
+
+
+def test_quoter_matches_unirouter(accounts, Multicall2, unirouter, tru, weth, token):
+    multicall = accounts[0].deploy(Multicall2)
+    paths = candidate_paths(tru, token, [weth])
+    quoter = Quoter.load(multicall, reserve_source(multicall, unirouter), paths)
+
+    amounts = [10 ** 8, 10 ** 12, 10 ** 14, 10 ** 16]
+    quotes = quoter.quote(amounts, paths)
+    for j, amount in enumerate(amounts):
+        assert quotes[1, j] == unirouter.getAmountsOut(amount, paths[1])[-1]
+    # the mock router has no direct TRU/want pair, the fork one is thin
+    assert quoter.rank(10 ** 12, paths)[0] == (quotes[1, 1], paths[1])
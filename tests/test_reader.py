@@ -0,0 +1,45 @@
+from brownie import interface
+
+from scripts.reader import FleetReader
+
+
+def test_fleet_reader(chain, accounts, strategy, vault, token, Multicall2, harvested):
+    multicall = accounts[0].deploy(Multicall2)
+    reader = FleetReader(multicall, [strategy])
+    chain.mine(1)
+
+    (reading,) = reader.read()
+    assert reading.estimated_total_assets == strategy.estimatedTotalAssets()
+    assert reading.virtual_price == strategy.getVirtualPrice()
+    assert reading.total_lp == strategy.totalLP()
+    assert reading.lp_in_gauge == strategy.balanceOfLPInGauge()
+    assert reading.pending_rewards == strategy.pendingRewards()
+    assert reading.tru_rewards == strategy.balanceOfTruRewards()
+    assert reading.exit_penalty_fee == strategy.exitPenaltyFeeWant(strategy.totalLP())
+    assert reading.total_debt == vault.strategies(strategy).dict()["totalDebt"]
+    assert reading.exit_penalty_fee == strategy.totalExitPenaltyFee()
+    # the penalty fee is read in the same eth_call
+    assert reader.eth_calls == 1
+
+    # same block is served from the cache
+    assert reader.read() == (reading,)
+    assert reader.eth_calls == 1
+
+    # one eth_call per new block
+    chain.mine(1)
+    reader.read()
+    assert reader.eth_calls == 2
+
+    # an older block stays readable
+    assert reader.read(reading.block) == (reading,)
+    assert reader.eth_calls == 2
+
+
+def test_fleet_reader_failed_vault_call(accounts, strategy, token, Multicall2):
+    multicall = accounts[0].deploy(Multicall2)
+    # the token has no strategies(), the vault fields read as None
+    reader = FleetReader(multicall, [strategy], [interface.VaultAPI(token)])
+
+    (reading,) = reader.read()
+    assert reading.estimated_total_assets == strategy.estimatedTotalAssets()
+    assert reading.debt_ratio is reading.total_debt is reading.last_report is None
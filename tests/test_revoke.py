@@ -1,14 +1,11 @@
 import pytest
 from utils import checks
 
+
 def test_revoke_strategy_from_vault(
-    chain, token, vault, strategy, amount, user, gov, RELATIVE_APPROX, prepare_trade_factory
+    chain, token, vault, strategy, amount, user, gov, RELATIVE_APPROX, harvested
 ):
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    chain.sleep(1)
-    strategy.harvest()
+    # starts deposited and harvested
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
     penaltyFee = strategy.exitPenaltyFeeWant(strategy.totalLP())
@@ -21,17 +18,16 @@ def test_revoke_strategy_from_vault(
     strategy.harvest()
 
     print(token.balanceOf(vault) + penaltyFee)
-    assert pytest.approx(token.balanceOf(vault) + penaltyFee, rel=RELATIVE_APPROX) == amount
+    assert (
+        pytest.approx(token.balanceOf(vault) + penaltyFee, rel=RELATIVE_APPROX)
+        == amount
+    )
 
 
 def test_revoke_strategy_from_strategy(
-    chain, token, vault, strategy, amount, gov, user, RELATIVE_APPROX, prepare_trade_factory
+    chain, token, vault, strategy, amount, gov, user, RELATIVE_APPROX, harvested
 ):
-    # Deposit to the vault and harvest
-    token.approve(vault.address, amount, {"from": user})
-    vault.deposit(amount, {"from": user})
-    chain.sleep(1)
-    strategy.harvest()
+    # starts deposited and harvested
     penaltyFee = strategy.exitPenaltyFeeWant(strategy.totalLP())
     print(penaltyFee)
     assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
@@ -41,5 +37,8 @@ def test_revoke_strategy_from_strategy(
     strategy.harvest()
 
     print(token.balanceOf(vault) + penaltyFee)
-    assert pytest.approx(token.balanceOf(vault) + penaltyFee, rel=RELATIVE_APPROX) == amount
+    assert (
+        pytest.approx(token.balanceOf(vault) + penaltyFee, rel=RELATIVE_APPROX)
+        == amount
+    )
     checks.check_strategy_empty(strategy)
@@ -0,0 +1,131 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import urllib.request
+
+import pytest
+
+from scripts.rpc_cache import CachingProxy, DiskCache, Upstream, cache_key, serve
+
+
+class _Node(BaseHTTPRequestHandler):
+    # stand-in upstream: deterministic answers, counts the requests it gets
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests += 1
+        answers = [
+            {
+                "jsonrpc": "2.0",
+                "id": r["id"],
+                "result": "0x"
+                + r["method"].encode().hex()
+                + json.dumps(r["params"]).encode().hex(),
+            }
+            for r in (payload if isinstance(payload, list) else [payload])
+        ]
+        body = json.dumps(answers if isinstance(payload, list) else answers[0]).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def node():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Node)
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def _rpc(url, payload):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def _reads(block):
+    return [
+        {
+            "jsonrpc": "2.0",
+            "id": i,
+            "method": "eth_getStorageAt",
+            "params": ["0x" + "11" * 20, hex(i), block],
+        }
+        for i in range(20)
+    ]
+
+
+def test_record_then_replay_offline(tmp_path, node):
+    upstream = f"http://127.0.0.1:{node.server_port}"
+    path = tmp_path / "cache"
+
+    cache = DiskCache(path)
+    proxy = CachingProxy(cache, Upstream(upstream))
+    server = serve(proxy, port=0)
+    url = f"http://127.0.0.1:{server.server_port}"
+    recorded = _rpc(url, _reads("0xc5d490"))
+    # the misses of a batch go upstream together
+    assert node.requests == 1
+    # moving blocks are never cached
+    _rpc(url, _reads("latest")[0])
+    _rpc(url, _reads("latest")[0])
+    assert node.requests == 3
+    server.shutdown()
+    cache.close()
+
+    # a later run answers from the file, without upstream
+    cache = DiskCache(path)
+    proxy = CachingProxy(cache, Upstream(upstream), offline=True)
+    server = serve(proxy, port=0)
+    url = f"http://127.0.0.1:{server.server_port}"
+    assert _rpc(url, _reads("0xc5d490")) == recorded
+    assert node.requests == 3
+    assert "error" in _rpc(url, _reads("latest")[0])
+    assert proxy.hits["eth_getStorageAt"] == 20
+    assert "95.2%" in proxy.report()
+    server.shutdown()
+    cache.close()
+
+
+def test_eviction_keeps_recent_results(tmp_path):
+    cache = DiskCache(tmp_path / "cache", max_bytes=4_000)
+    keys = [cache_key("eth_getCode", [hex(i), "0x1"]) for i in range(100)]
+    for i, key in enumerate(keys):
+        cache.put(key, "0x" + "ab" * 40)
+        # the first result stays hot
+        assert cache.get(keys[0]) == "0x" + "ab" * 40
+    assert cache.size <= 4_000
+    assert cache.evictions > 0
+    assert keys[0] in cache and keys[-1] in cache and keys[1] not in cache
+
+    # the rewritten file opens to the same records
+    survivors = len(cache)
+    cache.close()
+    cache = DiskCache(tmp_path / "cache", max_bytes=4_000)
+    assert len(cache) == survivors
+    assert cache.get(keys[-1]) == "0x" + "ab" * 40
+    cache.close()
+
+
+def test_torn_record_is_dropped(tmp_path):
+    path = tmp_path / "cache"
+    cache = DiskCache(path)
+    cache.put(cache_key("eth_chainId", []), "0x1")
+    cache.close()
+    with open(path, "ab") as f:
+        # header of a 100 byte result, cut short
+        f.write(b"\x01" * 32 + (100).to_bytes(4, "big") + b"{")
+    cache = DiskCache(path)
+    assert len(cache) == 1
+    assert cache.get(cache_key("eth_chainId", [])) == "0x1"
+    assert cache_key("eth_blockNumber", []) is None
+    cache.close()
@@ -5,6 +5,7 @@ from brownie import ZERO_ADDRESS
 import pytest
 from utils import checks
 
+
 def test_vault_shutdown_can_withdraw(
     chain, token, vault, strategy, user, amount, RELATIVE_APPROX, prepare_trade_factory
 ):
@@ -24,15 +25,25 @@ def test_vault_shutdown_can_withdraw(
 
     ## Withdraw (does it work, do you get what you expect)
     penaltyFee = strategy.exitPenaltyFeeWant(strategy.totalLP())
-    vault.withdraw(vault.balanceOf(user), user, 10_000, {"from":user})
+    vault.withdraw(vault.balanceOf(user), user, 10_000, {"from": user})
 
-    assert pytest.approx(token.balanceOf(user) + penaltyFee, rel=RELATIVE_APPROX) == amount
-    checks.check_vault_empty(vault)
+    assert (
+        pytest.approx(token.balanceOf(user) + penaltyFee, rel=RELATIVE_APPROX) == amount
+    )
+    checks.check_vault_empty(strategy)
     print(token.balanceOf(user))
 
 
 def test_basic_shutdown(
-    chain, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, prepare_trade_factory
+    chain,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    RELATIVE_APPROX,
+    prepare_trade_factory,
 ):
     # Deposit to the vault
     token.approve(vault.address, amount, {"from": user})
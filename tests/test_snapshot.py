@@ -0,0 +1,39 @@
+from utils import checks
+
+from scripts.snapshot import Snapshot, Snapshotter, check, diff
+
+
+def test_diff_and_invariants():
+    before = Snapshot(*range(1, 19))._replace(lp_in_gauge=0, total_debt=0)
+    after = before._replace(block=30, total_gain=21, lp_in_gauge=before.total_lp + 1)
+    d = diff(before, after)
+    assert d.deltas == {"lp_in_gauge": 4, "total_gain": 5}
+    assert d.violations == ("lp_in_gauge <= total_lp",)
+    # a reverted view reads as None and is not checked
+    assert check(after._replace(lp_in_gauge=None)) == ()
+    assert not diff(before, before) and diff(before, before).violations == ()
+
+
+def test_snapshot_matches_views(
+    chain, accounts, strategy, vault, token, user, strategist, Multicall2, harvested
+):
+    snapshotter = Snapshotter(accounts[0].deploy(Multicall2), strategy)
+    chain.mine(1)
+    before = snapshotter.take()
+    params = vault.strategies(strategy).dict()
+    assert before.estimated_total_assets == strategy.estimatedTotalAssets()
+    assert before.lp_in_gauge == strategy.balanceOfLPInGauge()
+    assert before.lp_in_wallet == strategy.totalLP() - strategy.balanceOfLPInGauge()
+    assert before.price_per_share == vault.pricePerShare()
+    assert before.want_in_vault == token.balanceOf(vault)
+    assert before.total_debt == params["totalDebt"]
+    assert before.exit_penalty_fee == strategy.totalExitPenaltyFee()
+    assert snapshotter.eth_calls == 1
+    # without a multicall the same views are read one by one
+    assert Snapshotter(None, strategy).take(before.block) == before
+
+    shares = vault.balanceOf(user) // 10
+    vault.withdraw(shares, user, 10_000, {"from": user})
+    d = checks.check_transition(before, snapshotter.take())
+    assert d.deltas["total_debt"] < 0
+    assert d.deltas["vault_total_supply"] == -shares
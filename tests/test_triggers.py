@@ -0,0 +1,54 @@
+import pytest
+
+from scripts.trigger_sim import (
+    HOUR,
+    Params,
+    compare,
+    cost_aware,
+    simulate_market,
+    wei_as_want,
+)
+
+
+def test_cost_aware_trigger_beats_wei_as_want():
+    market = simulate_market(300, 30 * 24, seed=1)
+    results = compare(
+        market, Params(max_report_delay=14 * 24 * HOUR), (cost_aware, wei_as_want)
+    )
+    aware, naive = results["cost_aware"], results["wei_as_want"]
+    assert aware["mean_net"] > naive["mean_net"]
+    # harvests more often but only when gas is cheap
+    assert aware["mean_harvests"] > naive["mean_harvests"]
+    assert aware["mean_gas"] < naive["mean_gas"]
+
+
+def test_eth_to_want_uses_router(strategy, unirouter, weth, token):
+    assert strategy.ethToWant(0) == 0
+    assert (
+        strategy.ethToWant(10 ** 16)
+        == unirouter.getAmountsOut(10 ** 16, [weth, token])[-1]
+    )
+
+
+def test_harvest_trigger_weighs_call_cost(chain, strategy, harvested):
+    assert strategy.lastVirtualPrice() > 0
+    assert strategy.truPrice() > 0
+    chain.sleep(3600)
+    chain.mine(1)
+
+    assert strategy.harvestTrigger(0)
+    assert not strategy.harvestTrigger(10 ** 24)
+
+
+def test_tend_trigger_invests_idle_want(
+    local, chain, token, strategy, amount, harvested
+):
+    if not local:
+        pytest.skip("idle want is minted to the strategy")
+    chain.sleep(3600)
+    chain.mine(1)
+    assert not strategy.tendTrigger(0)
+
+    token.mint(strategy, amount // 10)
+    assert strategy.tendTrigger(0)
+    assert not strategy.tendTrigger(10 ** 24)
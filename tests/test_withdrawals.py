@@ -4,13 +4,22 @@ import pytest
 from utils import checks
 
 
-
 def test_lossywithdrawal(
-    chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, gov, prepare_trade_factory
+    chain,
+    accounts,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    RELATIVE_APPROX,
+    gov,
+    prepare_trade_factory,
 ):
     # Deposit to the vault
-    vault.setPerformanceFee(0, {"from":gov})
-    vault.setManagementFee(0, {"from":gov})
+    vault.setPerformanceFee(0, {"from": gov})
+    vault.setManagementFee(0, {"from": gov})
     user_balance_before = token.balanceOf(user)
     token.approve(vault.address, amount, {"from": user})
     vault.deposit(amount, {"from": user})
@@ -25,27 +34,124 @@ def test_lossywithdrawal(
     print("strategy has", strategy.estimatedTotalAssets())
 
     # we did all we can by liquidating all
-    vault.withdraw(vault.balanceOf(user), user, 10_000, {"from":user})
-    checks.check_vault_empty(vault)
+    vault.withdraw(vault.balanceOf(user), user, 10_000, {"from": user})
+    checks.check_vault_empty(strategy)
+
 
 def test_partialwithdrawal(
-    chain, accounts, token, vault, strategy, user, strategist, amount, RELATIVE_APPROX, gov, prepare_trade_factory
+    chain,
+    accounts,
+    token,
+    vault,
+    strategy,
+    user,
+    strategist,
+    amount,
+    RELATIVE_APPROX,
+    gov,
+    prepare_trade_factory,
 ):
-   vault.setPerformanceFee(0, {"from":gov})
-   vault.setManagementFee(0, {"from":gov})
-   user_balance_before = token.balanceOf(user)
-   token.approve(vault.address, amount, {"from": user})
-   vault.deposit(amount, {"from": user})
-   assert token.balanceOf(vault.address) == amount
+    vault.setPerformanceFee(0, {"from": gov})
+    vault.setManagementFee(0, {"from": gov})
+    user_balance_before = token.balanceOf(user)
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    assert token.balanceOf(vault.address) == amount
+
+    # harvest
+    chain.sleep(1)
+    strategy.harvest()
+    assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
+
+    chain.mine(1)
+    print("strategy has", strategy.estimatedTotalAssets())
+
+    vault.withdraw(vault.balanceOf(user) / 2, user, 10_000, {"from": user})
+
+    print(token.balanceOf(user))
 
-   # harvest
-   chain.sleep(1)
-   strategy.harvest()
-   assert pytest.approx(strategy.estimatedTotalAssets(), rel=RELATIVE_APPROX) == amount
 
-   chain.mine(1)
-   print("strategy has", strategy.estimatedTotalAssets())
+def test_buffer_serves_small_withdrawals(
+    chain, token, vault, strategy, user, amount, gov, prepare_trade_factory
+):
+    # keep 10% idle, refill/drain only outside 5-15%
+    strategy.setBuffer(1_000, 500, {"from": gov})
+    token.approve(vault, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    assert pytest.approx(strategy.balanceOfWant(), rel=1e-3) == amount // 10
+
+    # served from the buffer, the pool position is untouched
+    staked = strategy.balanceOfLPInGauge()
+    vault.withdraw(amount // 50, user, 0, {"from": user})
+    assert strategy.balanceOfLPInGauge() == staked
+    # still inside the band: nothing to tend, nothing refilled
+    assert not strategy.tendTrigger(0)
+    strategy.tend({"from": gov})
+    assert strategy.balanceOfLPInGauge() == staked
+
+    # below the band: refilled on the next tend
+    vault.withdraw(amount // 25, user, 0, {"from": user})
+    assert strategy.balanceOfLPInGauge() == staked
+    strategy.tend({"from": gov})
+    assert strategy.balanceOfLPInGauge() < staked
+    assert (
+        pytest.approx(strategy.balanceOfWant(), rel=1e-2)
+        == strategy.estimatedTotalAssets() // 10
+    )
+
+
+def test_partial_withdrawal_covers_exit_penalty(
+    token, vault, strategy, user, amount, harvested
+):
+    # one liquidExit frees the amount plus its exit penalty, so nothing is
+    # booked as a loss
+    staked = strategy.balanceOfLPInGauge()
+    lp = strategy.lpForWant(amount // 2)
+    vault.withdraw(vault.balanceOf(user) // 2, user, 0, {"from": user})
+    assert strategy.balanceOfLPInGauge() == staked - lp
+    assert token.balanceOf(user) >= amount // 2
+
+
+def test_lp_for_want_converges_on_size_dependent_penalty(
+    local, token, vault, strategy, pool, user, gov, amount, harvested
+):
+    if not local:
+        pytest.skip("the penalty slope is set on the mock pool")
+    # an exit of the whole liquid value keeps 50% instead of 99.9%
+    pool.setExitPenaltySlope(4_990, {"from": gov})
+    want = amount // 2
+    lp = strategy.lpForWant(want)
+
+    # the penalty at the gross size still leaves `want`, and little more
+    gross = lp * pool.poolValue() // pool.totalSupply()
+    paid_out = gross * pool.liquidExitPenalty(gross) // 10_000
+    assert want <= paid_out < want + want // 1_000
+    # and more LP than a flat 0.1% penalty would take
+    pool.setExitPenaltySlope(0, {"from": gov})
+    assert lp > strategy.lpForWant(want)
+
+
+def test_lp_for_want_capped(
+    local, token, vault, strategy, pool, user, gov, amount, harvested
+):
+    if not local:
+        pytest.skip("the pool's loans are set on the mock pool")
+    pool.setInterestRate(0, {"from": gov})
+    staked = strategy.balanceOfLPInGauge()
+    assert strategy.lpForWant(10 * amount) == staked
 
-   vault.withdraw(vault.balanceOf(user)/2, user, 10_000, {"from":user})
+    # lent out, only `amount // 4` of the pool is liquid. TrueFi reverts the
+    # penalty quote and the exit above it, the withdrawal takes what is there
+    liquid = amount // 4
+    pool.borrow(pool.liquidValue() - liquid, {"from": gov})
+    lp = strategy.lpForWant(amount // 2)
+    assert lp < staked
+    assert lp * pool.poolValue() // pool.totalSupply() <= pool.liquidValue()
 
-   print(token.balanceOf(user))
+    vault.withdraw(vault.balanceOf(user) // 2, user, 10_000, {"from": user})
+    assert strategy.balanceOfLPInGauge() == staked - lp
+    assert token.balanceOf(user) >= liquid * 9_990 // 10_000
+    # only the exit penalty is left
+    assert pool.liquidValue() < liquid // 100
@@ -1,10 +1,18 @@
-from brownie import Contract, Wei
 import brownie
-from eth_abi import encode_single, encode_abi
-from brownie.convert import to_bytes
-from eth_abi.packed import encode_abi_packed
 import pytest
-import eth_utils
+from eth_utils import function_signature_to_4byte_selector as selector
+
+from scripts.abi import encode, encode_packed
+from scripts.quoter import Quoter, reserve_source
+from scripts.reward_scheduler import batch_costs, plan
+from scripts.swapper import (
+    MultiCallBuilder,
+    Trade,
+    encode_trades,
+    execute,
+    quote_trades,
+)
+
 
 def test_profitable_harvest(
     chain,
@@ -22,7 +30,7 @@ def test_profitable_harvest(
     multicall_swapper,
     tru,
     gov,
-    weth
+    weth,
 ):
 
     # Deposit to the vault
@@ -40,53 +48,19 @@ def test_profitable_harvest(
     # make profit
     chain.sleep(86400 * 5)
     chain.mine(1)
-    strategy.claimRewards({"from":gov})
-    # locked profit
-    chain.sleep(86400)
-
-    token_in = tru
-    token_out = token
-    receiver = strategy.address
-    amount_in = token_in.balanceOf(strategy)
-
-    asyncTradeExecutionDetails = [strategy, token_in, token_out, amount_in, 1]
-    optimizations = [["uint8"], [5]]
-    a = optimizations[0]
-    b = optimizations[1]
-
-    calldata = token_in.approve.encode_input(unirouter, amount_in)
-    t = createTx(token_in, calldata)
-    a = a + t[0]
-    b = b + t[1]
-
-    path = [token_in.address, weth.address, token_out.address]
-    calldata = unirouter.swapExactTokensForTokens.encode_input(
-        amount_in, 0, path, multicall_swapper, 2 ** 256 - 1
+    yswap(
+        chain,
+        strategy,
+        token,
+        tru,
+        unirouter,
+        weth,
+        multicall_swapper,
+        ymechs_safe,
+        gov,
+        trade_factory,
     )
-    t = createTx(unirouter, calldata)
-    a = a + t[0]
-    b = b + t[1]
-
-    expectedOut = unirouter.getAmountsOut(amount_in, path)[2]
-
-    calldata = token_out.transfer.encode_input(receiver, expectedOut)
-    t = createTx(token_out, calldata)
-    a = a + t[0]
-    b = b + t[1]
-
-    transaction = encode_abi_packed(a, b)
-
-    # min out must be at least 1 to ensure that the tx works correctly
-    # trade_factory.execute["uint256, address, uint, bytes"](
-    #    multicall_swapper.address, 1, transaction, {"from": ymechs_safe}
-    # )
-    trade_factory.execute["tuple,address,bytes"](
-        asyncTradeExecutionDetails,
-        multicall_swapper.address,
-        transaction,
-        {"from": ymechs_safe},
-    )
-    print(token_out.balanceOf(strategy))
+    print(token.balanceOf(strategy))
 
     tx = strategy.harvest({"from": strategist})
     print(tx.events)
@@ -94,16 +68,22 @@ def test_profitable_harvest(
     print(strategy.estimatedTotalAssets())
 
 
-def test_remove_trade_factory_token(strategy, gov, trade_factory, tru, prepare_trade_factory):
+def test_remove_trade_factory_token(strategy, gov, trade_factory, tru, rewards_accrued):
     assert strategy.tradeFactory() == trade_factory.address
-    assert tru.allowance(strategy.address, trade_factory.address) > 0
+    # claiming releases exactly the TRU held to the trade factory
+    strategy.claimRewards({"from": gov})
+    assert tru.balanceOf(strategy) > 0
+    assert tru.allowance(strategy, trade_factory) == tru.balanceOf(strategy)
 
     strategy.removeTradeFactoryPermissions({"from": gov})
 
     assert strategy.tradeFactory() != trade_factory.address
     assert tru.allowance(strategy.address, trade_factory.address) == 0
 
-def test_harvest_reverts_without_trade_factory(strategy, gov, user, vault, token, chain, amount):
+
+def test_harvest_reverts_without_trade_factory(
+    strategy, gov, user, vault, token, chain, amount
+):
     # Deposit to the vault
     user_balance_before = token.balanceOf(user)
     token.approve(vault.address, amount, {"from": user})
@@ -116,57 +96,166 @@ def test_harvest_reverts_without_trade_factory(strategy, gov, user, vault, token
     with brownie.reverts("Trade factory must be set."):
         strategy.harvest()
 
-###################################################################################################
-
 
-def createTx(to, data):
-    inBytes = eth_utils.to_bytes(hexstr=data)
-    return [["address", "uint256", "bytes"], [to.address, len(inBytes), inBytes]]
+def test_multicall_builder_matches_packed_encoding():
+    token, router, swapper, strategy = [f"0x{i:040x}" for i in (1, 2, 3, 4)]
+    path = [token, f"0x{5:040x}", f"0x{6:040x}"]
+    calls = [
+        (
+            token,
+            selector("approve(address,uint256)")
+            + encode(["address", "uint256"], [router, 10 ** 20]),
+        ),
+        (
+            router,
+            selector(
+                "swapExactTokensForTokens(uint256,uint256,address[],address,uint256)"
+            )
+            + encode(
+                ["uint256", "uint256", "address[]", "address", "uint256"],
+                [10 ** 20, 0, path, swapper, 2 ** 256 - 1],
+            ),
+        ),
+        (
+            path[-1],
+            selector("transfer(address,uint256)")
+            + encode(["address", "uint256"], [strategy, 123]),
+        ),
+    ]
+    types, values = ["uint8"], [5]
+    for target, calldata in calls:
+        types += ["address", "uint256", "bytes"]
+        values += [target, len(calldata), calldata]
 
-def yswap(chain, strategy, token, tru, unirouter, weth, multicall_swapper, ymechs_safe, gov, trade_factory):
-    strategy.claimRewards({"from":gov})
-    # locked profit
-    chain.sleep(86400)
+    expected = encode_packed(types, values)
 
-    token_in = tru
-    token_out = token
-    receiver = strategy.address
-    amount_in = token_in.balanceOf(strategy)
+    trade = Trade(strategy, token, path[-1], 10 ** 20, 1, path)
+    # a tiny initial buffer has to grow
+    builder = MultiCallBuilder(capacity=8)
+    assert encode_trades([trade], router, swapper, [123], builder) == expected
+    # the builder is reused from a clean state
+    assert encode_trades([trade], router, swapper, [123], builder) == expected
 
-    asyncTradeExecutionDetails = [strategy, token_in, token_out, amount_in, 1]
-    optimizations = [["uint8"], [5]]
-    a = optimizations[0]
-    b = optimizations[1]
 
-    calldata = token_in.approve.encode_input(unirouter, amount_in)
-    t = createTx(token_in, calldata)
-    a = a + t[0]
-    b = b + t[1]
+def test_batched_trades(
+    local,
+    accounts,
+    chain,
+    Strategy,
+    Multicall2,
+    mocks,
+    vault,
+    strategy,
+    token,
+    tru,
+    weth,
+    unirouter,
+    trade_factory,
+    multicall_swapper,
+    ymechs_safe,
+    strategist,
+    keeper,
+    gov,
+    funded,
+):
+    if not local:
+        pytest.skip("batched execution needs the mock trade factory")
+    from scripts.mocks import deploy_strategy, set_trade_factory
 
-    path = [token_in.address, weth.address, token_out.address]
-    calldata = unirouter.swapExactTokensForTokens.encode_input(
-        amount_in, 0, path, multicall_swapper, 2 ** 256 - 1
+    vault.updateStrategyDebtRatio(strategy, 5_000, {"from": gov})
+    other = deploy_strategy(
+        Strategy, strategist, keeper, gov, vault, mocks, debt_ratio=5_000
     )
-    t = createTx(unirouter, calldata)
-    a = a + t[0]
-    b = b + t[1]
+    set_trade_factory(other, trade_factory, ymechs_safe, gov)
+    strategies = [strategy, other]
+    for s in strategies:
+        s.harvest({"from": strategist})
+    chain.sleep(86400 * 5)
+    chain.mine(1)
+
+    path = [tru.address, weth.address, token.address]
+    trades = []
+    for s in strategies:
+        s.claimRewards({"from": gov})
+        trades.append(
+            Trade(s.address, tru.address, token.address, tru.balanceOf(s), 1, path)
+        )
+
+    multicall = accounts[0].deploy(Multicall2)
+    quoter = Quoter.load(multicall, reserve_source(multicall, unirouter), [path])
+    amounts_out = quote_trades(quoter, trades)
+    data = encode_trades(trades, unirouter, multicall_swapper, amounts_out)
+    before = [token.balanceOf(s) for s in strategies]
+
+    # one transaction for both strategies
+    tx = execute(trade_factory, multicall_swapper, trades, data, ymechs_safe)
+    assert tx.return_value == amounts_out
+    for s, amount_out, balance in zip(strategies, amounts_out, before):
+        assert token.balanceOf(s) == balance + amount_out
+        assert tru.balanceOf(s) == 0
+
+
+###################################################################################################
+
+
+def test_compounding_thresholds(
+    strategy, strategist, gov, tru, trade_factory, rewards_accrued
+):
+    pending = strategy.pendingRewards()
+    # below the claim threshold the rewards stay in the gauge
+    strategy.setRewardThresholds(pending * 10, 0, {"from": gov})
+    strategy.harvest({"from": strategist})
+    assert tru.balanceOf(strategy) == 0
+
+    # claimed inline, held back from the trade factory until a batch is worth selling
+    strategy.setRewardThresholds(pending, pending * 10, {"from": gov})
+    assert tru.allowance(strategy, trade_factory) == 0
+    strategy.harvest({"from": strategist})
+    claimed = tru.balanceOf(strategy)
+    assert claimed >= pending
+    assert tru.allowance(strategy, trade_factory) == 0
 
-    expectedOut = unirouter.getAmountsOut(amount_in, path)[2]
+    strategy.setRewardThresholds(2 ** 256 - 1, claimed, {"from": gov})
+    assert tru.allowance(strategy, trade_factory) == claimed
 
-    calldata = token_out.transfer.encode_input(receiver, expectedOut)
-    t = createTx(token_out, calldata)
-    a = a + t[0]
-    b = b + t[1]
 
-    transaction = encode_abi_packed(a, b)
+def test_reward_schedule_balances_gas_and_impact():
+    rate = 100 * 10 ** 18 / 86400
+    reserves = [
+        (5_000_000 * 10 ** 18, 300 * 10 ** 18),
+        (10_000 * 10 ** 18, 30_000_000 * 10 ** 6),
+    ]
+    market = (30 * 10 ** 9, 3_000 * 10 ** 6, 0.05)
+    schedule = plan(rate, reserves, *market)
+    assert schedule.min_rewards_to_claim == schedule.min_rewards_to_sell
+    batch = schedule.min_rewards_to_sell
+    cost, mid = batch_costs([batch // 2, batch, batch * 2], rate, reserves, *market)
+    per_unit = cost / mid
+    assert per_unit[1] <= min(per_unit[0], per_unit[2])
+    # pricier gas is spread over bigger batches
+    assert plan(rate, reserves, 300 * 10 ** 9, *market[1:]).min_rewards_to_sell > batch
 
+
+def yswap(
+    chain,
+    strategy,
+    token,
+    tru,
+    unirouter,
+    weth,
+    multicall_swapper,
+    ymechs_safe,
+    gov,
+    trade_factory,
+):
+    strategy.claimRewards({"from": gov})
+    # locked profit
+    chain.sleep(86400)
+
+    path = [tru.address, weth.address, token.address]
+    amount_in = tru.balanceOf(strategy)
     # min out must be at least 1 to ensure that the tx works correctly
-    # trade_factory.execute["uint256, address, uint, bytes"](
-    #    multicall_swapper.address, 1, transaction, {"from": ymechs_safe}
-    # )
-    trade_factory.execute["tuple,address,bytes"](
-        asyncTradeExecutionDetails,
-        multicall_swapper.address,
-        transaction,
-        {"from": ymechs_safe},
-    )
+    trade = Trade(strategy.address, tru.address, token.address, amount_in, 1, path)
+    expectedOut = unirouter.getAmountsOut(amount_in, path)[-1]
+    transaction = encode_trades([trade], unirouter, multicall_swapper, [expectedOut])
+    execute(trade_factory, multicall_swapper, [trade], transaction, ymechs_safe)
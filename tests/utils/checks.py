@@ -1,24 +1,33 @@
 import brownie
-from brownie import interface
 import pytest
 
+from scripts.snapshot import Snapshotter, check, diff
+
 # This file is reserved for standard checks
-def check_vault_empty(vault):
-    assert vault.totalAssets() == 0
-    assert vault.totalSupply() == 0
+def snapshot(strategy):
+    # the strategy and its vault as scripts.snapshot reads them, one view at a
+    # time since the tests deploy no Multicall2, invariants checked
+    s = Snapshotter(None, strategy).take()
+    assert not check(s), check(s)
+    return s
+
+
+def check_vault_empty(strategy):
+    s = snapshot(strategy)
+    assert s.vault_total_assets == 0
+    assert s.vault_total_supply == 0
 
 
 def check_strategy_empty(strategy):
-    assert strategy.estimatedTotalAssets() == 0
-    vault = interface.VaultAPI(strategy.vault())
-    assert vault.strategies(strategy).dict()["totalDebt"] == 0
+    s = snapshot(strategy)
+    assert s.estimated_total_assets == 0
+    assert s.total_debt == 0
 
 
-def check_revoked_strategy(vault, strategy):
-    status = vault.strategies(strategy).dict()
-    assert status["debtRatio"] == 0
-    assert status["totalDebt"] == 0
-    return
+def check_revoked_strategy(strategy):
+    s = snapshot(strategy)
+    assert s.debt_ratio == 0
+    assert s.total_debt == 0
 
 
 def check_harvest_profit(tx, profit_amount, rel_approx=1e-5):
@@ -36,10 +45,16 @@ def check_harvest_loss(tx, loss_amount, rel_approx=1e-5):
     assert pytest.approx(tx.events["Harvested"]["loss"], rel=rel_approx) == loss_amount
 
 
-def check_accounting(vault, strategy, totalGain, totalLoss, totalDebt, rel_approx=1e-5):
+def check_accounting(strategy, totalGain, totalLoss, totalDebt, rel_approx=1e-5):
     # inputs have to be manually calculated then checked
-    status = vault.strategies(strategy).dict()
-    assert pytest.approx(status["totalGain"], rel=rel_approx) == totalGain
-    assert pytest.approx(status["totalLoss"], rel=rel_approx) == totalLoss
-    assert pytest.approx(status["totalDebt"], rel=rel_approx) == totalDebt
-    return
+    s = snapshot(strategy)
+    assert pytest.approx(s.total_gain, rel=rel_approx) == totalGain
+    assert pytest.approx(s.total_loss, rel=rel_approx) == totalLoss
+    assert pytest.approx(s.total_debt, rel=rel_approx) == totalDebt
+
+
+def check_transition(before, after):
+    # snapshots from scripts.snapshot, returns the diff for further checks
+    d = diff(before, after)
+    assert not d.violations, d.violations
+    return d
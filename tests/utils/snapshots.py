@@ -0,0 +1,55 @@
+from brownie import chain
+
+
+class ChainStates:
+    """
+    Named chain states built on top of each other ("base" -> "funded" ->
+    "harvested" ...) and cached in brownie's snapshot.
+
+    `chain.snapshot` keeps a single snapshot, so only the deepest state built
+    so far is cached: restoring it reverts to the snapshot, restoring a deeper
+    one builds on top of it and moves the snapshot there. A shallower state
+    cannot be restored once a deeper one was built, conftest runs the tests of
+    a module from the shallowest state to the deepest.
+    """
+
+    def __init__(self):
+        self._builders = {}
+        self._current = None
+        self._block = None
+        self._clean = False
+
+    def register(self, name, build, parent="base"):
+        self._builders[name] = (parent, build)
+
+    def capture(self, name="base"):
+        chain.snapshot()
+        self._current = name
+        self._block = chain[-1].hash
+        self._clean = True
+
+    def restore(self, name):
+        path = []
+        state = name
+        while state != self._current:
+            if state not in self._builders:
+                raise ValueError(
+                    f"cannot restore {name!r} after {self._current!r} was built"
+                )
+            path.append(state)
+            state = self._builders[state][0]
+
+        if not self._clean:
+            chain.revert()
+            # a test that took its own snapshot elsewhere replaced ours
+            if chain[-1].hash != self._block:
+                raise ValueError(f"the snapshot of {self._current!r} was replaced")
+            self._clean = True
+        for state in reversed(path):
+            self._builders[state][1]()
+        if path:
+            self.capture(name)
+
+    def invalidate(self):
+        # the cached state was modified by a test
+        self._clean = False